@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
-from ..schemas import DownloadRequest, DownloadResponse, DownloadProgress
-from ..downloader import VideoDownloader
-import os
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
+from ..schemas import DownloadRequest, DownloadBatchRequest, DownloadResponse, DownloadProgress
+from ..download_queue import download_queue, DOWNLOAD_STATUSES
+from ..download_events import download_events
+from ..utils.metadata import PREVIEW_FIELDS
+import json
+import asyncio
 import ssl
 import urllib3
 from dotenv import load_dotenv
@@ -16,54 +19,99 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 load_dotenv()
 router = APIRouter()
 
-# Initialize downloader with media path
-MEDIA_PATH = os.getenv("MEDIA_PATH", "/opt/youtube-videos")
-downloader = VideoDownloader(MEDIA_PATH)
+YOUTUBE_URL_PREFIXES = ('https://www.youtube.com/', 'https://youtube.com/', 'https://youtu.be/')
+# Commentaire SSE périodique pour garder la connexion ouverte derrière un proxy
+SSE_KEEPALIVE_SECONDS = 15
 
-@router.post("/download", response_model=DownloadResponse)
-async def download_video(
-    request: DownloadRequest,
-    db: Session = Depends(get_db)
-):
-    """Start downloading a YouTube video"""
+# Le téléchargeur est partagé avec la file persistante
+downloader = download_queue.downloader
+
+def _enqueue(url: str, quality: str, priority: int) -> DownloadResponse:
+    if not url.startswith(YOUTUBE_URL_PREFIXES):
+        raise HTTPException(status_code=400, detail="Invalid YouTube URL")
     try:
-        # Validate URL
-        if not request.url.startswith(('https://www.youtube.com/', 'https://youtube.com/', 'https://youtu.be/')):
-            raise HTTPException(status_code=400, detail="Invalid YouTube URL")
-        
-        # Start download
-        task_id = await downloader.download_video(
-            request.url, 
-            request.quality,
-            db
-        )
-        
-        return DownloadResponse(
-            task_id=task_id,
-            message="Download started successfully"
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        task, created = download_queue.enqueue(url, quality, priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return DownloadResponse(
+        task_id=task.task_id,
+        message="Download queued" if created else f"Download already {task.status}",
+        queued=created
+    )
+
+@router.post("/download", response_model=DownloadResponse)
+def download_video(request: DownloadRequest):
+    """Queue a YouTube video for download"""
+    return _enqueue(request.url, request.quality, request.priority)
+
+@router.post("/download/batch", response_model=List[DownloadResponse])
+def download_videos(request: DownloadBatchRequest):
+    """Queue several videos at once; invalid URLs are reported without failing the batch"""
+    responses = []
+    for url in request.urls:
+        try:
+            responses.append(_enqueue(url, request.quality, request.priority))
+        except HTTPException as e:
+            responses.append(DownloadResponse(task_id="", message=e.detail, queued=False))
+    return responses
 
 @router.get("/download/{task_id}", response_model=DownloadProgress)
 def get_download_status(task_id: str):
     """Get status of a download task"""
-    status = downloader.get_download_status(task_id)
+    status = download_queue.get(task_id)
     if not status:
         raise HTTPException(status_code=404, detail="Download task not found")
     
     return DownloadProgress(**status)
 
 @router.get("/downloads", response_model=List[DownloadProgress])
-def get_all_downloads():
-    """Get all active downloads"""
-    downloads = downloader.get_all_downloads()
-    return [DownloadProgress(**status) for status in downloads.values()]
+def get_all_downloads(
+    status: Optional[List[str]] = Query(None),
+    limit: int = Query(200, ge=1, le=1000)
+):
+    """Get queued and running downloads, then the most recent finished ones"""
+    unknown = set(status or []) - set(DOWNLOAD_STATUSES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {', '.join(sorted(unknown))}")
+    return [DownloadProgress(**state) for state in download_queue.list(status, limit)]
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+@router.get("/downloads/events")
+async def download_events_stream(request: Request):
+    """Server-sent events: a snapshot of running tasks, then each progress change"""
+
+    async def stream():
+        queue = None
+        try:
+            # Abonnement dans le générateur: seul un flux réellement parcouru s'abonne,
+            # et le finally le désabonne toujours
+            queue = download_events.subscribe()
+            yield _sse("snapshot", download_events.snapshot())
+            while not await request.is_disconnected():
+                try:
+                    state: Dict = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse("progress", state)
+        finally:
+            if queue is not None:
+                download_events.unsubscribe(queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/downloads/events/stats")
+def get_download_events_stats():
+    """Progress stream counters and in-memory registry size"""
+    return {**download_events.stats(), 'registry': downloader.registry.stats()}
 
 @router.delete("/download/{task_id}")
 def cancel_download(task_id: str):
     """Cancel a download task"""
-    if not downloader.cancel_download(task_id):
+    if not download_queue.cancel(task_id):
         raise HTTPException(status_code=404, detail="Download task not found")
     
     return {"message": "Download cancelled"}
@@ -71,6 +119,21 @@ def cancel_download(task_id: str):
 @router.post("/download/metadata")
 async def get_video_metadata(request: DownloadRequest):
     """Get video metadata without downloading"""
+    # Passer par le cache partagé quand l'ID est connu
+    video_id = downloader._get_video_id_from_url(request.url)
+    if video_id:
+        metadata = downloader.metadata_extractor.get_metadata(video_id, PREVIEW_FIELDS)
+        if not metadata:
+            raise HTTPException(status_code=400, detail=f"Error fetching metadata for {video_id}")
+        return {
+            'title': metadata.get('title'),
+            'duration': metadata.get('duration'),
+            'thumbnail': metadata.get('thumbnail_url'),
+            'uploader': metadata.get('channel_name'),
+            'view_count': metadata.get('view_count'),
+            'formats': metadata.get('formats', [])
+        }
+
     try:
         import yt_dlp
         
@@ -117,4 +180,9 @@ async def get_video_metadata(request: DownloadRequest):
             }
             
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error fetching metadata: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=f"Error fetching metadata: {str(e)}")
+
+@router.get("/metadata/cache")
+def get_metadata_cache_stats():
+    """Get hit/miss counters of the metadata cache"""
+    return downloader.metadata_extractor.cache.stats()
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime
+import logging
+from ..library_io import (
+    COMPRESSIONS, LibraryImporter, StreamDecoder, UnsupportedCompression, export_stream
+)
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+EXPORT_MEDIA_TYPES = {
+    'none': ("application/x-ndjson", ".ndjson"),
+    'gzip': ("application/gzip", ".ndjson.gz"),
+    'zstd': ("application/zstd", ".ndjson.zst"),
+}
+
+@router.get("/library/export")
+def export_library(
+    since: Optional[datetime] = None,
+    compression: str = Query("gzip", pattern=f"^({'|'.join(COMPRESSIONS)})$")
+):
+    """Stream every video as NDJSON, or those changed since a timestamp plus deletion lines"""
+    try:
+        stream = export_stream(since, compression)
+        # Démarrer le générateur pour remonter une compression indisponible en 400
+        first = next(stream, b"")
+    except UnsupportedCompression as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def body():
+        if first:
+            yield first
+        yield from stream
+    
+    media_type, extension = EXPORT_MEDIA_TYPES[compression]
+    filename = f"youtube-library-{datetime.utcnow():%Y%m%d-%H%M%S}{extension}"
+    return StreamingResponse(body(), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.post("/library/import")
+async def import_library(
+    request: Request,
+    compression: Optional[str] = Query(None, pattern=f"^({'|'.join(COMPRESSIONS)})$")
+):
+    """Upsert videos from an NDJSON body, read and written in batches"""
+    if compression is None:
+        encoding = request.headers.get("content-encoding", "").lower()
+        compression = encoding if encoding in COMPRESSIONS else 'none'
+    importer = LibraryImporter()
+    try:
+        decoder = StreamDecoder(compression, importer.feed)
+    except UnsupportedCompression as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        async for chunk in request.stream():
+            # Décodage par blocs bornés et écriture des lots hors de la boucle d'événements
+            await run_in_threadpool(decoder.write, chunk)
+        await run_in_threadpool(decoder.close)
+    except Exception as e:
+        detail = f"Import stopped at line {importer.line_number}: {str(e)}"
+        # Les lots déjà écrits restent importés; un échec du dernier lot ne masque pas l'erreur
+        try:
+            await run_in_threadpool(importer.finish)
+        except Exception as finish_error:
+            logger.error(f"Could not flush the last import batch: {str(finish_error)}")
+        raise HTTPException(status_code=400, detail=detail)
+    return await run_in_threadpool(importer.finish)
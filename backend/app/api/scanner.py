@@ -1,35 +1,40 @@
-from fastapi import APIRouter, Depends, BackgroundTasks
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..schemas import ScanRequest, ScanResponse
-from ..scanner import VideoScanner
+from fastapi import APIRouter, HTTPException
+from typing import List
+from ..schemas import ScanRequest, ScanJobStatus
+from ..scan_jobs import scan_jobs
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 router = APIRouter()
 
-@router.post("/scan", response_model=ScanResponse)
-def scan_videos(
-    request: ScanRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
+@router.post("/scan", response_model=ScanJobStatus)
+def scan_videos(request: ScanRequest):
+    """Start a background scan and return its job right away"""
     scan_path = request.path or os.getenv("MEDIA_PATH")
     if not scan_path:
-        return ScanResponse(
-            status="error",
-            videos_found=0,
-            videos_added=0,
-            errors=["No scan path provided and MEDIA_PATH not set"]
-        )
+        raise HTTPException(status_code=400, detail="No scan path provided and MEDIA_PATH not set")
     
-    scanner = VideoScanner(db)
-    results = scanner.scan_directory(scan_path, request.recursive)
-    
-    return ScanResponse(
-        status="completed",
-        videos_found=results['videos_found'],
-        videos_added=results['videos_added'],
-        errors=results['errors']
-    )
+    # Un seul scan actif par dossier: renvoyer celui en cours le cas échéant
+    job, _ = scan_jobs.start(scan_path, request.recursive)
+    return ScanJobStatus(**job.to_dict())
+
+@router.get("/scan/{job_id}", response_model=ScanJobStatus)
+def get_scan_status(job_id: str):
+    """Get live counters of a scan job"""
+    job = scan_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return ScanJobStatus(**job.to_dict())
+
+@router.get("/scans", response_model=List[ScanJobStatus])
+def get_all_scans():
+    """Get recent and active scan jobs"""
+    return [ScanJobStatus(**job.to_dict()) for job in scan_jobs.list()]
+
+@router.delete("/scan/{job_id}")
+def cancel_scan(job_id: str):
+    """Cancel a running scan job"""
+    if not scan_jobs.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return {"message": "Scan cancelled"}
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from ..database import get_db
+from ..generation import daily_library_cache
+from ..stats import get_stats
+
+router = APIRouter()
+
+@router.get("/stats", dependencies=[Depends(daily_library_cache)])
+def get_library_stats(
+    days: int = Query(30, ge=1, le=366),
+    channels: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Library totals, per-channel counters and daily watch activity"""
+    return get_stats(db, days=days, channel_limit=channels)
@@ -1,13 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Dict, Tuple
 from ..database import get_db
-from ..models import Video as VideoModel
-from ..schemas import Video, VideoUpdate
+from ..models import Video as VideoModel, FileState, Channel
+from ..schemas import (
+    Video, VideoUpdate, PlaybackProgress, PlaybackState, VideoSelection, BulkUpdateRequest, BulkDeleteRequest
+)
+from ..search import apply_search
+from ..facets import apply_tag_filter, get_facets
+from ..projection import (
+    VIDEO_FIELDS, FastJSONResponse, parse_fields, apply_projection, video_to_dict, videos_response
+)
+from ..generation import library_cache
+from ..query_cache import query_cache, video_tag, LIST_TAG, FACETS_TAG
+from ..playback import playback_tracker
+from ..utils.sidecar import sidecar_files
+from ..pagination import (
+    SORT_FIELDS, RELEVANCE, InvalidCursor, decode_cursor, apply_keyset, keyset_cursor, offset_cursor
+)
 from datetime import datetime
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _count_total(query, key: Tuple) -> int:
+    """Total of a filtered query, cached until a list-changing write"""
+    cache_key = ('videos_total',) + key
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        return int(cached.body)
+    version = query_cache.version
+    total = query.order_by(None).count()
+    query_cache.set(cache_key, str(total).encode(), {LIST_TAG}, version)
+    return total
+
+def _apply_filters(query, channel: Optional[str], watched: Optional[bool],
+                   tags: Optional[List[str]], tag_mode: str = "all"):
+    if channel:
+        query = query.filter(VideoModel.channel_name == channel)
+    
+    if watched is not None:
+        query = query.filter(VideoModel.watched == watched)
+    
+    if tags:
+        # Filtre via la table video_tags indexée plutôt qu'un LIKE sur le JSON
+        query = apply_tag_filter(query, tags, match_all=(tag_mode == "all"))
+    return query
+
+def _selected_ids(db: Session, selection: VideoSelection):
+    """Subquery of the video IDs matched by a bulk selection"""
+    if not (selection.ids or selection.channel or selection.tags or selection.search
+            or selection.watched is not None):
+        raise HTTPException(status_code=400, detail="Selection must contain ids or at least one filter")
+    query = _apply_filters(db.query(VideoModel), selection.channel, selection.watched,
+                           selection.tags, selection.tag_mode)
+    if selection.ids:
+        query = query.filter(VideoModel.id.in_(selection.ids))
+    if selection.search:
+        query = apply_search(query, selection.search, rank=False)
+    return query.with_entities(VideoModel.id).subquery()
+
+def _remove_files(paths: List[str]):
+    """Delete video files and their sidecars, after the response was sent"""
+    removed = 0
+    for path in paths:
+        for file_path in [Path(path)] + sidecar_files(path):
+            try:
+                if file_path.is_file():
+                    file_path.unlink()
+                    removed += 1
+            except OSError as e:
+                logger.error(f"Could not remove {file_path}: {str(e)}")
+    logger.info(f"Removed {removed} files of {len(paths)} deleted videos")
+
+def _with_snippets(rows) -> List[VideoModel]:
+    videos = []
+    for video, snippet in rows:
+        video.snippet = snippet
+        videos.append(video)
+    return videos
+
 @router.get("/videos", response_model=List[Video])
 def get_videos(
     skip: int = 0,
@@ -15,31 +91,102 @@ def get_videos(
     search: Optional[str] = None,
     channel: Optional[str] = None,
     watched: Optional[bool] = None,
+    tag: Optional[List[str]] = Query(None),
+    tag_mode: str = Query("all", pattern="^(all|any)$"),
+    sort: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    view: str = Query("full", pattern="^(full|compact)$"),
+    fields: Optional[str] = None,
+    cache_headers: Dict[str, str] = Depends(library_cache),
     db: Session = Depends(get_db)
 ):
-    query = db.query(VideoModel)
+    """List videos, paginated with an opaque cursor returned in X-Next-Cursor
+
+    view=compact or fields=id,title,... restrict both the loaded columns
+    and the serialized payload.
+    """
+    try:
+        selected = parse_fields(fields, compact=(view == "compact"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Par défaut: pertinence pour une recherche, sinon les plus récents
+    sort = sort or (RELEVANCE if search else 'added_date')
+    if sort not in SORT_FIELDS and not (sort == RELEVANCE and search):
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORT_FIELDS)}")
+    
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filters = (search, channel, watched, tuple(sorted(set(tag or ()))), tag_mode)
+    # Seules les premières pages sont mises en cache: ce sont celles que l'interface redemande
+    cache_key = None
+    if position is None and not skip:
+        cache_key = ('videos',) + filters + (sort, order, limit, include_total, selected)
+        cached = query_cache.get(cache_key)
+        if cached is not None:
+            return cached.response(cache_headers)
+    version = query_cache.version
+    
+    headers: Dict[str, str] = {}
+    query = _apply_filters(db.query(VideoModel), channel, watched, tag, tag_mode)
     
     if search:
-        query = query.filter(
-            VideoModel.title.contains(search) | 
-            VideoModel.description.contains(search)
-        )
+        # Recherche plein texte classée (bm25) avec extraits surlignés
+        query = apply_search(query, search, rank=(sort == RELEVANCE))
     
-    if channel:
-        query = query.filter(VideoModel.channel_name == channel)
+    if include_total:
+        headers["X-Total-Count"] = str(_count_total(query, filters))
     
-    if watched is not None:
-        query = query.filter(VideoModel.watched == watched)
+    # La clé de tri sert à construire le curseur: la charger aussi
+    query = apply_projection(query, selected, extra=() if sort == RELEVANCE else (sort,))
     
-    videos = query.offset(skip).limit(limit).all()
-    return videos
+    if sort == RELEVANCE:
+        if position is not None and position.get('s') != RELEVANCE:
+            raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+        offset = int(position.get('off', 0)) if position else skip
+        videos = _with_snippets(query.offset(offset).limit(limit).all())
+        if len(videos) == limit:
+            headers["X-Next-Cursor"] = offset_cursor(offset + limit)
+    else:
+        descending = order == "desc"
+        try:
+            query = apply_keyset(query, sort, descending, position)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if position is None and skip:
+            query = query.offset(skip)
+        
+        rows = query.limit(limit).all()
+        videos = _with_snippets(rows) if search else rows
+        if len(videos) == limit:
+            headers["X-Next-Cursor"] = keyset_cursor(videos[-1], sort, descending)
+    
+    response = videos_response(videos, selected, {**headers, **cache_headers})
+    if cache_key is not None:
+        tags = {LIST_TAG} | {video_tag(video.id) for video in videos}
+        query_cache.set(cache_key, response.body, tags, version, headers)
+    return response
 
 @router.get("/videos/{video_id}", response_model=Video)
-def get_video(video_id: str, db: Session = Depends(get_db)):
+def get_video(video_id: str, cache_headers: Dict[str, str] = Depends(library_cache),
+              db: Session = Depends(get_db)):
+    cache_key = ('video', video_id)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        return cached.response(cache_headers)
+    version = query_cache.version
+    
     video = db.query(VideoModel).filter(VideoModel.id == video_id).first()
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
-    return video
+    response = FastJSONResponse(video_to_dict(video, VIDEO_FIELDS), headers=cache_headers)
+    query_cache.set(cache_key, response.body, {video_tag(video_id)}, version)
+    return response
 
 @router.patch("/videos/{video_id}")
 def update_video(
@@ -62,6 +209,61 @@ def update_video(
     db.refresh(video)
     return video
 
+@router.post("/videos/{video_id}/progress", response_model=PlaybackState)
+def report_progress(video_id: str, progress: PlaybackProgress, db: Session = Depends(get_db)):
+    """Record the playback position; written to the database in periodic batches"""
+    # Vérifier l'existence une seule fois par session de lecture
+    if not playback_tracker.is_tracking(video_id):
+        if not db.query(VideoModel.id).filter(VideoModel.id == video_id).first():
+            raise HTTPException(status_code=404, detail="Video not found")
+    return playback_tracker.record(video_id, progress.position, progress.duration, progress.completed)
+
+@router.get("/videos/{video_id}/progress", response_model=PlaybackState)
+def get_progress(video_id: str, db: Session = Depends(get_db)):
+    position = playback_tracker.pending_position(video_id)
+    if position is not None:
+        return {"video_id": video_id, "position": position}
+    video = db.query(VideoModel.playback_position, VideoModel.watched).filter(VideoModel.id == video_id).first()
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    return {"video_id": video_id, "position": video.playback_position, "watched": video.watched}
+
+@router.post("/videos/bulk-update")
+def bulk_update_videos(request: BulkUpdateRequest, db: Session = Depends(get_db)):
+    """Update every selected video with a single UPDATE statement"""
+    values = {}
+    if request.watched is not None:
+        values[VideoModel.watched] = request.watched
+    if request.reset_progress:
+        values[VideoModel.playback_position] = None
+    if not values:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    
+    ids = _selected_ids(db, request.selection)
+    updated = (db.query(VideoModel).filter(VideoModel.id.in_(select(ids.c.id)))
+               .update(values, synchronize_session=False))
+    db.commit()
+    return {"updated": updated}
+
+@router.post("/videos/bulk-delete")
+def bulk_delete_videos(request: BulkDeleteRequest, background_tasks: BackgroundTasks,
+                       db: Session = Depends(get_db)):
+    """Delete every selected video in one transaction; files are removed in the background"""
+    ids = _selected_ids(db, request.selection)
+    selected = select(ids.c.id)
+    paths = []
+    if request.delete_files:
+        paths = [row.file_path for row in
+                 db.query(VideoModel.file_path).filter(VideoModel.id.in_(selected))]
+    
+    db.query(FileState).filter(FileState.video_id.in_(selected)).delete(synchronize_session=False)
+    deleted = db.query(VideoModel).filter(VideoModel.id.in_(selected)).delete(synchronize_session=False)
+    db.commit()
+    
+    if paths:
+        background_tasks.add_task(_remove_files, paths)
+    return {"deleted": deleted, "files_scheduled": len(paths)}
+
 @router.delete("/videos/{video_id}")
 def delete_video(video_id: str, db: Session = Depends(get_db)):
     video = db.query(VideoModel).filter(VideoModel.id == video_id).first()
@@ -69,10 +271,44 @@ def delete_video(video_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Video not found")
     
     db.delete(video)
+    # Oublier l'état du fichier pour qu'un prochain scan puisse le réimporter
+    db.query(FileState).filter(FileState.video_id == video_id).delete()
     db.commit()
     return {"message": "Video deleted"}
 
 @router.get("/channels")
-def get_channels(db: Session = Depends(get_db)):
-    channels = db.query(VideoModel.channel_name).distinct().all()
-    return [{"name": channel[0]} for channel in channels if channel[0]]
+def get_channels(cache_headers: Dict[str, str] = Depends(library_cache), db: Session = Depends(get_db)):
+    cached = query_cache.get(('channels',))
+    if cached is not None:
+        return cached.response(cache_headers)
+    version = query_cache.version
+    
+    channels = db.query(Channel).order_by(Channel.name).all()
+    response = FastJSONResponse(
+        [{"name": channel.name, "video_count": channel.video_count} for channel in channels],
+        headers=cache_headers
+    )
+    query_cache.set(('channels',), response.body, {FACETS_TAG}, version)
+    return response
+
+@router.get("/facets")
+def get_library_facets(
+    limit: int = Query(50, ge=1, le=500),
+    cache_headers: Dict[str, str] = Depends(library_cache),
+    db: Session = Depends(get_db)
+):
+    """Video counts per channel and per tag, largest first"""
+    cache_key = ('facets', limit)
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        return cached.response(cache_headers)
+    version = query_cache.version
+    
+    response = FastJSONResponse(get_facets(db, limit), headers=cache_headers)
+    query_cache.set(cache_key, response.body, {FACETS_TAG}, version)
+    return response
+
+@router.get("/library/cache")
+def get_query_cache_stats():
+    """Get hit ratio and memory use of the query result cache"""
+    return query_cache.stats()
@@ -0,0 +1,79 @@
+"""Library maintenance commands: python -m app.cli export|import"""
+import sys
+import argparse
+from datetime import datetime
+from .database import engine, Base
+from .migrations import run_migrations
+from .library_io import COMPRESSIONS, UnsupportedCompression, export_stream, import_chunks
+
+# Lecture par petits blocs: un bloc gzip peut se décompresser en bien plus
+CHUNK_SIZE = 64 * 1024
+
+
+def _compression_for(path: str, requested: str) -> str:
+    if requested != 'auto':
+        return requested
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return 'none'
+
+
+def export_command(args) -> int:
+    compression = _compression_for(args.output, args.compression)
+    since = datetime.fromisoformat(args.since) if args.since else None
+    output = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in export_stream(since, compression):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    return 0
+
+
+def import_command(args) -> int:
+    compression = _compression_for(args.input, args.compression)
+    source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    try:
+        results = import_chunks(iter(lambda: source.read(CHUNK_SIZE), b""), compression, args.batch_size)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+    print(f"Imported {results['rows']} rows and {results['deleted']} deletions in {results['batches']} batches, "
+          f"{results['invalid']} invalid lines", file=sys.stderr)
+    for error in results['errors']:
+        print(error, file=sys.stderr)
+    return 1 if results['invalid'] else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="YouTube Library maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    choices = ('auto',) + COMPRESSIONS
+
+    export_parser = commands.add_parser("export", help="Write the library as NDJSON")
+    export_parser.add_argument("-o", "--output", default="-", help="output file, - for stdout")
+    export_parser.add_argument("--since", help="only videos changed or deleted since this ISO timestamp (UTC)")
+    export_parser.add_argument("--compression", choices=choices, default="auto",
+                               help="auto picks from the file extension (.gz, .zst)")
+    export_parser.set_defaults(handler=export_command)
+
+    import_parser = commands.add_parser("import", help="Upsert videos from an NDJSON export")
+    import_parser.add_argument("input", help="input file, - for stdin")
+    import_parser.add_argument("--compression", choices=choices, default="auto")
+    import_parser.add_argument("--batch-size", type=int, default=2000)
+    import_parser.set_defaults(handler=import_command)
+
+    args = parser.parse_args(argv)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    try:
+        return args.handler(args)
+    except UnsupportedCompression as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
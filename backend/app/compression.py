@@ -0,0 +1,34 @@
+import os
+import logging
+from typing import Tuple
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Les vidéos sont servies par plages (Range): ne jamais les compresser;
+# l'export choisit lui-même sa compression; un flux SSE ne doit pas être tamponné
+COMPRESSION_EXCLUDED_PREFIXES = ("/media", "/api/library/export", "/api/downloads/events")
+
+
+class CompressionMiddleware:
+    """Brotli (or gzip when brotli-asgi is missing) for API responses, never for media files"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 excluded_prefixes: Tuple[str, ...] = COMPRESSION_EXCLUDED_PREFIXES):
+        self.app = app
+        self.excluded_prefixes = excluded_prefixes
+        try:
+            from brotli_asgi import BrotliMiddleware
+            # Qualité 4: bon compromis taille/CPU pour des réponses générées à la volée
+            self.compressed = BrotliMiddleware(app, quality=4, minimum_size=minimum_size, gzip_fallback=True)
+        except ImportError:
+            logger.info("brotli-asgi is not installed, using gzip compression only")
+            self.compressed = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=6)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and not scope["path"].startswith(self.excluded_prefixes):
+            await self.compressed(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
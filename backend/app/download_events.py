@@ -0,0 +1,106 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Au plus un événement de progression par tâche et par intervalle (4/s par défaut)
+DOWNLOAD_EVENT_MIN_INTERVAL = float(os.getenv("DOWNLOAD_EVENT_MIN_INTERVAL", "0.25"))
+# Variation minimale (en %) pour qu'une progression soit diffusée
+DOWNLOAD_EVENT_MIN_DELTA = float(os.getenv("DOWNLOAD_EVENT_MIN_DELTA", "0.5"))
+# Un abonné trop lent perd ses événements les plus anciens
+DOWNLOAD_EVENT_QUEUE_SIZE = 256
+
+TERMINAL_STATUSES = ('completed', 'error', 'cancelled')
+
+
+class DownloadEventBroker:
+    """Fan out download progress from worker threads to asyncio subscribers
+
+    The latest snapshot of every running task is kept so that a new
+    subscriber starts from the current state instead of polling.
+    """
+
+    def __init__(self, min_interval: float = DOWNLOAD_EVENT_MIN_INTERVAL,
+                 min_delta: float = DOWNLOAD_EVENT_MIN_DELTA):
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self.latest: Dict[str, Dict] = {}
+        self._sent_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.throttled = 0
+
+    def publish(self, snapshot: Dict, force: bool = False) -> bool:
+        """Record a task snapshot (thread-safe); returns False when it was throttled"""
+        task_id = snapshot['task_id']
+        now = time.monotonic()
+        with self._lock:
+            previous = self.latest.get(task_id)
+            if not force and previous is not None and not self._meaningful(previous, snapshot, now):
+                self.throttled += 1
+                return False
+            snapshot = dict(snapshot)
+            if snapshot.get('status') in TERMINAL_STATUSES:
+                # Plus rien à rejouer pour une tâche terminée
+                self.latest.pop(task_id, None)
+                self._sent_at.pop(task_id, None)
+            else:
+                self.latest[task_id] = snapshot
+                self._sent_at[task_id] = now
+            self.published += 1
+            loop = self._loop if self._subscribers else None
+
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._fan_out, snapshot)
+            except RuntimeError:
+                pass  # boucle arrêtée pendant l'arrêt du serveur
+        return True
+
+    def _meaningful(self, previous: Dict, snapshot: Dict, now: float) -> bool:
+        if previous.get('status') != snapshot.get('status') or previous.get('error') != snapshot.get('error'):
+            return True
+        if now - self._sent_at.get(snapshot['task_id'], 0) < self.min_interval:
+            return False
+        return abs((snapshot.get('progress') or 0) - (previous.get('progress') or 0)) >= self.min_delta
+
+    def _fan_out(self, snapshot: Dict):
+        # Exécuté dans la boucle asyncio
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(snapshot)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber queue; must be called from the event loop"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=DOWNLOAD_EVENT_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.discard(queue)
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [dict(state) for state in self.latest.values()]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'tracked': len(self.latest),
+                'published': self.published,
+                'throttled': self.throttled,
+            }
+
+
+download_events = DownloadEventBroker()
@@ -0,0 +1,321 @@
+import os
+import uuid
+import random
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from .database import SessionLocal
+from .models import DownloadTask
+from .downloader import VideoDownloader, DownloadCancelled, PermanentDownloadError
+from .download_events import download_events
+
+logger = logging.getLogger(__name__)
+
+MEDIA_PATH = os.getenv("MEDIA_PATH", "/opt/youtube-videos")
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "3"))
+DOWNLOAD_MAX_ATTEMPTS = int(os.getenv("DOWNLOAD_MAX_ATTEMPTS", "5"))
+# Attente avant une nouvelle tentative: base * 2^(tentative - 1), plafonnée
+DOWNLOAD_RETRY_BASE_SECONDS = int(os.getenv("DOWNLOAD_RETRY_BASE_SECONDS", "30"))
+DOWNLOAD_RETRY_MAX_SECONDS = int(os.getenv("DOWNLOAD_RETRY_MAX_SECONDS", "3600"))
+# Intervalle maximal entre deux vérifications de la file
+DOWNLOAD_POLL_SECONDS = 5
+
+ACTIVE_STATUSES = ('pending', 'downloading', 'processing')
+DOWNLOAD_STATUSES = ACTIVE_STATUSES + ('completed', 'error', 'cancelled')
+
+
+class DownloadQueue:
+    """Database-backed download queue drained by a pool of worker threads"""
+
+    def __init__(self, downloader: VideoDownloader, workers: int = DOWNLOAD_WORKERS,
+                 max_attempts: int = DOWNLOAD_MAX_ATTEMPTS):
+        self.downloader = downloader
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.threads: List[threading.Thread] = []
+        self.stop_event = threading.Event()
+        self._wakeup = threading.Condition()
+        # Sélection et réservation d'une tâche doivent être atomiques entre workers
+        self._claim_lock = threading.Lock()
+
+    def start(self):
+        if any(thread.is_alive() for thread in self.threads):
+            return
+        self._resume_interrupted()
+        # Les abonnés au flux de progression reçoivent aussi la file existante
+        for status in self.list(ACTIVE_STATUSES, limit=1000):
+            download_events.publish(status, force=True)
+        self.downloader.registry.start()
+        self.stop_event.clear()
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"download-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+        logger.info(f"Download queue started with {self.workers} workers")
+
+    def stop(self):
+        self.stop_event.set()
+        self.downloader.registry.stop()
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def enqueue(self, url: str, quality: str = "best", priority: int = 0) -> Tuple[DownloadTask, bool]:
+        """Queue url; returns (task, created), reusing an active task for the same video"""
+        video_id = self.downloader._get_video_id_from_url(url)
+        if not video_id:
+            raise ValueError("Could not extract video ID from URL")
+
+        # Vérification et insertion sous le verrou: deux demandes simultanées
+        # pour la même vidéo partageraient sinon le même dossier de travail
+        with self._claim_lock:
+            task, created = self._get_or_create(video_id, url, quality, priority)
+
+        if created:
+            self._publish(task.task_id)
+            with self._wakeup:
+                self._wakeup.notify()
+        return task, created
+
+    def _get_or_create(self, video_id: str, url: str, quality: str, priority: int) -> Tuple[DownloadTask, bool]:
+        db = SessionLocal()
+        try:
+            existing = (db.query(DownloadTask)
+                        .filter(DownloadTask.video_id == video_id, DownloadTask.status.in_(ACTIVE_STATUSES))
+                        .first())
+            if existing:
+                # Une nouvelle demande plus prioritaire remonte la tâche existante
+                if priority > existing.priority:
+                    existing.priority = priority
+                    db.commit()
+                    db.refresh(existing)
+                db.expunge(existing)
+                return existing, False
+
+            task = DownloadTask(
+                task_id=str(uuid.uuid4()),
+                video_id=video_id,
+                url=url,
+                quality=quality or "best",
+                priority=priority,
+                status='pending',
+                max_attempts=self.max_attempts,
+                created_at=datetime.utcnow(),
+            )
+            db.add(task)
+            db.commit()
+            db.refresh(task)
+            db.expunge(task)
+            return task, True
+        finally:
+            db.close()
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        db = SessionLocal()
+        try:
+            task = db.get(DownloadTask, task_id)
+            return self._status(task) if task else None
+        finally:
+            db.close()
+
+    def list(self, statuses: Optional[List[str]] = None, limit: int = 200) -> List[Dict]:
+        """Active tasks first, then the most recent finished ones, optionally filtered by status"""
+        wanted = set(statuses or DOWNLOAD_STATUSES)
+        active_statuses = [status for status in ACTIVE_STATUSES if status in wanted]
+        finished_statuses = [status for status in DOWNLOAD_STATUSES
+                             if status in wanted and status not in ACTIVE_STATUSES]
+        db = SessionLocal()
+        try:
+            active = []
+            if active_statuses:
+                active = (db.query(DownloadTask)
+                          .filter(DownloadTask.status.in_(active_statuses))
+                          .order_by(DownloadTask.priority.desc(), DownloadTask.created_at)
+                          .limit(limit).all())
+            finished = []
+            if finished_statuses and len(active) < limit:
+                finished = (db.query(DownloadTask)
+                            .filter(DownloadTask.status.in_(finished_statuses))
+                            .order_by(DownloadTask.finished_at.desc())
+                            .limit(limit - len(active)).all())
+            return [self._status(task) for task in active + finished]
+        finally:
+            db.close()
+
+    def cancel(self, task_id: str) -> bool:
+        # Sous le verrou de réservation: un worker ne peut pas prendre la tâche entre-temps
+        with self._claim_lock:
+            db = SessionLocal()
+            try:
+                task = db.get(DownloadTask, task_id)
+                if not task:
+                    return False
+                running = task.status in ('downloading', 'processing')
+                if task.status in ACTIVE_STATUSES:
+                    task.status = 'cancelled'
+                    task.error = 'Download cancelled by user'
+                    task.finished_at = datetime.utcnow()
+                    db.commit()
+                    # Tâche en attente (nouvelle tentative différée...): aucun worker ne
+                    # nettoiera son dossier de travail, le supprimer avant une nouvelle demande
+                    if not running:
+                        self.downloader._remove_partial_files(task.video_id)
+            finally:
+                db.close()
+        # Interrompt le téléchargement en cours; le worker passe à la tâche suivante
+        if running:
+            self.downloader.cancel_download(task_id)
+        self._publish(task_id)
+        return True
+
+    def _publish(self, task_id: str):
+        """Push the persisted state of a task to progress subscribers"""
+        try:
+            status = self.get(task_id)
+            if status:
+                download_events.publish(status, force=True)
+        except Exception as e:
+            logger.error(f"Could not publish download event: {str(e)}")
+
+    def _status(self, task: DownloadTask) -> Dict:
+        """Persisted task state merged with the live progress of a running download"""
+        status = {
+            'task_id': task.task_id,
+            'video_id': task.video_id,
+            'status': task.status,
+            'priority': task.priority,
+            'attempts': task.attempts,
+            'next_attempt_at': task.next_attempt_at,
+            'progress': 100.0 if task.status == 'completed' else 0.0,
+            'speed': None,
+            'eta': None,
+            'filename': task.filename,
+            'error': task.error,
+        }
+        live = self.downloader.get_download_status(task.task_id)
+        if live and task.status in ('downloading', 'processing'):
+            status.update({key: live[key] for key in ('progress', 'speed', 'eta') if live.get(key) is not None})
+            status['filename'] = live.get('filename') or status['filename']
+        return status
+
+    def _resume_interrupted(self):
+        """Tasks left running by a previous process go back to the queue"""
+        db = SessionLocal()
+        try:
+            interrupted = (db.query(DownloadTask)
+                           .filter(DownloadTask.status.in_(('downloading', 'processing'))).all())
+            for task in interrupted:
+                task.status = 'pending'
+                # Une interruption ne compte pas comme un échec
+                task.attempts = max(0, task.attempts - 1)
+                task.next_attempt_at = None
+            db.commit()
+            if interrupted:
+                logger.info(f"Resuming {len(interrupted)} interrupted downloads")
+        finally:
+            db.close()
+
+    def _claim(self) -> Tuple[Optional[DownloadTask], Optional[float]]:
+        """Reserve the next due task; otherwise return the seconds until one is due"""
+        now = datetime.utcnow()
+        with self._claim_lock:
+            db = SessionLocal()
+            try:
+                task = (db.query(DownloadTask)
+                        .filter(DownloadTask.status == 'pending',
+                                (DownloadTask.next_attempt_at.is_(None)) | (DownloadTask.next_attempt_at <= now))
+                        .order_by(DownloadTask.priority.desc(), DownloadTask.created_at)
+                        .first())
+                if task is None:
+                    next_due = (db.query(DownloadTask.next_attempt_at)
+                                .filter(DownloadTask.status == 'pending', DownloadTask.next_attempt_at > now)
+                                .order_by(DownloadTask.next_attempt_at).first())
+                    wait = (next_due[0] - now).total_seconds() if next_due else None
+                    return None, wait
+                task.status = 'downloading'
+                task.attempts += 1
+                task.started_at = now
+                task.error = None
+                db.commit()
+                db.refresh(task)
+                db.expunge(task)
+                # Sous le verrou: cancel() trouve toujours l'événement d'une tâche réservée
+                self.downloader.claim_download(task.task_id)
+                return task, None
+            finally:
+                db.close()
+
+    def _worker(self):
+        while not self.stop_event.is_set():
+            try:
+                task, wait = self._claim()
+            except Exception as e:
+                logger.error(f"Download queue error: {str(e)}")
+                task, wait = None, DOWNLOAD_POLL_SECONDS
+            if task is None:
+                with self._wakeup:
+                    self._wakeup.wait(min(wait, DOWNLOAD_POLL_SECONDS) if wait is not None else DOWNLOAD_POLL_SECONDS)
+                continue
+            self._run(task)
+
+    def _run(self, task: DownloadTask):
+        self._publish(task.task_id)
+        status = 'error'
+        try:
+            outcome = self.downloader.download(task.task_id, task.url, task.quality, task.video_id)
+            status = 'completed'
+            self._finish(task, status, filename=outcome.get('filename'), error=outcome.get('message'))
+        except DownloadCancelled:
+            # Statut déjà enregistré par cancel(), pas de nouvelle tentative
+            status = 'cancelled'
+            logger.info(f"Download {task.task_id} cancelled")
+        except PermanentDownloadError as e:
+            # Vidéo privée, supprimée...: réessayer ne changerait rien
+            logger.error(f"Download {task.task_id} failed permanently: {str(e)}")
+            self._finish(task, status, error=str(e))
+        except Exception as e:
+            error = str(e)
+            if task.attempts < task.max_attempts:
+                delay = min(DOWNLOAD_RETRY_BASE_SECONDS * 2 ** (task.attempts - 1), DOWNLOAD_RETRY_MAX_SECONDS)
+                # Un peu d'aléa pour ne pas relancer toutes les tâches en même temps
+                delay *= random.uniform(0.8, 1.2)
+                logger.warning(f"Download {task.task_id} failed (attempt {task.attempts}/{task.max_attempts}), "
+                               f"retrying in {int(delay)}s: {error}")
+                status = 'pending'
+                self._finish(task, status, error=error,
+                             next_attempt_at=datetime.utcnow() + timedelta(seconds=delay))
+            else:
+                logger.error(f"Download {task.task_id} failed after {task.attempts} attempts: {error}")
+                self._finish(task, 'error', error=error)
+        finally:
+            self.downloader.finish_download(task.task_id, status)
+
+    def _finish(self, task: DownloadTask, status: str, filename: Optional[str] = None,
+                error: Optional[str] = None, next_attempt_at: Optional[datetime] = None):
+        db = SessionLocal()
+        try:
+            # Ne pas écraser une annulation arrivée pendant le téléchargement
+            values = {
+                DownloadTask.status: status,
+                DownloadTask.error: error,
+                DownloadTask.next_attempt_at: next_attempt_at,
+            }
+            if filename:
+                values[DownloadTask.filename] = filename
+            if status != 'pending':
+                values[DownloadTask.finished_at] = datetime.utcnow()
+            updated = (db.query(DownloadTask)
+                       .filter(DownloadTask.task_id == task.task_id, DownloadTask.status != 'cancelled')
+                       .update(values, synchronize_session=False))
+            db.commit()
+        finally:
+            db.close()
+        if not updated and status == 'pending':
+            # Annulée entre l'échec et la replanification: les .part ne serviront plus
+            self.downloader._remove_partial_files(task.video_id)
+        self._publish(task.task_id)
+
+
+download_queue = DownloadQueue(VideoDownloader(MEDIA_PATH))
@@ -0,0 +1,142 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_REGISTRY_MAX_ENTRIES = int(os.getenv("DOWNLOAD_REGISTRY_MAX_ENTRIES", "500"))
+# Durée de conservation en mémoire d'une tâche terminée (l'historique reste en base)
+DOWNLOAD_REGISTRY_TTL = int(os.getenv("DOWNLOAD_REGISTRY_TTL", "300"))
+DOWNLOAD_REGISTRY_SWEEP_SECONDS = int(os.getenv("DOWNLOAD_REGISTRY_SWEEP_SECONDS", "60"))
+
+TERMINAL_STATUSES = ('completed', 'error', 'cancelled')
+
+
+class DownloadState:
+    """Live progress of one download"""
+
+    __slots__ = ('task_id', 'video_id', 'status', 'progress', 'speed', 'eta',
+                 'filename', 'error', 'updated_at', 'finished_at')
+
+    FIELDS = ('task_id', 'video_id', 'status', 'progress', 'speed', 'eta', 'filename', 'error')
+
+    def __init__(self, task_id: str, video_id: Optional[str] = None, status: str = 'downloading'):
+        self.task_id = task_id
+        self.video_id = video_id
+        self.status = status
+        self.progress = 0.0
+        self.speed: Optional[str] = None
+        self.eta: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.error: Optional[str] = None
+        self.updated_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+
+    def update(self, **fields):
+        for key, value in fields.items():
+            setattr(self, key, value)
+        self.updated_at = time.monotonic()
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+
+class DownloadRegistry:
+    """Bounded in-memory registry of running downloads
+
+    Finished tasks are kept for a short TTL only; their history lives in
+    the download_tasks table.
+    """
+
+    def __init__(self, max_entries: int = DOWNLOAD_REGISTRY_MAX_ENTRIES,
+                 ttl: int = DOWNLOAD_REGISTRY_TTL,
+                 sweep_seconds: int = DOWNLOAD_REGISTRY_SWEEP_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.sweep_seconds = sweep_seconds
+        self.records: Dict[str, DownloadState] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.evicted = 0
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._run, name="download-janitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    def create(self, task_id: str, video_id: Optional[str] = None) -> DownloadState:
+        record = DownloadState(task_id, video_id)
+        with self._lock:
+            self.records.pop(task_id, None)
+            self.records[task_id] = record
+            if len(self.records) > self.max_entries:
+                self._evict_overflow()
+        return record
+
+    def get(self, task_id: str) -> Optional[DownloadState]:
+        return self.records.get(task_id)
+
+    def finish(self, task_id: str, status: Optional[str] = None):
+        """Mark a record as done; it is evicted once the TTL has passed"""
+        record = self.records.get(task_id)
+        if record is None:
+            return
+        if status or record.status not in TERMINAL_STATUSES:
+            record.update(status=status or 'completed')
+        record.finished_at = time.monotonic()
+
+    def list(self, statuses: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> List[Dict]:
+        wanted = set(statuses) if statuses else None
+        with self._lock:
+            records = [record for record in self.records.values() if wanted is None or record.status in wanted]
+        records.sort(key=lambda record: record.updated_at, reverse=True)
+        return [record.to_dict() for record in records[:limit]]
+
+    def sweep(self, max_age: Optional[float] = None) -> int:
+        """Drop finished records older than max_age (the TTL by default); returns the count"""
+        cutoff = time.monotonic() - (self.ttl if max_age is None else max_age)
+        with self._lock:
+            expired = [task_id for task_id, record in self.records.items()
+                       if record.finished_at is not None and record.finished_at <= cutoff]
+            for task_id in expired:
+                del self.records[task_id]
+            self.evicted += len(expired)
+            return len(expired)
+
+    def _evict_overflow(self):
+        # Les plus anciennes tâches terminées d'abord; une tâche en cours n'est jamais retirée
+        finished = sorted((record for record in self.records.values() if record.finished_at is not None),
+                          key=lambda record: record.finished_at)
+        for record in finished[:len(self.records) - self.max_entries]:
+            del self.records[record.task_id]
+            self.evicted += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            running = sum(1 for record in self.records.values() if record.finished_at is None)
+            return {
+                'entries': len(self.records),
+                'running': running,
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'evicted': self.evicted,
+            }
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_seconds):
+            try:
+                evicted = self.sweep()
+                if evicted:
+                    logger.info(f"Evicted {evicted} finished downloads from memory")
+            except Exception as e:
+                logger.error(f"Download registry sweep failed: {str(e)}")
@@ -1,20 +1,27 @@
 import os
-import uuid
+import re
 import glob
+import time
+import shutil
+import signal
 import logging
+import threading
 import ssl
 import urllib3
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from sqlalchemy.orm import Session
+from .database import SessionLocal
 from .models import Video
-from .utils.metadata import MetadataExtractor
+from .utils.metadata import MetadataExtractor, LIBRARY_FIELDS
+from .utils.sidecar import load_info_json, find_thumbnail, media_url, info_json_path, DOWNLOAD_WORK_DIR
+from .utils.probe import probe_file
+from .scanner import VIDEO_EXTENSIONS
+from .download_events import download_events, DOWNLOAD_EVENT_MIN_INTERVAL
+from .download_registry import DownloadRegistry
 import json
 import subprocess
-import sys
 
 # Désactiver SSL et warnings
 ssl._create_default_https_context = ssl._create_unverified_context
@@ -22,11 +29,51 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__)
 
+# Délai laissé à un processus enfant après SIGTERM avant SIGKILL
+CANCEL_GRACE_SECONDS = 0.5
+SUBPROCESS_TIMEOUT_SECONDS = 600
+# Options communes: même format et mêmes clients partout pour reprendre le même .part
+DOWNLOAD_FORMAT = 'best[ext=mp4]/best'
+YOUTUBE_EXTRACTOR_ARGS = 'youtube:player_client=android,web,ios;skip=hls'
+# Erreurs définitives: inutile d'essayer les autres méthodes ou de réessayer plus tard.
+# Seuls les messages de l'extracteur ("ERROR: [youtube] <id>: Video unavailable") comptent:
+# un 404 pendant le téléchargement ([download], fragment ou URL expirée) reste temporaire
+PERMANENT_ERROR_PATTERN = re.compile(
+    r"^(?:ERROR: )?\[(?!download\])[\w:]+\] [\w-]+: .*?(?:"
+    r"private video|video unavailable|has been removed|no longer available|account .* terminated"
+    r"|copyright|not available in your country|members[- ]only|join this channel"
+    r"|sign in to confirm your age|does not exist|HTTP Error 404|HTTP Error 410)"
+    r"|^(?:ERROR: )?Unsupported URL:",
+    re.IGNORECASE | re.MULTILINE
+)
+MAX_TITLE_LENGTH = 150
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+class PermanentDownloadError(Exception):
+    """The video cannot be downloaded at all (private, removed, geo-blocked...)"""
+
+
+def is_permanent_error(message: Optional[str]) -> bool:
+    return bool(message) and PERMANENT_ERROR_PATTERN.search(message) is not None
+
+
+def _error_line(stderr: str) -> str:
+    lines = [line for line in (stderr or '').splitlines() if line.strip()]
+    errors = [line for line in lines if 'ERROR' in line]
+    return (errors or lines or ['Unknown error'])[-1].strip()
+
+
 class VideoDownloader:
     def __init__(self, download_path: str):
         self.download_path = download_path
-        self.active_downloads: Dict[str, Dict] = {}
-        self.executor = ThreadPoolExecutor(max_workers=3)
+        # Progression en direct uniquement; l'historique des tâches est en base
+        self.registry = DownloadRegistry()
+        # Un événement par tâche en cours, vérifié par les hooks et les sous-processus
+        self.cancel_events: Dict[str, threading.Event] = {}
         self.metadata_extractor = MetadataExtractor()
         
         # Créer le dossier de téléchargement s'il n'existe pas
@@ -34,9 +81,20 @@ class VideoDownloader:
         
     def _progress_hook(self, task_id: str):
         """Hook pour suivre la progression du téléchargement"""
+        cancel_event = self._cancel_event(task_id)
+        last_update = [0.0]
+
         def hook(d):
+            # Lever depuis le hook interrompt yt-dlp au prochain bloc reçu
+            if cancel_event.is_set():
+                raise DownloadCancelled("Download cancelled by user")
             try:
                 if d['status'] == 'downloading':
+                    # yt-dlp appelle le hook à chaque bloc: limiter la fréquence des mises à jour
+                    now = time.monotonic()
+                    if now - last_update[0] < DOWNLOAD_EVENT_MIN_INTERVAL:
+                        return
+                    last_update[0] = now
                     downloaded = d.get('downloaded_bytes', 0)
                     total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
                     
@@ -62,20 +120,24 @@ class VideoDownloader:
                     else:
                         eta_str = d.get('_eta_str', 'N/A')
                     
-                    self.active_downloads[task_id].update({
-                        'status': 'downloading',
-                        'progress': round(progress, 2),
-                        'speed': speed_str,
-                        'eta': eta_str,
-                        'filename': d.get('filename', '')
-                    })
+                    record = self.registry.get(task_id)
+                    if record is None:
+                        return
+                    record.update(
+                        status='downloading',
+                        progress=round(progress, 2),
+                        speed=speed_str,
+                        eta=eta_str,
+                        filename=d.get('filename', '')
+                    )
+                    download_events.publish(record.to_dict())
                     
                 elif d['status'] == 'finished':
-                    self.active_downloads[task_id].update({
-                        'status': 'processing',
-                        'progress': 100,
-                        'filename': d.get('filename', '')
-                    })
+                    record = self.registry.get(task_id)
+                    if record is None:
+                        return
+                    record.update(status='processing', progress=100, filename=d.get('filename', ''))
+                    download_events.publish(record.to_dict())
                     
             except Exception as e:
                 logger.error(f"Error in progress hook: {str(e)}")
@@ -84,7 +146,6 @@ class VideoDownloader:
 
     def _get_video_id_from_url(self, url: str) -> Optional[str]:
         """Extraire l'ID de la vidéo depuis l'URL YouTube"""
-        import re
         patterns = [
             r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
             r'(?:embed\/)([0-9A-Za-z_-]{11})',
@@ -97,18 +158,67 @@ class VideoDownloader:
                 return match.group(1)
         return None
 
-    def _download_with_yt_dlp(self, url: str, video_id: str) -> Optional[str]:
+    def _work_dir(self, video_id: str) -> str:
+        """Dossier stable par vidéo: toutes les méthodes et tentatives y reprennent le même .part"""
+        return os.path.join(self.download_path, DOWNLOAD_WORK_DIR, video_id)
+
+    def _output_template(self, video_id: str) -> str:
+        # Format dans le nom: un .part n'est jamais repris avec un autre format
+        return os.path.join(self._work_dir(video_id), f"{video_id}.f%(format_id)s.%(ext)s")
+
+    def _find_downloaded_file(self, video_id: str) -> Optional[str]:
+        """Find the downloaded video file in the work dir, ignoring sidecars and partial files"""
+        pattern = os.path.join(glob.escape(self._work_dir(video_id)), "*")
+        files = [f for f in glob.glob(pattern)
+                 if os.path.splitext(f)[1].lower() in VIDEO_EXTENSIONS]
+        if files:
+            return max(files, key=os.path.getctime)
+        return None
+
+    def _finalize(self, filename: str, video_id: str, info: Optional[Dict]) -> str:
+        """Déplacer la vidéo terminée et ses sidecars du dossier de travail vers la bibliothèque"""
+        title = (info or {}).get('title')
+        if title:
+            from yt_dlp.utils import sanitize_filename
+            base = f"{sanitize_filename(title)[:MAX_TITLE_LENGTH]}-{video_id}"
+        else:
+            base = video_id
+        target = os.path.join(self.download_path, base + os.path.splitext(filename)[1])
+
+        sidecar = info_json_path(filename)
+        thumbnail = find_thumbnail(filename)
+        os.replace(filename, target)
+        if sidecar.is_file():
+            os.replace(sidecar, info_json_path(target))
+        if thumbnail:
+            os.replace(thumbnail, os.path.splitext(target)[0] + thumbnail.suffix)
+        self._remove_partial_files(video_id)
+        return target
+
+    @staticmethod
+    def _downloaded_filepath(ydl, info: Dict) -> Optional[str]:
+        """Chemin final (après fusion/post-traitement) donné par yt-dlp, sans parcourir le dossier"""
+        for download in info.get('requested_downloads') or []:
+            if download.get('filepath'):
+                return download['filepath']
+        return info.get('filepath') or ydl.prepare_filename(info)
+
+    def _download_with_yt_dlp(self, url: str, video_id: str, task_id: str) -> Optional[Tuple[str, Optional[Dict]]]:
         """Méthode 1: yt-dlp avec toutes les options SSL désactivées"""
         try:
             import yt_dlp
             
-            output_template = os.path.join(self.download_path, f"%(title)s-{video_id}.%(ext)s")
-            
             ydl_opts = {
-                'outtmpl': output_template,
-                'progress_hooks': [self._progress_hook(video_id)],
-                'format': 'best[ext=mp4]/best',
+                'outtmpl': self._output_template(video_id),
+                'progress_hooks': [self._progress_hook(task_id)],
+                'format': DOWNLOAD_FORMAT,
                 'merge_output_format': 'mp4',
+                # Reprendre un .part laissé par une méthode ou une tentative précédente
+                'continuedl': True,
+                
+                # Sidecars pour une réimportation hors ligne
+                'writeinfojson': True,
+                'writethumbnail': True,
                 
                 # SSL complètement désactivé
                 'no_check_certificate': True,
@@ -138,32 +248,38 @@ class VideoDownloader:
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 logger.info(f"Downloading with yt-dlp: {video_id}")
-                ydl.download([url])
+                # Une seule extraction: le dict retourné sert aussi de métadonnées
+                info = ydl.extract_info(url, download=True)
                 
-                # Chercher le fichier téléchargé
-                pattern = os.path.join(self.download_path, f"*{video_id}*")
-                files = glob.glob(pattern)
-                if files:
-                    filename = max(files, key=os.path.getctime)
+                filename = self._downloaded_filepath(ydl, info) if info else None
+                if filename and os.path.exists(filename):
                     logger.info(f"yt-dlp success: {filename}")
-                    return filename
+                    return filename, info
                     
         except Exception as e:
+            if self._is_cancelled(task_id):
+                raise DownloadCancelled("Download cancelled by user")
+            if is_permanent_error(str(e)):
+                raise PermanentDownloadError(str(e))
             logger.warning(f"yt-dlp failed: {str(e)}")
         
         return None
 
-    def _download_with_subprocess(self, url: str, video_id: str) -> Optional[str]:
+    def _download_with_subprocess(self, url: str, video_id: str, task_id: str) -> Optional[Tuple[str, Optional[Dict]]]:
         """Méthode 2: yt-dlp via subprocess avec variables d'environnement"""
         try:
-            output_template = os.path.join(self.download_path, f"%(title)s-{video_id}.%(ext)s")
-            
             cmd = [
                 'yt-dlp',
                 '--no-check-certificate',
                 '--prefer-insecure',
-                '--format', 'best[ext=mp4]/best',
-                '--output', output_template,
+                '--format', DOWNLOAD_FORMAT,
+                '--extractor-args', YOUTUBE_EXTRACTOR_ARGS,
+                '--output', self._output_template(video_id),
+                '--continue',
+                '--write-info-json',
+                '--write-thumbnail',
+                # Chemin final sur stdout, les métadonnées sont lues dans le sidecar
+                '--print', 'after_move:filepath',
                 '--user-agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
                 '--referer', 'https://www.youtube.com/',
                 '--socket-timeout', '60',
@@ -181,35 +297,38 @@ class VideoDownloader:
             })
             
             logger.info(f"Downloading with subprocess: {video_id}")
-            result = subprocess.run(cmd, capture_output=True, text=True, 
-                                  timeout=600, env=env)
+            returncode, stdout, stderr = self._run_process(cmd, env, task_id)
             
-            if result.returncode == 0:
-                pattern = os.path.join(self.download_path, f"*{video_id}*")
-                files = glob.glob(pattern)
-                if files:
-                    filename = max(files, key=os.path.getctime)
+            if returncode == 0:
+                printed = [line.strip() for line in stdout.splitlines() if line.strip()]
+                filename = printed[-1] if printed else self._find_downloaded_file(video_id)
+                if filename and os.path.exists(filename):
                     logger.info(f"subprocess success: {filename}")
-                    return filename
+                    return filename, None
             else:
-                logger.warning(f"subprocess stderr: {result.stderr}")
+                if is_permanent_error(stderr):
+                    raise PermanentDownloadError(_error_line(stderr))
+                logger.warning(f"subprocess stderr: {stderr}")
                 
+        except (DownloadCancelled, PermanentDownloadError):
+            raise
         except Exception as e:
             logger.warning(f"subprocess failed: {str(e)}")
         
         return None
 
-    def _download_with_youtube_dl(self, url: str, video_id: str) -> Optional[str]:
+    def _download_with_youtube_dl(self, url: str, video_id: str, task_id: str) -> Optional[Tuple[str, Optional[Dict]]]:
         """Méthode 3: youtube-dl en fallback"""
         try:
-            output_template = os.path.join(self.download_path, f"%(title)s-{video_id}.%(ext)s")
-            
             cmd = [
                 'youtube-dl',
                 '--no-check-certificate',
                 '--ignore-errors',
-                '--format', 'best[ext=mp4]/best',
-                '--output', output_template,
+                '--format', DOWNLOAD_FORMAT,
+                '--output', self._output_template(video_id),
+                '--continue',
+                '--write-info-json',
+                '--write-thumbnail',
                 url
             ]
             
@@ -217,81 +336,106 @@ class VideoDownloader:
             env['PYTHONHTTPSVERIFY'] = '0'
             
             logger.info(f"Downloading with youtube-dl: {video_id}")
-            result = subprocess.run(cmd, capture_output=True, text=True, 
-                                  timeout=600, env=env)
+            returncode, _, stderr = self._run_process(cmd, env, task_id)
             
-            if result.returncode == 0:
-                pattern = os.path.join(self.download_path, f"*{video_id}*")
-                files = glob.glob(pattern)
-                if files:
-                    filename = max(files, key=os.path.getctime)
+            if returncode == 0:
+                # youtube-dl n'a pas d'option --print: recherche dans le dossier de travail
+                filename = self._find_downloaded_file(video_id)
+                if filename:
                     logger.info(f"youtube-dl success: {filename}")
-                    return filename
+                    return filename, None
+            elif is_permanent_error(stderr):
+                raise PermanentDownloadError(_error_line(stderr))
+            else:
+                logger.warning(f"youtube-dl stderr: {stderr}")
                     
+        except (DownloadCancelled, PermanentDownloadError):
+            raise
         except Exception as e:
             logger.warning(f"youtube-dl failed: {str(e)}")
         
         return None
 
-    async def download_video(self, url: str, quality: str = "best", db: Session = None) -> str:
-        """Démarrer le téléchargement d'une vidéo et retourner l'ID de la tâche"""
-        task_id = str(uuid.uuid4())
-        
-        self.active_downloads[task_id] = {
-            'task_id': task_id,
-            'status': 'pending',
-            'progress': 0,
-            'speed': None,
-            'eta': None,
-            'filename': None,
-            'error': None
-        }
-        
-        loop = asyncio.get_event_loop()
-        loop.run_in_executor(
-            self.executor,
-            self._download_video_sync,
-            url,
-            quality,
-            task_id,
-            db
-        )
-        
-        return task_id
+    def _run_process(self, cmd: List[str], env: Dict[str, str], task_id: str,
+                     timeout: int = SUBPROCESS_TIMEOUT_SECONDS) -> Tuple[int, str, str]:
+        """Lancer cmd dans son propre groupe de processus, interrompu dès l'annulation"""
+        cancel_event = self._cancel_event(task_id)
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   text=True, env=env, start_new_session=True)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                try:
+                    stdout, stderr = process.communicate(timeout=0.2)
+                    return process.returncode, stdout, stderr
+                except subprocess.TimeoutExpired:
+                    if cancel_event.is_set():
+                        raise DownloadCancelled("Download cancelled by user")
+                    if time.monotonic() > deadline:
+                        raise subprocess.TimeoutExpired(cmd, timeout)
+        finally:
+            if process.poll() is None:
+                self._kill_process_group(process)
+
+    def _kill_process_group(self, process: subprocess.Popen):
+        """SIGTERM puis SIGKILL à tout le groupe (yt-dlp lance ffmpeg en enfant)"""
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                break
+            try:
+                process.wait(timeout=CANCEL_GRACE_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                continue
+        # Vider le pipe pour ne pas laisser de processus zombie
+        process.communicate()
+
+    def _remove_partial_files(self, video_id: str):
+        """Supprimer le dossier de travail d'une vidéo (.part, fragments, sidecars)"""
+        work_dir = self._work_dir(video_id)
+        if os.path.isdir(work_dir):
+            shutil.rmtree(work_dir, ignore_errors=True)
+            logger.info(f"Removed partial files: {work_dir}")
 
-    def _download_video_sync(self, url: str, quality: str, task_id: str, db: Session = None):
-        """Fonction de téléchargement avec plusieurs méthodes de fallback"""
+    def download(self, task_id: str, url: str, quality: str = "best", video_id: Optional[str] = None) -> Dict:
+        """Télécharger une vidéo (appelé par un worker de la file), lève une exception en cas d'échec"""
+        video_id = video_id or self._get_video_id_from_url(url)
+        if not video_id:
+            raise ValueError("Could not extract video ID from URL")
+
+        # Progression en direct, la tâche elle-même est persistée par la file
+        record = self.registry.create(task_id, video_id)
+
+        # Session propre au thread du worker
+        db = SessionLocal()
         try:
-            video_id = self._get_video_id_from_url(url)
-            if not video_id:
-                raise ValueError("Could not extract video ID from URL")
-            
             logger.info(f"FORCE DOWNLOAD starting for: {video_id}")
-            
+
             # Vérifier si existe déjà
-            if db:
-                existing_video = db.query(Video).filter(Video.id == video_id).first()
-                if existing_video:
-                    self.active_downloads[task_id]['status'] = 'completed'
-                    self.active_downloads[task_id]['error'] = 'Video already exists in library'
-                    return
-            
-            self.active_downloads[task_id]['status'] = 'downloading'
-            self.active_downloads[task_id]['progress'] = 10
-            
+            existing_video = db.query(Video).filter(Video.id == video_id).first()
+            if existing_video:
+                record.update(status='completed', progress=100, filename=existing_video.file_path)
+                return {'filename': existing_video.file_path, 'message': 'Video already exists in library'}
+
+            record.update(progress=10)
+
             # Essayer les différentes méthodes
             methods = [
                 self._download_with_yt_dlp,
                 self._download_with_subprocess,
                 self._download_with_youtube_dl
             ]
-            
-            filename = None
+
+            filename, info = None, None
             for i, method in enumerate(methods, 1):
+                if self._is_cancelled(task_id):
+                    raise DownloadCancelled("Download cancelled by user")
                 logger.info(f"Trying method {i}/{len(methods)}: {method.__name__}")
-                self.active_downloads[task_id]['progress'] = 10 + (i * 20)
-                
-                filename = method(url, video_id)
+                record.update(progress=10 + (i * 20))
+
+                filename, info = method(url, video_id, task_id) or (None, None)
                 if filename and os.path.exists(filename):
                     file_size = os.path.getsize(filename)
                     if file_size > 1024:  # Au moins 1KB
@@ -299,31 +443,51 @@ class VideoDownloader:
                         break
                     else:
                         os.remove(filename)
-                        filename = None
-            
-            if filename and os.path.exists(filename):
-                self.active_downloads[task_id]['filename'] = filename
-                self.active_downloads[task_id]['progress'] = 90
-                
-                # Récupérer les métadonnées
-                metadata = self.metadata_extractor.get_metadata(video_id)
-                
-                # Ajouter à la base de données
-                if db:
-                    self._add_video_to_db(filename, video_id, metadata or {}, db)
-                
-                self.active_downloads[task_id]['status'] = 'completed'
-                self.active_downloads[task_id]['progress'] = 100
-                
-                logger.info(f"✅ DOWNLOAD COMPLETED: {filename}")
-            else:
+                        filename, info = None, None
+
+            if not (filename and os.path.exists(filename)):
                 raise Exception("All download methods failed")
-                
+            # Dernier point où une annulation est encore prise en compte
+            if self._is_cancelled(task_id):
+                raise DownloadCancelled("Download cancelled by user")
+
+            info = info or load_info_json(filename)
+            filename = self._finalize(filename, video_id, info)
+
+            record.update(status='processing', filename=filename, progress=max(record.progress or 0, 90))
+            download_events.publish(record.to_dict())
+
+            # Métadonnées issues de l'extraction du téléchargement, sinon du sidecar;
+            # un nouvel appel réseau seulement si aucun des deux n'est disponible
+            if info:
+                metadata = self.metadata_extractor.summarize_info(info)
+                self.metadata_extractor.cache.store(video_id, metadata)
+            else:
+                metadata = self.metadata_extractor.get_metadata(video_id, LIBRARY_FIELDS)
+
+            # Ajouter à la base de données
+            self._add_video_to_db(filename, video_id, metadata or {}, db)
+
+            record.update(status='completed', progress=100)
+            logger.info(f"✅ DOWNLOAD COMPLETED: {filename}")
+            return {'filename': filename, 'message': None}
+
+        except DownloadCancelled:
+            logger.info(f"Download cancelled: {task_id}")
+            record.update(status='cancelled', error='Download cancelled by user')
+            self._remove_partial_files(video_id)
+            raise
+        except PermanentDownloadError as e:
+            logger.error(f"❌ DOWNLOAD FAILED for {task_id} (permanent): {str(e)}")
+            record.update(status='error', error=str(e))
+            self._remove_partial_files(video_id)
+            raise
         except Exception as e:
-            error_msg = str(e)
-            logger.error(f"❌ DOWNLOAD FAILED for {task_id}: {error_msg}")
-            self.active_downloads[task_id]['status'] = 'error'
-            self.active_downloads[task_id]['error'] = error_msg
+            logger.error(f"❌ DOWNLOAD FAILED for {task_id}: {str(e)}")
+            record.update(status='error', error=str(e))
+            raise
+        finally:
+            db.close()
 
     def _add_video_to_db(self, file_path: str, video_id: str, metadata: dict, db: Session):
         """Ajouter la vidéo téléchargée à la base de données"""
@@ -346,8 +510,19 @@ class VideoDownloader:
                 added_date=datetime.utcnow()
             )
             
+            probe = probe_file(file_path) or {}
+            if probe.get('resolution'):
+                video.resolution = probe['resolution']
+            if not video.duration and probe.get('duration'):
+                video.duration = probe['duration']
+            video.video_codec = probe.get('codec')
+            
+            thumbnail = find_thumbnail(file_path)
+            if thumbnail:
+                video.thumbnail_url = media_url(thumbnail) or video.thumbnail_url
+            
             if metadata.get('tags'):
-                video.tags = json.dumps(metadata['tags'][:50])
+                video.tags = json.dumps(metadata['tags'][:50], ensure_ascii=False)
             
             if metadata.get('upload_date'):
                 try:
@@ -364,17 +539,43 @@ class VideoDownloader:
             db.rollback()
 
     def get_download_status(self, task_id: str) -> Optional[Dict]:
-        return self.active_downloads.get(task_id)
+        record = self.registry.get(task_id)
+        return record.to_dict() if record else None
 
-    def get_all_downloads(self) -> Dict[str, Dict]:
-        return self.active_downloads
+    def get_all_downloads(self, statuses: Optional[List[str]] = None, limit: Optional[int] = None) -> List[Dict]:
+        return self.registry.list(statuses, limit)
+
+    def _cancel_event(self, task_id: str) -> threading.Event:
+        return self.cancel_events.setdefault(task_id, threading.Event())
+
+    def _is_cancelled(self, task_id: str) -> bool:
+        event = self.cancel_events.get(task_id)
+        return event is not None and event.is_set()
+
+    def claim_download(self, task_id: str):
+        """Créer l'événement d'annulation dès la réservation, avant même le démarrage de download()"""
+        self._cancel_event(task_id)
 
     def cancel_download(self, task_id: str) -> bool:
-        if task_id in self.active_downloads:
-            self.active_downloads[task_id]['status'] = 'cancelled'
-            self.active_downloads[task_id]['error'] = 'Download cancelled by user'
+        """Demander l'arrêt d'un téléchargement en cours; le worker libère sa place aussitôt"""
+        # Seules les tâches réservées ont un événement: une tâche terminée n'en recrée pas
+        event = self.cancel_events.get(task_id)
+        if event is not None:
+            event.set()
+        record = self.registry.get(task_id)
+        if record is not None:
+            record.update(status='cancelled', error='Download cancelled by user')
             return True
         return False
 
-    def cleanup_old_downloads(self, hours: int = 24):
-        pass
\ No newline at end of file
+    def finish_download(self, task_id: str, status: Optional[str] = None):
+        """Fin de tâche: la progression en direct expire après le TTL du registre (l'état reste en base)"""
+        record = self.registry.get(task_id)
+        # Abandon définitif: les fichiers partiels ne serviront plus
+        if status == 'error' and record is not None and record.video_id:
+            self._remove_partial_files(record.video_id)
+        self.registry.finish(task_id, status)
+        self.cancel_events.pop(task_id, None)
+
+    def cleanup_old_downloads(self, hours: int = 24) -> int:
+        return self.registry.sweep(max_age=hours * 3600)
\ No newline at end of file
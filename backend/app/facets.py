@@ -0,0 +1,120 @@
+import logging
+from typing import List, Dict
+from sqlalchemy import select, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query, Session
+from .models import Video, Channel, VideoTag, Tag
+
+logger = logging.getLogger(__name__)
+
+# Tags d'une vidéo sous forme de lignes; un JSON invalide donne une liste vide
+NEW_VIDEO_TAG_ROWS = """SELECT DISTINCT new.id, trim(j.value) FROM json_each(
+        CASE WHEN json_valid(new.tags) THEN new.tags ELSE '[]' END
+    ) AS j WHERE j.type = 'text' AND trim(j.value) != ''"""
+ALL_VIDEO_TAG_ROWS = """SELECT DISTINCT videos.id, trim(j.value) FROM videos, json_each(
+        CASE WHEN json_valid(videos.tags) THEN videos.tags ELSE '[]' END
+    ) AS j WHERE j.type = 'text' AND trim(j.value) != ''"""
+
+_tags_enabled = False
+
+CHANNEL_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS videos_channels_ai AFTER INSERT ON videos
+    WHEN new.channel_name IS NOT NULL BEGIN
+        INSERT INTO channels(name, channel_id, video_count) VALUES (new.channel_name, new.channel_id, 1)
+        ON CONFLICT(name) DO UPDATE SET video_count = video_count + 1,
+            channel_id = coalesce(excluded.channel_id, channels.channel_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS videos_channels_ad AFTER DELETE ON videos
+    WHEN old.channel_name IS NOT NULL BEGIN
+        UPDATE channels SET video_count = video_count - 1 WHERE name = old.channel_name;
+        DELETE FROM channels WHERE name = old.channel_name AND video_count <= 0;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS videos_channels_au AFTER UPDATE OF channel_name ON videos
+    WHEN old.channel_name IS NOT new.channel_name BEGIN
+        UPDATE channels SET video_count = video_count - 1 WHERE name = old.channel_name;
+        DELETE FROM channels WHERE name = old.channel_name AND video_count <= 0;
+        INSERT INTO channels(name, channel_id, video_count)
+        SELECT new.channel_name, new.channel_id, 1 WHERE new.channel_name IS NOT NULL
+        ON CONFLICT(name) DO UPDATE SET video_count = video_count + 1;
+    END""",
+]
+
+TAG_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS videos_tags_ai AFTER INSERT ON videos BEGIN
+        INSERT OR IGNORE INTO video_tags(video_id, tag) {NEW_VIDEO_TAG_ROWS};
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS videos_tags_ad AFTER DELETE ON videos BEGIN
+        DELETE FROM video_tags WHERE video_id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS videos_tags_au AFTER UPDATE OF tags ON videos
+    WHEN old.tags IS NOT new.tags BEGIN
+        DELETE FROM video_tags WHERE video_id = old.id;
+        INSERT OR IGNORE INTO video_tags(video_id, tag) {NEW_VIDEO_TAG_ROWS};
+    END""",
+    # Compteurs par tag, maintenus ligne par ligne
+    """CREATE TRIGGER IF NOT EXISTS video_tags_count_ai AFTER INSERT ON video_tags BEGIN
+        INSERT INTO tags(name, video_count) VALUES (new.tag, 1)
+        ON CONFLICT(name) DO UPDATE SET video_count = video_count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS video_tags_count_ad AFTER DELETE ON video_tags BEGIN
+        UPDATE tags SET video_count = video_count - 1 WHERE name = old.tag;
+        DELETE FROM tags WHERE name = old.tag AND video_count <= 0;
+    END""",
+]
+
+
+def setup_facets(engine: Engine):
+    """Install the triggers that keep channels, video_tags and tags in sync with videos"""
+    global _tags_enabled
+    _tags_enabled = False
+    if engine.dialect.name != "sqlite":
+        logger.warning("Facet tables are only maintained on SQLite")
+        return
+
+    with engine.begin() as conn:
+        for statement in CHANNEL_TRIGGERS:
+            conn.exec_driver_sql(statement)
+        try:
+            conn.exec_driver_sql("SELECT json_valid('[]')")
+        except Exception:
+            logger.warning("SQLite was built without JSON1, tag facets are disabled")
+            return
+        for statement in TAG_TRIGGERS:
+            conn.exec_driver_sql(statement)
+    _tags_enabled = True
+
+
+def backfill_facets(conn):
+    """Fill the facet tables from rows that existed before the triggers"""
+    conn.exec_driver_sql("DELETE FROM video_tags")
+    conn.exec_driver_sql("DELETE FROM tags")
+    conn.exec_driver_sql("DELETE FROM channels")
+    conn.exec_driver_sql(
+        "INSERT INTO channels(name, channel_id, video_count) "
+        "SELECT channel_name, max(channel_id), count(*) FROM videos "
+        "WHERE channel_name IS NOT NULL GROUP BY channel_name"
+    )
+    if _tags_enabled:
+        # Les triggers de video_tags calculent les compteurs de tags
+        conn.exec_driver_sql(f"INSERT OR IGNORE INTO video_tags(video_id, tag) {ALL_VIDEO_TAG_ROWS}")
+
+
+def apply_tag_filter(query: Query, tags: List[str], match_all: bool = True) -> Query:
+    """Keep videos carrying all (or any) of tags, through the video_tags index"""
+    tags = list(dict.fromkeys(tag.strip() for tag in tags if tag.strip()))
+    if not tags:
+        return query
+    tagged = select(VideoTag.video_id).where(VideoTag.tag.in_(tags))
+    if match_all and len(tags) > 1:
+        tagged = tagged.group_by(VideoTag.video_id).having(func.count(VideoTag.tag) == len(tags))
+    return query.filter(Video.id.in_(tagged))
+
+
+def get_facets(db: Session, limit: int = 50) -> Dict[str, List[Dict]]:
+    """Largest channels and tags, read from the incrementally maintained counters"""
+    channels = db.query(Channel).order_by(Channel.video_count.desc(), Channel.name).limit(limit).all()
+    tags = db.query(Tag).order_by(Tag.video_count.desc(), Tag.name).limit(limit).all()
+    return {
+        'channels': [{'name': c.name, 'channel_id': c.channel_id, 'count': c.video_count} for c in channels],
+        'tags': [{'name': t.name, 'count': t.video_count} for t in tags],
+    }
@@ -0,0 +1,99 @@
+import time
+import threading
+from datetime import date, datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Optional
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .models import Video
+
+# Les clients doivent revalider à chaque fois, mais un 304 ne coûte presque rien
+LIBRARY_CACHE_CONTROL = "private, no-cache"
+
+
+class LibraryGeneration:
+    """Monotonic counter bumped after every committed write to the videos table
+
+    Seeded with the boot time so ETags issued by a previous process never
+    match. Assumes a single API process, like the provided uvicorn commands.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = time.time_ns() // 1_000_000
+        self.modified_at = datetime.now(timezone.utc)
+
+    def bump(self):
+        with self._lock:
+            self.value += 1
+            self.modified_at = datetime.now(timezone.utc)
+
+    def cache_headers(self, variant: Optional[str] = None) -> Dict[str, str]:
+        with self._lock:
+            value, modified_at = self.value, self.modified_at
+        tag = f"lib-{value}-{variant}" if variant else f"lib-{value}"
+        return {
+            "ETag": f'W/"{tag}"',
+            "Last-Modified": format_datetime(modified_at, usegmt=True),
+            "Cache-Control": LIBRARY_CACHE_CONTROL,
+        }
+
+
+library_generation = LibraryGeneration()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def library_cache(request: Request, response: Response) -> Dict[str, str]:
+    """Dependency for read endpoints: 304 before any query when the client is up to date"""
+    # Lire la génération avant la requête: une écriture concurrente invalide au pire trop tôt
+    return _revalidate(request, response, library_generation.cache_headers())
+
+
+def daily_library_cache(request: Request, response: Response) -> Dict[str, str]:
+    """Like library_cache, for responses that also depend on the current date"""
+    # Fenêtres relatives à aujourd'hui: l'ETag change à minuit même sans écriture
+    return _revalidate(request, response, library_generation.cache_headers(date.today().isoformat()))
+
+
+def _revalidate(request: Request, response: Response, headers: Dict[str, str]) -> Dict[str, str]:
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return headers
+
+
+# Les écritures sont repérées au flush et comptées seulement si la transaction est validée
+@event.listens_for(Session, "after_flush")
+def _flag_library_writes(session, flush_context):
+    if any(isinstance(obj, Video) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["library_changed"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_bulk_library_writes(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is Video:
+        orm_execute_state.session.info["library_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_library_generation(session):
+    if session.info.pop("library_changed", False):
+        library_generation.bump()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_library_writes(session):
+    session.info.pop("library_changed", None)
@@ -0,0 +1,344 @@
+import json
+import zlib
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import DateTime, Boolean, bindparam, delete, exists, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from .database import SessionLocal, engine
+from .models import Video, VideoDeletion, FileState
+from .generation import library_generation
+from .query_cache import query_cache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 2000
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+MAX_REPORTED_ERRORS = 100
+# Taille maximale d'un bloc décompressé passé à l'import
+DECODE_CHUNK_SIZE = 256 * 1024
+
+VIDEO_COLUMNS = {column.key: column for column in Video.__table__.columns}
+DATETIME_COLUMNS = {key for key, column in VIDEO_COLUMNS.items() if isinstance(column.type, DateTime)}
+BOOLEAN_COLUMNS = {key for key, column in VIDEO_COLUMNS.items() if isinstance(column.type, Boolean)}
+
+
+# Pierres tombales: chaque suppression de vidéo est datée, une réinsertion l'efface.
+# Horodatage UTC au format de SQLAlchemy (microsecondes sur 6 chiffres)
+DELETION_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS videos_deletions_ad AFTER DELETE ON videos BEGIN
+        INSERT OR REPLACE INTO video_deletions(video_id, deleted_at)
+        VALUES (old.id, strftime('%Y-%m-%d %H:%M:%f000', 'now'));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS videos_deletions_ai AFTER INSERT ON videos BEGIN
+        DELETE FROM video_deletions WHERE video_id = new.id;
+    END""",
+]
+
+
+class UnsupportedCompression(ValueError):
+    pass
+
+
+def setup_deletions(engine: Engine):
+    """Install the triggers that record deleted videos for incremental exports"""
+    if engine.dialect.name != "sqlite":
+        logger.warning("Deletions are only recorded on SQLite, incremental exports will not carry them")
+        return
+    with engine.begin() as conn:
+        for statement in DELETION_TRIGGERS:
+            conn.exec_driver_sql(statement)
+
+
+def _dumps(row: Dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(row) + b"\n"
+    return json.dumps(row, ensure_ascii=False, default=str).encode() + b"\n"
+
+
+def _loads(line: bytes) -> Dict:
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+def _compressor(compression: str):
+    """Object with compress()/flush() for the requested format, None for plain NDJSON"""
+    if compression == 'gzip':
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise UnsupportedCompression("zstd export requires the zstandard package")
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    if compression != 'none':
+        raise UnsupportedCompression(f"compression must be one of: {', '.join(COMPRESSIONS)}")
+    return None
+
+
+class StreamDecoder:
+    """Decompress pushed chunks and pass the output to sink in pieces of at most max_length bytes
+
+    A small compressed body can expand to hundreds of MB: it is never
+    decompressed in one call, so memory stays flat whatever the input.
+    """
+
+    def __init__(self, compression: str, sink: Callable[[bytes], None],
+                 max_length: int = DECODE_CHUNK_SIZE):
+        self.sink = sink
+        self.max_length = max_length
+        self._zlib = None
+        self._zstd = None
+        if compression == 'gzip':
+            self._zlib = zlib.decompressobj(47)  # gzip ou zlib, détecté automatiquement
+        elif compression == 'zstd':
+            if zstandard is None:
+                raise UnsupportedCompression("zstd import requires the zstandard package")
+            self._zstd = zstandard.ZstdDecompressor().stream_writer(
+                _SinkWriter(sink), write_size=max_length, closefd=False)
+        elif compression != 'none':
+            raise UnsupportedCompression(f"compression must be one of: {', '.join(COMPRESSIONS)}")
+
+    def write(self, chunk: bytes):
+        if self._zstd is not None:
+            self._zstd.write(chunk)
+        elif self._zlib is not None:
+            data = chunk
+            while True:
+                output = self._zlib.decompress(data, self.max_length)
+                if output:
+                    self.sink(output)
+                data = self._zlib.unconsumed_tail
+                # Sortie plafonnée: il peut rester des octets à produire même sans entrée
+                if not data and len(output) < self.max_length:
+                    break
+        elif chunk:
+            self.sink(chunk)
+
+    def close(self):
+        if self._zstd is not None:
+            self._zstd.flush()
+        elif self._zlib is not None:
+            output = self._zlib.flush()
+            if output:
+                self.sink(output)
+
+
+class _SinkWriter:
+    """File-like target for zstandard's stream_writer"""
+
+    def __init__(self, sink: Callable[[bytes], None]):
+        self.sink = sink
+
+    def write(self, data: bytes) -> int:
+        self.sink(bytes(data))
+        return len(data)
+
+
+def video_row(video: Video) -> Dict:
+    row = {}
+    for key in VIDEO_COLUMNS:
+        value = getattr(video, key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        row[key] = value
+    return row
+
+
+def export_lines(since: Optional[datetime] = None, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Yield one NDJSON line per video, streaming rows from the database
+
+    With since, only videos changed after it are exported, followed by a
+    {"id": ..., "deleted": true, "deleted_at": ...} line for each video
+    deleted after it, so replaying incremental exports also removes them.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(Video)
+        if since is not None:
+            query = query.filter(or_(Video.updated_at >= since, Video.updated_at.is_(None)))
+        for video in query.order_by(Video.id).yield_per(batch_size):
+            yield _dumps(video_row(video))
+            # Les objets déjà écrits ne doivent pas rester dans la session
+            db.expunge(video)
+
+        if since is not None:
+            deletions = (db.query(VideoDeletion.video_id, VideoDeletion.deleted_at)
+                         .filter(VideoDeletion.deleted_at >= since)
+                         .order_by(VideoDeletion.video_id).yield_per(batch_size))
+            for video_id, deleted_at in deletions:
+                yield _dumps({'id': video_id, 'deleted': True, 'deleted_at': deleted_at.isoformat()})
+    finally:
+        db.close()
+
+
+def export_stream(since: Optional[datetime] = None, compression: str = 'none',
+                  chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+    """Export as NDJSON chunks of about chunk_size bytes, optionally compressed"""
+    compressor = _compressor(compression)
+    buffer: List[bytes] = []
+    buffered = 0
+    for line in export_lines(since):
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= chunk_size:
+            data = b"".join(buffer)
+            buffer, buffered = [], 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    data = b"".join(buffer)
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
+def _coerce(row: Dict) -> Dict:
+    values = {}
+    for key, value in row.items():
+        if key not in VIDEO_COLUMNS:
+            continue
+        if key in DATETIME_COLUMNS and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        elif key in BOOLEAN_COLUMNS and value is not None:
+            value = bool(value)
+        values[key] = value
+    if not values.get('id') or not values.get('file_path'):
+        raise ValueError("id and file_path are required")
+    # Valeurs par défaut du modèle, que l'INSERT en Core n'applique pas aux clés fournies à None
+    values.setdefault('added_date', datetime.utcnow())
+    values.setdefault('updated_at', datetime.utcnow())
+    values.setdefault('watched', False)
+    values.setdefault('local_views', 0)
+    return values
+
+
+def _coerce_deletion(row: Dict) -> Dict:
+    if not row.get('id') or not isinstance(row.get('deleted_at'), str):
+        raise ValueError("id and deleted_at are required for a deletion")
+    return {'b_id': row['id'], 'b_deleted_at': datetime.fromisoformat(row['deleted_at'])}
+
+
+class LibraryImporter:
+    """Parse NDJSON lines and upsert them in large batches
+
+    A row only replaces an existing video when its updated_at is not older,
+    so re-importing an old backup never undoes newer changes. Deletion lines
+    from incremental exports follow the same rule.
+    """
+
+    def __init__(self, batch_size: int = IMPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.pending: List[Dict] = []
+        self.deletions: List[Dict] = []
+        self._partial = b""
+        self.line_number = 0
+        self.results = {'rows': 0, 'deleted': 0, 'invalid': 0, 'batches': 0, 'errors': []}
+
+    def feed(self, data: bytes):
+        """Add raw NDJSON bytes, writing each full batch; lines may be split across calls"""
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self.add_line(line)
+            if len(self.pending) + len(self.deletions) >= self.batch_size:
+                self.flush()
+
+    def add_line(self, line: bytes):
+        self.line_number += 1
+        if not line.strip():
+            return
+        try:
+            row = _loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("expected a JSON object")
+            if row.get('deleted'):
+                self.deletions.append(_coerce_deletion(row))
+            else:
+                self.pending.append(_coerce(row))
+        except (ValueError, TypeError) as e:
+            self.results['invalid'] += 1
+            if len(self.results['errors']) < MAX_REPORTED_ERRORS:
+                self.results['errors'].append(f"Line {self.line_number}: {str(e)}")
+
+    def flush(self):
+        """Write pending rows and deletions in one transaction"""
+        if not self.pending and not self.deletions:
+            return
+        rows, self.pending = self.pending, []
+        deletions, self.deletions = self.deletions, []
+        with engine.begin() as conn:
+            if rows:
+                self._upsert(conn, rows)
+            if deletions:
+                self._delete(conn, deletions)
+        self.results['batches'] += 1
+
+    def _upsert(self, conn, rows: List[Dict]):
+        # executemany: toutes les lignes du lot doivent avoir les mêmes colonnes
+        keys = set().union(*rows)
+        rows = [{key: row.get(key) for key in keys} for row in rows]
+
+        statement = sqlite_insert(Video.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Video.__table__.c.id],
+            set_={key: statement.excluded[key] for key in keys if key != 'id'},
+            where=or_(Video.__table__.c.updated_at.is_(None),
+                      statement.excluded.updated_at >= Video.__table__.c.updated_at),
+        )
+        conn.execute(statement, rows)
+        self.results['rows'] += len(rows)
+
+    def _delete(self, conn, deletions: List[Dict]):
+        """Apply tombstones, unless the local video was changed after the deletion"""
+        videos = Video.__table__
+        deleted = conn.execute(
+            delete(videos).where(
+                videos.c.id == bindparam('b_id'),
+                or_(videos.c.updated_at.is_(None),
+                    videos.c.updated_at <= bindparam('b_deleted_at', type_=DateTime)),
+            ),
+            deletions,
+        ).rowcount
+        # Oublier l'état des fichiers pour qu'un prochain scan puisse les réimporter
+        file_states = FileState.__table__
+        conn.execute(
+            delete(file_states).where(
+                file_states.c.video_id == bindparam('b_id'),
+                ~exists(select(videos.c.id).where(videos.c.id == bindparam('b_id'))),
+            ),
+            [{'b_id': deletion['b_id']} for deletion in deletions],
+        )
+        self.results['deleted'] += max(deleted, 0)
+
+    def finish(self) -> Dict:
+        if self._partial:
+            self.add_line(self._partial)
+            self._partial = b""
+        self.flush()
+        # Écriture hors session ORM: invalider explicitement caches et ETags
+        if self.results['rows'] or self.results['deleted']:
+            query_cache.clear()
+            library_generation.bump()
+        return self.results
+
+
+def import_chunks(chunks: Iterable[bytes], compression: str = 'none',
+                  batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+    """Import an iterable of (possibly compressed) NDJSON chunks"""
+    importer = LibraryImporter(batch_size)
+    decoder = StreamDecoder(compression, importer.feed)
+    for chunk in chunks:
+        decoder.write(chunk)
+    decoder.close()
+    return importer.finish()
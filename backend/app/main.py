@@ -2,11 +2,18 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from .database import engine, Base
-from .api import videos, scanner, download
+from .api import videos, scanner, download, stats, library
+from .migrations import run_migrations
+from .compression import CompressionMiddleware
+from .watcher import LibraryWatcher, WATCH_MEDIA
+from .playback import playback_tracker
+from .maintenance import database_maintenance
+from .download_queue import download_queue
 import os
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(title="YouTube Library API", version="1.0.0")
 
@@ -17,19 +24,66 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
-    expose_headers=["*"]
+    # "*" n'est pas honoré pour les requêtes avec credentials: lister les en-têtes lus par le client
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "Last-Modified", "Content-Disposition"]
 )
 
+# Compression des réponses JSON (les listes de vidéos sont volumineuses)
+app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(videos.router, prefix="/api", tags=["videos"])
 app.include_router(scanner.router, prefix="/api", tags=["scanner"])
 app.include_router(download.router, prefix="/api", tags=["download"])
+app.include_router(stats.router, prefix="/api", tags=["stats"])
+app.include_router(library.router, prefix="/api", tags=["library"])
 
 # Serve video files
 MEDIA_PATH = os.getenv("MEDIA_PATH", "/opt/youtube-videos")
 if os.path.exists(MEDIA_PATH):
     app.mount("/media", StaticFiles(directory=MEDIA_PATH), name="media")
 
+# Ingestion en direct des fichiers ajoutés dans MEDIA_PATH
+library_watcher = LibraryWatcher(MEDIA_PATH) if WATCH_MEDIA and os.path.exists(MEDIA_PATH) else None
+
+@app.on_event("startup")
+def start_library_watcher():
+    if library_watcher:
+        library_watcher.start()
+
+@app.on_event("shutdown")
+def stop_library_watcher():
+    if library_watcher:
+        library_watcher.stop()
+
+# Écriture groupée des positions de lecture
+@app.on_event("startup")
+def start_playback_tracker():
+    playback_tracker.start()
+
+@app.on_event("shutdown")
+def stop_playback_tracker():
+    # Vide aussi le tampon avant l'arrêt
+    playback_tracker.stop()
+
+# PRAGMA optimize et checkpoint WAL périodiques
+@app.on_event("startup")
+def start_database_maintenance():
+    database_maintenance.start()
+
+@app.on_event("shutdown")
+def stop_database_maintenance():
+    database_maintenance.stop()
+
+# File de téléchargement persistante: reprend les tâches interrompues au démarrage
+@app.on_event("startup")
+def start_download_queue():
+    download_queue.start()
+
+@app.on_event("shutdown")
+def stop_download_queue():
+    download_queue.stop()
+
 @app.get("/")
 def read_root():
     return {"message": "YouTube Library API", "version": "1.0.0", "status": "running"}
@@ -0,0 +1,52 @@
+import os
+import logging
+import threading
+from typing import Optional
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+DB_MAINTENANCE_INTERVAL = int(os.getenv("DB_MAINTENANCE_INTERVAL", "3600"))
+
+
+class DatabaseMaintenance:
+    """Periodically refresh planner statistics and checkpoint the WAL"""
+
+    def __init__(self, interval: int = DB_MAINTENANCE_INTERVAL):
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if engine.dialect.name != "sqlite" or self.interval <= 0:
+            return
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        # Dernier passage à l'arrêt
+        if engine.dialect.name == "sqlite":
+            self.run_once()
+
+    def run_once(self):
+        try:
+            with engine.connect() as conn:
+                conn.exec_driver_sql("PRAGMA optimize")
+                # PASSIVE: ne bloque ni lecteurs ni écrivains
+                busy, log_frames, checkpointed = conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)").first()
+            logger.debug(f"Database maintenance: {checkpointed}/{log_frames} WAL frames checkpointed")
+        except Exception as e:
+            logger.warning(f"Database maintenance failed: {str(e)}")
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.run_once()
+
+
+database_maintenance = DatabaseMaintenance()
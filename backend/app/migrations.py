@@ -0,0 +1,72 @@
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+from .database import Base
+from .search import setup_fulltext
+from .facets import setup_facets, backfill_facets
+from .stats import setup_stats, backfill_stats
+from .library_io import setup_deletions
+
+logger = logging.getLogger(__name__)
+
+# Migrations de données, appliquées une seule fois et dans l'ordre
+DATA_MIGRATIONS = [
+    ("0001_backfill_facets", backfill_facets),
+    ("0002_backfill_stats", backfill_stats),
+    ("0003_backfill_updated_at", lambda conn: conn.exec_driver_sql(
+        "UPDATE videos SET updated_at = added_date WHERE updated_at IS NULL"
+    )),
+]
+
+def run_migrations(engine: Engine):
+    """Bring an existing database up to date with the models"""
+    _add_missing_columns(engine)
+    _create_missing_indexes(engine)
+    setup_fulltext(engine)
+    setup_facets(engine)
+    setup_stats(engine)
+    setup_deletions(engine)
+    _run_data_migrations(engine)
+
+def _add_missing_columns(engine: Engine):
+    """create_all() ne modifie pas les tables existantes: ajouter les nouvelles colonnes"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                logger.info(f"Added column {table.name}.{column.name}")
+
+def _create_missing_indexes(engine: Engine):
+    """Créer les index déclarés sur des tables qui existaient déjà"""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+def _run_data_migrations(engine: Engine):
+    """Appliquer les migrations de données pas encore enregistrées dans schema_migrations"""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR PRIMARY KEY, applied_at DATETIME)"
+        )
+        applied = {row[0] for row in conn.exec_driver_sql("SELECT name FROM schema_migrations")}
+        for name, migration in DATA_MIGRATIONS:
+            if name in applied:
+                continue
+            migration(conn)
+            conn.exec_driver_sql(
+                "INSERT INTO schema_migrations (name, applied_at) VALUES (?, CURRENT_TIMESTAMP)", (name,)
+            )
+            logger.info(f"Applied data migration {name}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, Index, func, literal_column
 from .database import Base
 from datetime import datetime
 
@@ -9,7 +9,7 @@ class Video(Base):
     file_path = Column(String, nullable=False)
     title = Column(String)
     thumbnail_url = Column(String)
-    channel_name = Column(String)
+    channel_name = Column(String, index=True)
     channel_id = Column(String)
     duration = Column(Integer)  # in seconds
     upload_date = Column(DateTime)
@@ -18,8 +18,111 @@ class Video(Base):
     like_count = Column(Integer, default=0)
     tags = Column(Text)  # JSON string
     resolution = Column(String)
+    video_codec = Column(String)
     file_size = Column(Integer)  # in bytes
     added_date = Column(DateTime, default=datetime.utcnow)
     last_watched = Column(DateTime, nullable=True)
-    watched = Column(Boolean, default=False)
+    watched = Column(Boolean, default=False, index=True)
     local_views = Column(Integer, default=0)
+    playback_position = Column(Integer, nullable=True)  # in seconds, for resume
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+# Clés de tri de /api/videos; les NULL sont remplacés par une sentinelle
+# pour que les comparaisons de curseur puissent utiliser les index
+SORT_NULL_SENTINELS = {'upload_date': '', 'title': '', 'duration': -1, 'last_watched': ''}
+SORT_EXPRESSIONS = {
+    'added_date': Video.added_date,
+    'upload_date': func.coalesce(Video.upload_date, literal_column("''")),
+    'title': func.coalesce(Video.title, literal_column("''")),
+    'duration': func.coalesce(Video.duration, literal_column("-1")),
+    'last_watched': func.coalesce(Video.last_watched, literal_column("''")),
+}
+for _sort, _expression in SORT_EXPRESSIONS.items():
+    Index(f"ix_videos_sort_{_sort}", _expression, Video.id)
+
+class FileState(Base):
+    __tablename__ = "file_states"
+
+    path = Column(String, primary_key=True)
+    size = Column(Integer, nullable=False)
+    mtime_ns = Column(Integer, nullable=False)
+    inode = Column(Integer)
+    fingerprint = Column(String, index=True)
+    video_id = Column(String, index=True)
+    last_seen = Column(DateTime, default=datetime.utcnow)
+
+# Tables de facettes, tenues à jour par des triggers SQLite (voir facets.py)
+class Channel(Base):
+    __tablename__ = "channels"
+
+    name = Column(String, primary_key=True)
+    channel_id = Column(String)
+    video_count = Column(Integer, nullable=False, default=0, index=True)
+
+class VideoTag(Base):
+    __tablename__ = "video_tags"
+
+    video_id = Column(String, primary_key=True)
+    tag = Column(String, primary_key=True)
+
+Index("ix_video_tags_tag_video_id", VideoTag.tag, VideoTag.video_id)
+
+class Tag(Base):
+    __tablename__ = "tags"
+
+    name = Column(String, primary_key=True)
+    video_count = Column(Integer, nullable=False, default=0, index=True)
+
+# Compteurs de statistiques, tenus à jour par des triggers SQLite (voir stats.py)
+class LibraryStats(Base):
+    __tablename__ = "library_stats"
+
+    id = Column(Integer, primary_key=True)
+    video_count = Column(Integer, nullable=False, default=0)
+    watched_count = Column(Integer, nullable=False, default=0)
+    total_bytes = Column(Integer, nullable=False, default=0)
+    total_duration = Column(Integer, nullable=False, default=0)  # in seconds
+
+class ChannelStats(Base):
+    __tablename__ = "channel_stats"
+
+    channel_name = Column(String, primary_key=True)
+    video_count = Column(Integer, nullable=False, default=0)
+    watched_count = Column(Integer, nullable=False, default=0)
+    total_bytes = Column(Integer, nullable=False, default=0, index=True)
+    total_duration = Column(Integer, nullable=False, default=0)
+
+# Suppressions récentes, pour que les exports incrémentaux les transmettent (voir library_io.py)
+class VideoDeletion(Base):
+    __tablename__ = "video_deletions"
+
+    video_id = Column(String, primary_key=True)
+    deleted_at = Column(DateTime, nullable=False, index=True)
+
+class WatchActivity(Base):
+    __tablename__ = "watch_activity"
+
+    day = Column(String, primary_key=True)  # YYYY-MM-DD
+    views = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+
+class DownloadTask(Base):
+    __tablename__ = "download_tasks"
+
+    task_id = Column(String, primary_key=True)
+    video_id = Column(String, nullable=False, index=True)
+    url = Column(String, nullable=False)
+    quality = Column(String, default="best")
+    priority = Column(Integer, nullable=False, default=0)  # plus grand = plus tôt
+    status = Column(String, nullable=False, default="pending")  # pending, downloading, processing, completed, error, cancelled
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    next_attempt_at = Column(DateTime, nullable=True)
+    filename = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+# File d'attente: prochaine tâche par statut, priorité puis ancienneté
+Index("ix_download_tasks_queue", DownloadTask.status, DownloadTask.priority.desc(), DownloadTask.created_at)
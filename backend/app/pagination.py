@@ -0,0 +1,82 @@
+import json
+import base64
+from datetime import datetime
+from typing import Dict, Optional, Any
+from sqlalchemy import or_, literal, DateTime, Integer, String
+from sqlalchemy.orm import Query
+from .models import Video, SORT_EXPRESSIONS, SORT_NULL_SENTINELS
+
+SORT_FIELDS = tuple(SORT_EXPRESSIONS)
+DATETIME_SORTS = {'added_date', 'upload_date', 'last_watched'}
+RELEVANCE = 'relevance'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(payload, dict) or 's' not in payload:
+        raise InvalidCursor("Invalid cursor")
+    return payload
+
+
+def _sort_value(sort: str, value):
+    """Typed bind value for a sort key, NULL replaced by the index sentinel"""
+    if value is None:
+        sentinel = SORT_NULL_SENTINELS.get(sort)
+        return literal(sentinel, Integer if isinstance(sentinel, int) else String)
+    if sort in DATETIME_SORTS:
+        return literal(datetime.fromisoformat(value), DateTime)
+    if sort == 'duration':
+        return literal(int(value), Integer)
+    return literal(value, String)
+
+
+def apply_keyset(query: Query, sort: str, descending: bool, cursor: Optional[Dict[str, Any]]) -> Query:
+    """Order by (sort key, id) and start right after the cursor position
+
+    Comparisons on the same expressions as the sort indexes let SQLite
+    seek directly to the page, so every page costs the same.
+    """
+    expression = SORT_EXPRESSIONS[sort]
+    if cursor is not None:
+        if cursor.get('s') != sort or cursor.get('d') != descending or 'id' not in cursor:
+            raise InvalidCursor("Cursor does not match the requested sort")
+        try:
+            value = _sort_value(sort, cursor.get('v'))
+        except (ValueError, TypeError):
+            raise InvalidCursor("Invalid cursor")
+        last_id = literal(cursor['id'], String)
+        # Forme développée de (clé, id) < (v, id): SQLite ne sait pas utiliser
+        # un index d'expression pour une comparaison de row values
+        if descending:
+            query = query.filter(expression <= value, or_(expression < value, Video.id < last_id))
+        else:
+            query = query.filter(expression >= value, or_(expression > value, Video.id > last_id))
+
+    if descending:
+        return query.order_by(expression.desc(), Video.id.desc())
+    return query.order_by(expression.asc(), Video.id.asc())
+
+
+def keyset_cursor(video: Video, sort: str, descending: bool) -> str:
+    value = getattr(video, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return encode_cursor({'s': sort, 'd': descending, 'v': value, 'id': video.id})
+
+
+def offset_cursor(offset: int) -> str:
+    """Cursor for relevance-ranked search results, which have no stable key"""
+    return encode_cursor({'s': RELEVANCE, 'off': offset})
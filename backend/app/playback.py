@@ -0,0 +1,189 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import update, select, bindparam, case, and_, func, Boolean, DateTime, Integer
+from .database import engine
+from .models import Video
+from .generation import library_generation
+from .query_cache import query_cache, video_tag, LIST_TAG
+
+logger = logging.getLogger(__name__)
+
+PLAYBACK_FLUSH_SECONDS = float(os.getenv("PLAYBACK_FLUSH_SECONDS", "10"))
+PLAYBACK_MAX_PENDING = int(os.getenv("PLAYBACK_MAX_PENDING", "500"))
+# Fraction de la durée au-delà de laquelle une vidéo est marquée comme vue
+PLAYBACK_WATCHED_THRESHOLD = float(os.getenv("PLAYBACK_WATCHED_THRESHOLD", "0.9"))
+# Sans progression pendant ce délai, la lecture suivante compte comme une nouvelle vue
+PLAYBACK_SESSION_GAP = int(os.getenv("PLAYBACK_SESSION_GAP", "1800"))
+
+
+class PendingProgress:
+    __slots__ = ('position', 'duration', 'watched', 'started_at')
+
+    def __init__(self):
+        self.position = 0
+        self.duration: Optional[int] = None
+        self.watched = False
+        # Début d'une nouvelle vue, pas encore écrit en base
+        self.started_at: Optional[datetime] = None
+
+
+class PlaybackTracker:
+    """Buffer playback progress in memory and write it in one batched transaction"""
+
+    def __init__(self, flush_seconds: float = PLAYBACK_FLUSH_SECONDS,
+                 max_pending: int = PLAYBACK_MAX_PENDING,
+                 threshold: float = PLAYBACK_WATCHED_THRESHOLD,
+                 session_gap: int = PLAYBACK_SESSION_GAP):
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.threshold = threshold
+        self.session_gap = session_gap
+        self.pending: Dict[str, PendingProgress] = {}
+        self.last_seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.flushes = 0
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._run, name="playback-flush", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.flush()
+
+    def is_tracking(self, video_id: str) -> bool:
+        """True when video_id reported progress recently, so it is known to exist"""
+        with self._lock:
+            return video_id in self.pending or video_id in self.last_seen
+
+    def record(self, video_id: str, position: float, duration: Optional[float] = None,
+               completed: bool = False) -> Dict:
+        """Coalesce a progress report with earlier ones for the same video"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self.pending.get(video_id)
+            if entry is None:
+                entry = self.pending[video_id] = PendingProgress()
+            last_seen = self.last_seen.get(video_id)
+            if last_seen is None or now - last_seen > self.session_gap:
+                entry.started_at = entry.started_at or datetime.utcnow()
+            self.last_seen[video_id] = now
+            entry.position = max(0, int(position))
+            if duration:
+                entry.duration = int(duration)
+            if completed or (entry.duration and entry.position >= entry.duration * self.threshold):
+                entry.watched = True
+            state = {'video_id': video_id, 'position': entry.position, 'watched': entry.watched or None}
+            overflow = len(self.pending) >= self.max_pending
+        if overflow:
+            self._wakeup.set()
+        return state
+
+    def pending_position(self, video_id: str) -> Optional[int]:
+        with self._lock:
+            entry = self.pending.get(video_id)
+            return entry.position if entry else None
+
+    def flush(self) -> int:
+        """Write all buffered progress in a single transaction; returns the number of videos"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self.pending = self.pending, {}
+                self._forget_idle()
+            if not pending:
+                return 0
+
+            rows = [
+                {
+                    'b_id': video_id,
+                    'b_position': entry.position,
+                    'b_started_at': entry.started_at,
+                    'b_views': 1 if entry.started_at else 0,
+                    'b_watched': entry.watched,
+                }
+                for video_id, entry in pending.items()
+            ]
+            # Une seule requête préparée, exécutée pour chaque ligne (executemany)
+            videos = Video.__table__
+            position = bindparam('b_position', type_=Integer)
+            statement = (
+                update(videos)
+                .where(videos.c.id == bindparam('b_id'))
+                .values(
+                    playback_position=position,
+                    last_watched=func.coalesce(bindparam('b_started_at', type_=DateTime), videos.c.last_watched),
+                    local_views=func.coalesce(videos.c.local_views, 0) + bindparam('b_views', type_=Integer),
+                    watched=case(
+                        (bindparam('b_watched', type_=Boolean), True),
+                        (and_(videos.c.duration > 0, position >= videos.c.duration * self.threshold), True),
+                        else_=videos.c.watched,
+                    ),
+                )
+            )
+            ids = list(pending)
+            try:
+                with engine.begin() as conn:
+                    # Repérer les vidéos que ce flush fait passer à "vue" (seuil calculé en SQL)
+                    unwatched = [row.id for row in conn.execute(
+                        select(videos.c.id).where(videos.c.id.in_(ids), func.coalesce(videos.c.watched, False).is_(False))
+                    )]
+                    conn.execute(statement, rows)
+                    newly_watched = bool(unwatched) and conn.execute(
+                        select(func.count()).where(videos.c.id.in_(unwatched), videos.c.watched.is_(True))
+                    ).scalar() > 0
+            except Exception as e:
+                logger.error(f"Playback flush failed: {str(e)}")
+                self._requeue(pending)
+                return 0
+
+            self.flushes += 1
+            # Écriture hors session ORM: invalider explicitement caches et ETags.
+            # La position seule ne change que la vidéo concernée (lue via /progress):
+            # listes et ETags ne sont invalidés que si watched, last_watched ou local_views changent
+            tags = {video_tag(video_id) for video_id in pending}
+            if newly_watched or any(entry.started_at for entry in pending.values()):
+                tags.add(LIST_TAG)
+                library_generation.bump()
+            query_cache.invalidate(tags)
+            return len(rows)
+
+    def _requeue(self, pending: Dict[str, PendingProgress]):
+        with self._lock:
+            for video_id, entry in pending.items():
+                newer = self.pending.get(video_id)
+                if newer is None:
+                    self.pending[video_id] = entry
+                else:
+                    newer.started_at = newer.started_at or entry.started_at
+                    newer.watched = newer.watched or entry.watched
+
+    def _forget_idle(self):
+        cutoff = time.monotonic() - self.session_gap
+        for video_id in [video_id for video_id, seen in self.last_seen.items() if seen < cutoff]:
+            del self.last_seen[video_id]
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Playback flush failed: {str(e)}")
+
+
+playback_tracker = PlaybackTracker()
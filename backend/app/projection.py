@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Query, load_only
+from .models import Video
+from .schemas import Video as VideoSchema, VideoListItem
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+VIDEO_FIELDS = tuple(VideoSchema.model_fields)
+COMPACT_FIELDS = tuple(VideoListItem.model_fields)
+# Champs calculés par la requête, absents de la table videos
+COMPUTED_FIELDS = {'snippet'}
+
+
+def parse_fields(fields: Optional[str], compact: bool = False) -> Tuple[str, ...]:
+    """Requested output fields, in schema order; raises ValueError on unknown names"""
+    if not fields:
+        return COMPACT_FIELDS if compact else VIDEO_FIELDS
+    requested = {field.strip() for field in fields.split(',') if field.strip()}
+    unknown = requested - set(VIDEO_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add('id')
+    return tuple(field for field in VIDEO_FIELDS if field in requested)
+
+
+def apply_projection(query: Query, fields: Iterable[str], extra: Iterable[str] = ()) -> Query:
+    """Load only the columns needed for fields (plus extra, e.g. the sort key)"""
+    needed = (set(fields) | set(extra)) - COMPUTED_FIELDS
+    if needed >= set(VIDEO_FIELDS) - COMPUTED_FIELDS:
+        return query
+    return query.options(load_only(*(getattr(Video, name) for name in sorted(needed))))
+
+
+def video_to_dict(video: Video, fields: Iterable[str]) -> Dict:
+    item = {}
+    for field in fields:
+        value = getattr(video, field, None)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        item[field] = value
+    return item
+
+
+def videos_response(videos: List[Video], fields: Tuple[str, ...], headers: Optional[Dict[str, str]] = None):
+    """Serialize rows straight to JSON, without building a pydantic model per item"""
+    return FastJSONResponse([video_to_dict(video, fields) for video in videos], headers=headers)
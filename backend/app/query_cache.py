@@ -0,0 +1,191 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Set
+from fastapi import Response
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from .models import Video
+
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "512"))
+QUERY_CACHE_MAX_MB = int(os.getenv("QUERY_CACHE_MAX_MB", "32"))
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "300"))
+
+# Tags d'invalidation: pages de liste, compteurs de chaînes/tags, une vidéo précise
+LIST_TAG = "videos:list"
+FACETS_TAG = "facets"
+ALL_TAGS = "*"
+
+# Colonnes qui changent le contenu ou l'ordre d'une page de liste
+LIST_COLUMNS = {'title', 'description', 'channel_name', 'tags', 'watched',
+                'added_date', 'upload_date', 'duration', 'last_watched'}
+FACET_COLUMNS = {'channel_name', 'channel_id', 'tags'}
+
+
+def video_tag(video_id: str) -> str:
+    return f"video:{video_id}"
+
+
+class CachedResponse:
+    __slots__ = ('body', 'headers', 'tags', 'expires', 'size')
+
+    def __init__(self, body: bytes, headers: Dict[str, str], tags: Set[str], expires: float):
+        self.body = body
+        self.headers = headers
+        self.tags = tags
+        self.expires = expires
+        self.size = sys.getsizeof(body) + sum(len(k) + len(v) for k, v in headers.items())
+
+    def response(self, headers: Optional[Dict[str, str]] = None) -> Response:
+        return Response(content=self.body, media_type="application/json",
+                        headers={**self.headers, **(headers or {})})
+
+
+class QueryCache:
+    """Bounded LRU of serialized responses, invalidated by tag when videos change"""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+                 max_bytes: int = QUERY_CACHE_MAX_MB * 1024 * 1024, ttl: int = QUERY_CACHE_TTL):
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._by_tag: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Incrémenté à chaque invalidation: un résultat calculé avant n'est pas stocké
+        self.version = 0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0,
+                          'invalidations': 0, 'stale_writes': 0}
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= time.monotonic():
+                self._remove(key)
+                self._counters['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry
+
+    def set(self, key: Hashable, body: bytes, tags: Iterable[str], version: int,
+            headers: Optional[Dict[str, str]] = None):
+        """Store body unless an invalidation happened since version was read"""
+        if self.max_entries == 0:
+            return
+        entry = CachedResponse(body, dict(headers or {}), set(tags), time.monotonic() + self.ttl)
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version:
+                self._counters['stale_writes'] += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            for tag in entry.tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._counters['evictions'] += 1
+
+    def invalidate(self, tags: Iterable[str]):
+        tags = set(tags)
+        if not tags:
+            return
+        with self._lock:
+            self.version += 1
+            if ALL_TAGS in tags:
+                keys = set(self._entries)
+            else:
+                keys = set()
+                for tag in tags:
+                    keys |= self._by_tag.get(tag, set())
+            for key in keys:
+                self._remove(key)
+            self._counters['invalidations'] += len(keys)
+
+    def clear(self):
+        self.invalidate({ALL_TAGS})
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            stats['memory_bytes'] = self._bytes
+            stats['max_memory_bytes'] = self.max_bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+query_cache = QueryCache()
+
+
+# Les tags touchés sont collectés au flush et appliqués seulement au commit
+def _pending_tags(session: Optional[Session]) -> Set[str]:
+    if session is None:
+        return set()
+    return session.info.setdefault("query_cache_tags", set())
+
+
+@event.listens_for(Video, "after_insert")
+def _video_inserted(mapper, connection, target):
+    _pending_tags(object_session(target)).update({LIST_TAG, FACETS_TAG})
+
+
+@event.listens_for(Video, "after_update")
+def _video_updated(mapper, connection, target):
+    state = inspect(target)
+    changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+    tags = {video_tag(target.id)}
+    if changed & LIST_COLUMNS:
+        tags.add(LIST_TAG)
+    if changed & FACET_COLUMNS:
+        tags.add(FACETS_TAG)
+    _pending_tags(object_session(target)).update(tags)
+
+
+@event.listens_for(Video, "after_delete")
+def _video_deleted(mapper, connection, target):
+    _pending_tags(object_session(target)).update({video_tag(target.id), LIST_TAG, FACETS_TAG})
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bulk_video_write(orm_execute_state):
+    # query.update()/delete() ne déclenchent pas les événements du mapper
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is Video:
+        _pending_tags(orm_execute_state.session).add(ALL_TAGS)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session):
+    tags = session.info.pop("query_cache_tags", None)
+    if tags:
+        query_cache.invalidate(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session):
+    session.info.pop("query_cache_tags", None)
@@ -0,0 +1,128 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from .database import SessionLocal
+from .scanner import VideoScanner
+
+logger = logging.getLogger(__name__)
+
+# Nombre de scans terminés gardés pour consultation
+MAX_FINISHED_SCAN_JOBS = 50
+
+
+class ScanJob:
+    def __init__(self, path: str, recursive: bool):
+        self.job_id = str(uuid.uuid4())
+        self.path = path
+        self.recursive = recursive
+        self.status = 'pending'  # pending, running, completed, cancelled, error
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.results = VideoScanner.new_results()
+        self.cancel_event = threading.Event()
+        self._started = None
+        self._finished = None
+
+    def mark_running(self):
+        self.status = 'running'
+        self.started_at = datetime.utcnow()
+        self._started = time.monotonic()
+
+    def mark_finished(self, status: str):
+        self.status = status
+        self.finished_at = datetime.utcnow()
+        self._finished = time.monotonic()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ('pending', 'running')
+
+    def to_dict(self) -> Dict:
+        results = self.results
+        processed = (results['videos_added'] + results['videos_skipped']
+                     + results['videos_unchanged'] + len(results['errors']))
+        elapsed = ((self._finished or time.monotonic()) - self._started) if self._started else 0
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'path': self.path,
+            'recursive': self.recursive,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'files_seen': results['videos_found'],
+            'videos_added': results['videos_added'],
+            'videos_skipped': results['videos_skipped'],
+            'videos_unchanged': results['videos_unchanged'],
+            'videos_removed': results['videos_removed'],
+            'videos_moved': results['videos_moved'],
+            'videos_errored': len(results['errors']),
+            'files_per_second': round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+            'duplicates': results['duplicates'],
+            'errors': list(results['errors']),
+        }
+
+
+class ScanJobManager:
+    """Run scans in background threads, one active scan per root"""
+
+    def __init__(self):
+        self.jobs: "OrderedDict[str, ScanJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, path: str, recursive: bool = True) -> Tuple[ScanJob, bool]:
+        """Start a scan of path; returns (job, created), reusing an active scan of the same root"""
+        root = os.path.abspath(path)
+        with self._lock:
+            for job in self.jobs.values():
+                if job.path == root and job.active:
+                    return job, False
+
+            job = ScanJob(root, recursive)
+            self.jobs[job.job_id] = job
+            self._evict_finished()
+
+        thread = threading.Thread(target=self._run, args=(job,), name=f"scan-{job.job_id[:8]}", daemon=True)
+        thread.start()
+        return job, True
+
+    def get(self, job_id: str) -> Optional[ScanJob]:
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[ScanJob]:
+        return list(self.jobs.values())
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if not job:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def _run(self, job: ScanJob):
+        job.mark_running()
+        status = 'error'
+        db = SessionLocal()
+        try:
+            scanner = VideoScanner(db, cancel_event=job.cancel_event)
+            scanner.scan_directory(job.path, job.recursive, results=job.results)
+            status = 'cancelled' if job.results['cancelled'] else 'completed'
+        except Exception as e:
+            logger.error(f"Scan {job.job_id} failed: {str(e)}")
+            job.results['errors'].append(f"Scan failed: {str(e)}")
+        finally:
+            db.close()
+            job.mark_finished(status)
+            logger.info(f"Scan {job.job_id} {job.status}: {job.results['videos_added']} added")
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_SCAN_JOBS)]:
+            del self.jobs[job_id]
+
+
+scan_jobs = ScanJobManager()
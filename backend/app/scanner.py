@@ -1,70 +1,463 @@
 import os
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from .models import Video
-from .utils.metadata import MetadataExtractor
+from .models import Video, FileState
+from .utils.metadata import MetadataExtractor, LIBRARY_FIELDS
+from .utils.sidecar import load_info_json, find_thumbnail, media_url, DOWNLOAD_WORK_DIR
+from .utils.probe import probe_file, probe_files, probe_pool
+from .utils.fingerprint import compute_fingerprint
 from datetime import datetime
 import json
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Nombre de requêtes de métadonnées en parallèle et taille des transactions
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "8"))
+SCAN_BATCH_SIZE = int(os.getenv("SCAN_BATCH_SIZE", "200"))
+# Sonde des en-têtes locaux sur un pool de processus (0 = dans les threads)
+SCAN_PROBE_WORKERS = int(os.getenv("SCAN_PROBE_WORKERS", str(os.cpu_count() or 1)))
+SCAN_PROBE_POOL_MIN_FILES = 64
+
+VIDEO_EXTENSIONS = {'.mp4', '.mkv', '.webm', '.avi', '.mov', '.flv'}
+
 class VideoScanner:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, metadata_extractor: Optional[MetadataExtractor] = None,
+                 max_workers: Optional[int] = None, batch_size: Optional[int] = None,
+                 probe_workers: Optional[int] = None,
+                 cancel_event: Optional[threading.Event] = None):
         self.db = db
-        self.metadata_extractor = MetadataExtractor()
-        self.video_extensions = {'.mp4', '.mkv', '.webm', '.avi', '.mov', '.flv'}
-    
-    def scan_directory(self, directory: str, recursive: bool = True) -> Dict:
-        """Scan directory for video files"""
-        results = {
+        self.metadata_extractor = metadata_extractor or MetadataExtractor()
+        self.max_workers = max(1, max_workers or SCAN_WORKERS)
+        self.batch_size = max(1, batch_size or SCAN_BATCH_SIZE)
+        self.probe_workers = SCAN_PROBE_WORKERS if probe_workers is None else probe_workers
+        self.video_extensions = set(VIDEO_EXTENSIONS)
+        self.cancel_event = cancel_event or threading.Event()
+        self._fingerprints: Dict[str, Optional[str]] = {}
+        self._probe_pool = None
+
+    @staticmethod
+    def new_results() -> Dict:
+        return {
             'videos_found': 0,
             'videos_added': 0,
-            'errors': []
+            'videos_skipped': 0,
+            'videos_unchanged': 0,
+            'videos_removed': 0,
+            'videos_moved': 0,
+            'duplicates': [],
+            'errors': [],
+            'cancelled': False
         }
-        
+
+    def scan_directory(self, directory: str, recursive: bool = True,
+                       results: Optional[Dict] = None) -> Dict:
+        """Scan directory for video files, skipping files unchanged since the last scan
+
+        results is updated in place while the scan runs, so callers can pass
+        their own dict to follow progress from another thread.
+        """
+        if results is None:
+            results = self.new_results()
+        try:
+            return self._scan(directory, recursive, results)
+        finally:
+            self._close_probe_pool()
+
+    def _scan(self, directory: str, recursive: bool, results: Dict) -> Dict:
         path = Path(directory)
         if not path.exists():
             results['errors'].append(f"Directory {directory} does not exist")
             return results
-        
-        # Get all video files
-        if recursive:
-            video_files = [f for f in path.rglob('*') if f.suffix.lower() in self.video_extensions]
-        else:
-            video_files = [f for f in path.iterdir() if f.is_file() and f.suffix.lower() in self.video_extensions]
-        
-        results['videos_found'] = len(video_files)
-        
-        for file_path in video_files:
+
+        root = os.path.abspath(directory)
+        video_files = self._walk(root, recursive, results)
+        # Un parcours incomplet ferait passer des fichiers pour supprimés
+        if self.cancel_event.is_set():
+            results['cancelled'] = True
+            return results
+
+        # Comparer avec l'index persistant (taille, mtime, inode)
+        states = self._load_file_states(root, recursive)
+        changed: Dict[str, os.stat_result] = {}
+        new_paths = set()
+        for file_path, file_stat in video_files.items():
+            state = states.pop(file_path, None)
+            if state is not None and self._is_unchanged(state, file_stat):
+                results['videos_unchanged'] += 1
+            else:
+                changed[file_path] = file_stat
+                if state is None:
+                    new_paths.add(file_path)
+
+        # Empreintes des fichiers nouveaux ou modifiés, calculées en parallèle
+        self._fingerprints = self._compute_fingerprints(list(changed))
+
+        # Un fichier disparu et un nouveau de même empreinte: déplacement
+        for file_path in self._relocate_moved(new_paths, changed, states, results):
+            del changed[file_path]
+
+        # Les entrées restantes correspondent à des fichiers disparus
+        for state in states.values():
+            logger.info(f"File removed: {state.path}")
+            self.db.delete(state)
+        results['videos_removed'] = len(states)
+        self.db.commit()
+
+        # Résoudre les IDs avant toute requête réseau
+        candidates: Dict[str, Path] = {}
+        for file_path in changed:
+            file_path = Path(file_path)
+            video_id = self.metadata_extractor.extract_video_id(file_path.name)
+            if not video_id:
+                error_msg = f"Error processing {file_path.name}: Could not extract YouTube ID from filename"
+                logger.error(error_msg)
+                results['errors'].append(error_msg)
+            elif video_id in candidates:
+                results['videos_skipped'] += 1
+                self._record_file_state(file_path, changed[str(file_path)], video_id)
+            else:
+                candidates[video_id] = file_path
+
+        existing_ids = self._existing_ids(list(candidates))
+        results['videos_skipped'] += len(existing_ids)
+        modified: Dict[str, Path] = {}
+        for video_id, known_path in existing_ids.items():
+            file_path = candidates[video_id]
+            relocated = self._relocate_stale_path(video_id, known_path, file_path)
+            if relocated:
+                results['videos_moved'] += 1
+            # Fichier de la vidéo modifié (réencodé, remplacé...), pas une copie ailleurs
+            if relocated or known_path == str(file_path):
+                modified[video_id] = file_path
+            self._record_file_state(file_path, changed[str(file_path)], video_id)
+        self._refresh_modified(modified, changed)
+        self.db.commit()
+
+        pending = [(file_path, video_id, changed[str(file_path)])
+                   for video_id, file_path in candidates.items()
+                   if video_id not in existing_ids]
+
+        self._build_and_insert(pending, results)
+        results['duplicates'] = self._find_duplicates(root)
+        results['cancelled'] = self.cancel_event.is_set()
+        return results
+
+    def _compute_fingerprints(self, paths: List[str]) -> Dict[str, Optional[str]]:
+        if not paths:
+            return {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(paths, executor.map(compute_fingerprint, paths)))
+
+    def _relocate_moved(self, new_paths: set, changed: Dict[str, os.stat_result],
+                        missing: Dict[str, FileState], results: Dict) -> List[str]:
+        """Point videos whose file disappeared at a new file with the same fingerprint
+
+        The video row keeps its watch history and metadata; only file_path
+        and the file state move. Returns the paths handled this way.
+        """
+        by_fingerprint = {state.fingerprint: state for state in missing.values()
+                          if state.video_id and state.fingerprint}
+        by_inode = {(state.inode, state.size): state for state in missing.values()
+                    if state.video_id and state.inode}
+
+        relocated = []
+        for file_path in sorted(new_paths):
+            file_stat = changed[file_path]
+            fingerprint = self._fingerprints.get(file_path)
+            old_state = by_fingerprint.get(fingerprint) if fingerprint else None
+            if old_state is None:
+                old_state = by_inode.get((file_stat.st_ino, file_stat.st_size))
+                # Inode réutilisé par un autre fichier
+                if old_state is not None and old_state.fingerprint and old_state.fingerprint != fingerprint:
+                    old_state = None
+            if old_state is None or old_state.path not in missing:
+                continue
+
+            video = self.db.get(Video, old_state.video_id)
+            if video is not None:
+                logger.info(f"File moved: {old_state.path} -> {file_path}")
+                video.file_path = file_path
+                results['videos_moved'] += 1
+            del missing[old_state.path]
+            self.db.delete(old_state)
+            self.db.flush()
+            self._record_file_state(Path(file_path), file_stat, old_state.video_id)
+            relocated.append(file_path)
+
+        self.db.commit()
+        return relocated
+
+    def _relocate_stale_path(self, video_id: str, known_path: Optional[str], file_path: Path) -> bool:
+        """Update file_path of a known video when its recorded file no longer exists"""
+        if not known_path or known_path == str(file_path) or os.path.exists(known_path):
+            return False
+        logger.info(f"File moved: {known_path} -> {file_path}")
+        self.db.query(Video).filter(Video.id == video_id).update(
+            {Video.file_path: str(file_path)}, synchronize_session=False
+        )
+        return True
+
+    def _find_duplicates(self, root: str) -> List[List[str]]:
+        """Groups of files under root sharing the same fingerprint"""
+        prefix = os.path.join(root, '')
+        duplicated = (
+            self.db.query(FileState.fingerprint)
+            .filter(FileState.fingerprint.isnot(None))
+            .group_by(FileState.fingerprint)
+            .having(func.count(FileState.path) > 1)
+            .subquery()
+        )
+        rows = (
+            self.db.query(FileState.fingerprint, FileState.path)
+            .filter(FileState.fingerprint.in_(select(duplicated.c.fingerprint)))
+            .filter(FileState.path.startswith(prefix, autoescape=True))
+            .order_by(FileState.fingerprint, FileState.path)
+            .all()
+        )
+        groups: Dict[str, List[str]] = {}
+        for fingerprint, path in rows:
+            groups.setdefault(fingerprint, []).append(path)
+        return [paths for paths in groups.values() if len(paths) > 1]
+
+    def _walk(self, root: str, recursive: bool, results: Dict) -> Dict[str, os.stat_result]:
+        """Collect video files under root with a single stat() per file"""
+        files: Dict[str, os.stat_result] = {}
+        stack = [root]
+        while stack and not self.cancel_event.is_set():
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if recursive and entry.name != DOWNLOAD_WORK_DIR:
+                                    stack.append(entry.path)
+                            elif os.path.splitext(entry.name)[1].lower() in self.video_extensions:
+                                files[entry.path] = entry.stat()
+                                results['videos_found'] += 1
+                        except OSError as e:
+                            logger.warning(f"Cannot stat {entry.path}: {str(e)}")
+            except OSError as e:
+                logger.warning(f"Cannot read directory {current}: {str(e)}")
+        return files
+
+    def _load_file_states(self, root: str, recursive: bool) -> Dict[str, FileState]:
+        """Load the persisted file states located under root"""
+        prefix = os.path.join(root, '')
+        query = self.db.query(FileState).filter(FileState.path.startswith(prefix, autoescape=True))
+        states = {}
+        for state in query:
+            if recursive or os.path.dirname(state.path) == root:
+                states[state.path] = state
+        return states
+
+    @staticmethod
+    def _is_unchanged(state: FileState, file_stat: os.stat_result) -> bool:
+        return (state.size == file_stat.st_size
+                and state.mtime_ns == file_stat.st_mtime_ns
+                and state.inode == file_stat.st_ino)
+
+    def _record_file_state(self, file_path: Path, file_stat: os.stat_result, video_id: str):
+        """Insert or refresh the file state row for a processed file"""
+        state = self.db.get(FileState, str(file_path))
+        if state is None:
+            state = FileState(path=str(file_path))
+            self.db.add(state)
+        if str(file_path) in self._fingerprints:
+            state.fingerprint = self._fingerprints[str(file_path)]
+        elif state.fingerprint is None or not self._is_unchanged(state, file_stat):
+            state.fingerprint = compute_fingerprint(str(file_path))
+        state.size = file_stat.st_size
+        state.mtime_ns = file_stat.st_mtime_ns
+        state.inode = file_stat.st_ino
+        state.video_id = video_id
+        state.last_seen = datetime.utcnow()
+
+    def _existing_ids(self, video_ids: List[str]) -> Dict[str, str]:
+        """Map the video_ids already present in the database to their file_path"""
+        existing = {}
+        # SQLite limite le nombre de paramètres par requête
+        for i in range(0, len(video_ids), 500):
+            chunk = video_ids[i:i + 500]
+            rows = self.db.query(Video.id, Video.file_path).filter(Video.id.in_(chunk)).all()
+            existing.update((row[0], row[1]) for row in rows)
+        return existing
+
+    def _refresh_modified(self, modified: Dict[str, Path], changed: Dict[str, os.stat_result]):
+        """Update size and probed fields of known videos whose file changed on disk"""
+        if not modified:
+            return
+        probes = self._probe_many([str(file_path) for file_path in modified.values()])
+        for video_id, file_path in modified.items():
+            video = self.db.get(Video, video_id)
+            if video is None:
+                continue
+            probe = probes.get(str(file_path)) if probes else probe_file(str(file_path))
+            probe = probe or {}
+            video.file_size = changed[str(file_path)].st_size
+            # Les en-têtes décrivent le fichier tel qu'il est maintenant sur le disque
+            if probe.get('duration'):
+                video.duration = probe['duration']
+            if probe.get('resolution'):
+                video.resolution = probe['resolution']
+            if probe.get('codec'):
+                video.video_codec = probe['codec']
+            logger.info(f"File modified: {file_path}")
+
+    def _probe_many(self, paths: List[str]) -> Dict[str, Optional[Dict]]:
+        """Probe paths over the scan's process pool; empty when they should be probed inline"""
+        if self.probe_workers <= 1 or len(paths) < SCAN_PROBE_POOL_MIN_FILES:
+            return {}
+        try:
+            # Un seul pool par scan, réutilisé par tous les appels
+            if self._probe_pool is None:
+                self._probe_pool = probe_pool(self.probe_workers)
+            return probe_files(paths, self._probe_pool, self.probe_workers)
+        except Exception as e:
+            logger.warning(f"Probe pool failed, probing inline: {str(e)}")
+            return {}
+
+    def _close_probe_pool(self):
+        if self._probe_pool is not None:
+            self._probe_pool.shutdown(cancel_futures=True)
+            self._probe_pool = None
+
+    def _build_and_insert(self, pending: List[Tuple[Path, str, os.stat_result]], results: Dict):
+        """Fetch metadata concurrently and insert rows in batched transactions"""
+        probes = self._probe_many([str(file_path) for file_path, _, _ in pending])
+
+        batch: List[Tuple[Video, os.stat_result]] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._build_video, file_path, video_id, file_stat,
+                                probes.get(str(file_path), {}) if probes else None): (file_path, file_stat)
+                for file_path, video_id, file_stat in pending
+            }
+            for future in as_completed(futures):
+                file_path, file_stat = futures[future]
+                try:
+                    batch.append((future.result(), file_stat))
+                except Exception as e:
+                    error_msg = f"Error processing {file_path.name}: {str(e)}"
+                    logger.error(error_msg)
+                    results['errors'].append(error_msg)
+                    continue
+
+                if len(batch) >= self.batch_size:
+                    self._flush_batch(batch, results)
+                    batch = []
+
+                if self.cancel_event.is_set():
+                    # Garder ce qui est déjà récupéré, abandonner le reste
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+
+        if batch:
+            self._flush_batch(batch, results)
+
+    def _flush_batch(self, batch: List[Tuple[Video, os.stat_result]], results: Dict):
+        """Commit a batch of videos, falling back to row-by-row on failure"""
+        try:
+            for video, file_stat in batch:
+                self.db.add(video)
+                self._record_file_state(Path(video.file_path), file_stat, video.id)
+            self.db.commit()
+            results['videos_added'] += len(batch)
+            return
+        except Exception as e:
+            logger.warning(f"Batch insert failed, retrying row by row: {str(e)}")
+            self.db.rollback()
+
+        for video, file_stat in batch:
             try:
-                self._process_video_file(file_path)
+                self.db.merge(video)
+                self._record_file_state(Path(video.file_path), file_stat, video.id)
+                self.db.commit()
                 results['videos_added'] += 1
             except Exception as e:
+                self.db.rollback()
+                error_msg = f"Error processing {Path(video.file_path).name}: {str(e)}"
+                logger.error(error_msg)
+                results['errors'].append(error_msg)
+
+    def process_paths(self, paths: List[str]) -> Dict:
+        """Ingest an explicit set of files (e.g. from the watcher) without walking the tree"""
+        results = self.new_results()
+        for path in paths:
+            file_path = Path(os.path.abspath(path))
+            try:
+                file_stat = file_path.stat()
+            except FileNotFoundError:
+                results['videos_removed'] += self.forget_paths([str(file_path)])
+                continue
+            results['videos_found'] += 1
+
+            state = self.db.get(FileState, str(file_path))
+            if state is not None and self._is_unchanged(state, file_stat):
+                results['videos_unchanged'] += 1
+                continue
+
+            try:
+                if self._process_video_file(file_path, file_stat):
+                    results['videos_added'] += 1
+                else:
+                    results['videos_skipped'] += 1
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
                 error_msg = f"Error processing {file_path.name}: {str(e)}"
                 logger.error(error_msg)
                 results['errors'].append(error_msg)
-        
-        self.db.commit()
         return results
-    
-    def _process_video_file(self, file_path: Path):
-        """Process a single video file"""
+
+    def forget_paths(self, paths: List[str]) -> int:
+        """Drop the file states of deleted files; returns how many were known"""
+        removed = 0
+        for path in paths:
+            state = self.db.get(FileState, os.path.abspath(path))
+            if state is not None:
+                logger.info(f"File removed: {state.path}")
+                self.db.delete(state)
+                removed += 1
+        self.db.commit()
+        return removed
+
+    def _process_video_file(self, file_path: Path, file_stat: Optional[os.stat_result] = None) -> bool:
+        """Process a single video file; returns True when a new video was added"""
         # Extract video ID from filename
         video_id = self.metadata_extractor.extract_video_id(file_path.name)
         if not video_id:
             raise ValueError("Could not extract YouTube ID from filename")
-        
+
+        file_stat = file_stat or file_path.stat()
+
         # Check if video already exists
         existing_video = self.db.query(Video).filter(Video.id == video_id).first()
         if existing_video:
             logger.info(f"Video {video_id} already in database")
-            return
-        
+            self._relocate_stale_path(video_id, existing_video.file_path, file_path)
+            self._record_file_state(file_path, file_stat, video_id)
+            return False
+
+        video = self._build_video(file_path, video_id, file_stat)
+        self.db.add(video)
+        self._record_file_state(file_path, file_stat, video_id)
+        return True
+
+    def _build_video(self, file_path: Path, video_id: str,
+                     file_stat: Optional[os.stat_result] = None,
+                     probe: Optional[Dict] = None) -> Video:
+        """Build a Video row for a file; safe to call from worker threads"""
         # Get file info
-        file_stat = file_path.stat()
-        
+        file_stat = file_stat or file_path.stat()
+        if probe is None:
+            probe = probe_file(str(file_path)) or {}
+
         # Create video entry with basic info
         video = Video(
             id=video_id,
@@ -72,9 +465,11 @@ class VideoScanner:
             file_size=file_stat.st_size,
             added_date=datetime.utcnow()
         )
-        
-        # Try to fetch metadata from YouTube
-        metadata = self.metadata_extractor.get_metadata(video_id)
+
+        # Préférer le sidecar .info.json local à une requête YouTube
+        metadata = self._load_sidecar_metadata(file_path, video_id)
+        if metadata is None:
+            metadata = self.metadata_extractor.get_metadata(video_id, LIBRARY_FIELDS)
         if metadata:
             video.title = metadata.get('title')
             video.thumbnail_url = metadata.get('thumbnail_url')
@@ -85,10 +480,10 @@ class VideoScanner:
             video.view_count = metadata.get('view_count')
             video.like_count = metadata.get('like_count')
             video.resolution = metadata.get('resolution')
-            
+
             if metadata.get('tags'):
-                video.tags = json.dumps(metadata['tags'])
-            
+                video.tags = json.dumps(metadata['tags'], ensure_ascii=False)
+
             if metadata.get('upload_date'):
                 try:
                     video.upload_date = datetime.strptime(metadata['upload_date'], '%Y%m%d')
@@ -97,6 +492,27 @@ class VideoScanner:
         else:
             # Use filename as title if metadata fetch fails
             video.title = file_path.stem
-        
-        self.db.add(video)
+
+        # Les en-têtes du fichier décrivent ce qui est réellement sur le disque
+        if probe.get('resolution'):
+            video.resolution = probe['resolution']
+        if not video.duration and probe.get('duration'):
+            video.duration = probe['duration']
+        video.video_codec = probe.get('codec')
+
+        thumbnail = find_thumbnail(file_path)
+        if thumbnail:
+            video.thumbnail_url = media_url(thumbnail) or video.thumbnail_url
+
         logger.info(f"Added video: {video.title or video_id}")
+        return video
+
+    def _load_sidecar_metadata(self, file_path: Path, video_id: str) -> Optional[Dict]:
+        """Build metadata from a yt-dlp .info.json sidecar next to the file"""
+        info = load_info_json(file_path)
+        if info is None:
+            return None
+        if info.get('id') and info['id'] != video_id:
+            logger.warning(f"Ignoring sidecar for {file_path.name}: it describes {info['id']}")
+            return None
+        return self.metadata_extractor.summarize_info(info)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, List
 
@@ -16,6 +16,15 @@ class VideoUpdate(BaseModel):
     watched: Optional[bool] = None
     last_watched: Optional[datetime] = None
 
+# Vue compacte pour la grille: sans description ni tags
+class VideoListItem(VideoBase):
+    upload_date: Optional[datetime] = None
+    watched: bool = False
+    snippet: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
 class Video(VideoBase):
     file_path: str
     channel_id: Optional[str] = None
@@ -25,33 +34,86 @@ class Video(VideoBase):
     like_count: Optional[int] = None
     tags: Optional[str] = None
     resolution: Optional[str] = None
+    video_codec: Optional[str] = None
     file_size: Optional[int] = None
     added_date: datetime
     last_watched: Optional[datetime] = None
     watched: bool
     local_views: int
+    playback_position: Optional[int] = None
+    snippet: Optional[str] = None  # extrait surligné lors d'une recherche
 
     class Config:
         from_attributes = True
 
+class PlaybackProgress(BaseModel):
+    position: float  # in seconds
+    duration: Optional[float] = None
+    completed: bool = False
+
+class PlaybackState(BaseModel):
+    video_id: str
+    position: Optional[int] = None
+    watched: Optional[bool] = None
+
+# Sélection pour les opérations groupées: une liste d'IDs et/ou des filtres
+class VideoSelection(BaseModel):
+    ids: Optional[List[str]] = Field(None, max_length=10000)
+    channel: Optional[str] = None
+    tags: Optional[List[str]] = None
+    tag_mode: str = Field("all", pattern="^(all|any)$")
+    search: Optional[str] = None
+    watched: Optional[bool] = None
+
+class BulkUpdateRequest(BaseModel):
+    selection: VideoSelection
+    watched: Optional[bool] = None
+    reset_progress: bool = False
+
+class BulkDeleteRequest(BaseModel):
+    selection: VideoSelection
+    delete_files: bool = False
+
 class ScanRequest(BaseModel):
     path: Optional[str] = None
     recursive: bool = True
 
-class ScanResponse(BaseModel):
-    status: str
-    videos_found: int
-    videos_added: int
+class ScanJobStatus(BaseModel):
+    job_id: str
+    status: str  # pending, running, completed, cancelled, error
+    path: str
+    recursive: bool
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    files_seen: int = 0
+    videos_added: int = 0
+    videos_skipped: int = 0
+    videos_unchanged: int = 0
+    videos_removed: int = 0
+    videos_moved: int = 0
+    videos_errored: int = 0
+    files_per_second: float = 0.0
+    duplicates: List[List[str]] = []
     errors: List[str] = []
 
 # Nouveaux schémas pour le téléchargement
 class DownloadRequest(BaseModel):
     url: str
     quality: Optional[str] = "best"  # best, 1080p, 720p, 480p, etc.
+    priority: int = 0  # plus grand = téléchargé plus tôt
+
+class DownloadBatchRequest(BaseModel):
+    urls: List[str] = Field(..., min_length=1, max_length=1000)
+    quality: Optional[str] = "best"
+    priority: int = 0
 
 class DownloadProgress(BaseModel):
     task_id: str
-    status: str  # pending, downloading, processing, completed, error
+    status: str  # pending, downloading, processing, completed, error, cancelled
+    video_id: Optional[str] = None
+    priority: Optional[int] = None
+    attempts: Optional[int] = None
+    next_attempt_at: Optional[datetime] = None
     progress: Optional[float] = None
     speed: Optional[str] = None
     eta: Optional[str] = None
@@ -60,4 +122,5 @@ class DownloadProgress(BaseModel):
 
 class DownloadResponse(BaseModel):
     task_id: str
-    message: str
\ No newline at end of file
+    message: str
+    queued: bool = True
\ No newline at end of file
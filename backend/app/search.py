@@ -0,0 +1,105 @@
+import re
+import logging
+from typing import Optional
+from sqlalchemy import text, literal_column, Integer, Float, String
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+from .models import Video
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "videos_fts"
+# Poids bm25 par colonne: title, description, channel_name, tags
+FTS_WEIGHTS = (10.0, 1.0, 5.0, 3.0)
+
+_fulltext_enabled = False
+
+FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, channel_name, tags,
+        content='videos', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS videos_fts_ai AFTER INSERT ON videos BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, channel_name, tags)
+        VALUES (new.rowid, new.title, new.description, new.channel_name, new.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS videos_fts_ad AFTER DELETE ON videos BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, channel_name, tags)
+        VALUES ('delete', old.rowid, old.title, old.description, old.channel_name, old.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS videos_fts_au AFTER UPDATE OF title, description, channel_name, tags ON videos BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, channel_name, tags)
+        VALUES ('delete', old.rowid, old.title, old.description, old.channel_name, old.tags);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, channel_name, tags)
+        VALUES (new.rowid, new.title, new.description, new.channel_name, new.tags);
+    END""",
+]
+
+
+def setup_fulltext(engine: Engine) -> bool:
+    """Create the FTS5 index and its sync triggers; False when FTS5 is unavailable"""
+    global _fulltext_enabled
+    _fulltext_enabled = False
+    if engine.dialect.name != "sqlite":
+        return False
+
+    with engine.begin() as conn:
+        try:
+            conn.exec_driver_sql("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+            conn.exec_driver_sql("DROP TABLE temp.fts5_probe")
+        except Exception:
+            logger.warning("SQLite was built without FTS5, falling back to LIKE search")
+            return False
+
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+        ).first()
+        for statement in FTS_SCHEMA:
+            conn.exec_driver_sql(statement)
+        if not exists:
+            # Indexer les vidéos déjà présentes
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            logger.info("Built full-text index")
+
+    _fulltext_enabled = True
+    return True
+
+
+def fulltext_enabled() -> bool:
+    return _fulltext_enabled
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 query: every word must match, as a prefix"""
+    tokens = re.findall(r'\w+', search, re.UNICODE)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def apply_search(query: Query, search: str, rank: bool = True) -> Query:
+    """Filter query on search; with FTS5 add a snippet column and order by bm25 rank"""
+    match = build_match_query(search) if fulltext_enabled() else None
+    if match is None:
+        return query.filter(
+            Video.title.contains(search) |
+            Video.description.contains(search) |
+            Video.channel_name.contains(search)
+        ).add_columns(literal_column("NULL", String).label("snippet"))
+
+    weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+    matches = (
+        text(
+            f"SELECT rowid AS rowid, bm25({FTS_TABLE}, {weights}) AS rank, "
+            f"snippet({FTS_TABLE}, -1, '<mark>', '</mark>', '…', 16) AS snippet "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        )
+        .bindparams(match=match)
+        .columns(rowid=Integer, rank=Float, snippet=String)
+        .subquery("fts")
+    )
+    query = query.join(matches, matches.c.rowid == literal_column("videos.rowid"))
+    if rank:
+        query = query.order_by(matches.c.rank)
+    return query.add_columns(matches.c.snippet)
@@ -0,0 +1,146 @@
+import logging
+from datetime import date, timedelta
+from typing import Dict
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from .models import LibraryStats, ChannelStats, WatchActivity
+
+logger = logging.getLogger(__name__)
+
+# Contribution d'une ligne de videos aux compteurs ({row} = new ou old)
+ROW_COUNTERS = ("1, coalesce({row}.watched, 0), coalesce({row}.file_size, 0), "
+                "coalesce({row}.duration, 0)")
+
+
+def _add_channel(row: str) -> str:
+    return f"""INSERT INTO channel_stats(channel_name, video_count, watched_count, total_bytes, total_duration)
+        SELECT {row}.channel_name, {ROW_COUNTERS.format(row=row)} WHERE {row}.channel_name IS NOT NULL
+        ON CONFLICT(channel_name) DO UPDATE SET
+            video_count = video_count + excluded.video_count,
+            watched_count = watched_count + excluded.watched_count,
+            total_bytes = total_bytes + excluded.total_bytes,
+            total_duration = total_duration + excluded.total_duration;"""
+
+
+def _remove_channel(row: str) -> str:
+    return f"""UPDATE channel_stats SET
+            video_count = video_count - 1,
+            watched_count = watched_count - coalesce({row}.watched, 0),
+            total_bytes = total_bytes - coalesce({row}.file_size, 0),
+            total_duration = total_duration - coalesce({row}.duration, 0)
+        WHERE channel_name = {row}.channel_name;
+        DELETE FROM channel_stats WHERE channel_name = {row}.channel_name AND video_count <= 0;"""
+
+
+def _shift_library(sign: str, row: str) -> str:
+    return f"""UPDATE library_stats SET
+            video_count = video_count {sign} 1,
+            watched_count = watched_count {sign} coalesce({row}.watched, 0),
+            total_bytes = total_bytes {sign} coalesce({row}.file_size, 0),
+            total_duration = total_duration {sign} coalesce({row}.duration, 0)
+        WHERE id = 1;"""
+
+
+STATS_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS videos_stats_ai AFTER INSERT ON videos BEGIN
+        {_shift_library('+', 'new')}
+        {_add_channel('new')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS videos_stats_ad AFTER DELETE ON videos BEGIN
+        {_shift_library('-', 'old')}
+        {_remove_channel('old')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS videos_stats_au
+    AFTER UPDATE OF watched, file_size, duration, channel_name ON videos BEGIN
+        {_shift_library('-', 'old')}
+        {_shift_library('+', 'new')}
+        {_remove_channel('old')}
+        {_add_channel('new')}
+    END""",
+    # Activité par jour: une lecture à chaque changement de last_watched
+    """CREATE TRIGGER IF NOT EXISTS videos_activity_viewed AFTER UPDATE OF last_watched ON videos
+    WHEN new.last_watched IS NOT NULL AND new.last_watched IS NOT old.last_watched BEGIN
+        INSERT INTO watch_activity(day, views, completed) VALUES (date(new.last_watched), 1, 0)
+        ON CONFLICT(day) DO UPDATE SET views = views + 1;
+    END""",
+    # Lecture terminée: watched passe à vrai dans la même écriture que la position de lecture.
+    # Un marquage manuel ou groupé ne touche pas la position et ne compte pas
+    """CREATE TRIGGER IF NOT EXISTS videos_activity_playback_completed AFTER UPDATE OF watched ON videos
+    WHEN new.watched AND NOT coalesce(old.watched, 0)
+        AND new.playback_position IS NOT NULL AND new.playback_position IS NOT old.playback_position BEGIN
+        INSERT INTO watch_activity(day, views, completed)
+        VALUES (date(coalesce(new.last_watched, 'now')), 0, 1)
+        ON CONFLICT(day) DO UPDATE SET completed = completed + 1;
+    END""",
+]
+# Triggers remplacés, supprimés des bases existantes
+OBSOLETE_TRIGGERS = ("videos_activity_completed",)
+
+
+def setup_stats(engine: Engine):
+    """Install the triggers that keep the statistics counters in sync with videos"""
+    if engine.dialect.name != "sqlite":
+        logger.warning("Statistics counters are only maintained on SQLite")
+        return
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT OR IGNORE INTO library_stats(id, video_count, watched_count, "
+                             "total_bytes, total_duration) VALUES (1, 0, 0, 0, 0)")
+        for name in OBSOLETE_TRIGGERS:
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        for statement in STATS_TRIGGERS:
+            conn.exec_driver_sql(statement)
+
+
+def backfill_stats(conn):
+    """Recompute every counter from the videos table"""
+    conn.exec_driver_sql("DELETE FROM library_stats")
+    conn.exec_driver_sql("DELETE FROM channel_stats")
+    conn.exec_driver_sql("DELETE FROM watch_activity")
+    conn.exec_driver_sql(
+        "INSERT INTO library_stats(id, video_count, watched_count, total_bytes, total_duration) "
+        "SELECT 1, count(*), coalesce(sum(watched), 0), coalesce(sum(file_size), 0), "
+        "coalesce(sum(duration), 0) FROM videos"
+    )
+    conn.exec_driver_sql(
+        "INSERT INTO channel_stats(channel_name, video_count, watched_count, total_bytes, total_duration) "
+        "SELECT channel_name, count(*), coalesce(sum(watched), 0), coalesce(sum(file_size), 0), "
+        "coalesce(sum(duration), 0) FROM videos WHERE channel_name IS NOT NULL GROUP BY channel_name"
+    )
+    # Seule la dernière lecture de chaque vidéo est connue avant les triggers. Rien ne
+    # distingue une lecture terminée d'un marquage manuel: aucune fin de lecture n'est reprise
+    conn.exec_driver_sql(
+        "INSERT INTO watch_activity(day, views, completed) "
+        "SELECT date(last_watched), count(*), 0 FROM videos "
+        "WHERE last_watched IS NOT NULL GROUP BY date(last_watched)"
+    )
+
+
+def get_stats(db: Session, days: int = 30, channel_limit: int = 50) -> Dict:
+    """Library statistics read from the counter tables, independent of library size"""
+    totals = db.get(LibraryStats, 1)
+    channels = (db.query(ChannelStats)
+                .order_by(ChannelStats.total_bytes.desc(), ChannelStats.channel_name)
+                .limit(channel_limit).all())
+    since = (date.today() - timedelta(days=days - 1)).isoformat()
+    activity = db.query(WatchActivity).filter(WatchActivity.day >= since).order_by(WatchActivity.day).all()
+    return {
+        'total_videos': totals.video_count if totals else 0,
+        'watched_videos': totals.watched_count if totals else 0,
+        'total_bytes': totals.total_bytes if totals else 0,
+        'total_duration': totals.total_duration if totals else 0,
+        'channels': [
+            {
+                'name': channel.channel_name,
+                'video_count': channel.video_count,
+                'watched_count': channel.watched_count,
+                'total_bytes': channel.total_bytes,
+                'total_duration': channel.total_duration,
+            }
+            for channel in channels
+        ],
+        'activity': [
+            {'day': day.day, 'views': day.views, 'completed': day.completed}
+            for day in activity
+        ],
+    }
@@ -0,0 +1,26 @@
+import os
+import hashlib
+from typing import Optional
+
+# Taille lue au début et à la fin de chaque fichier
+FINGERPRINT_CHUNK_MIB = float(os.getenv("FINGERPRINT_CHUNK_MIB", "1"))
+
+
+def compute_fingerprint(path: str, chunk_mib: float = FINGERPRINT_CHUNK_MIB) -> Optional[str]:
+    """Hash the size plus the first and last chunk of a file
+
+    Cheap enough to run on every new file, and stable across renames and
+    moves to another filesystem (unlike the inode).
+    """
+    chunk = max(1, int(chunk_mib * 1024 * 1024))
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+            digest.update(f.read(chunk))
+            if size > chunk:
+                f.seek(max(chunk, size - chunk))
+                digest.update(f.read(chunk))
+    except OSError:
+        return None
+    return digest.hexdigest()
@@ -2,8 +2,9 @@ import yt_dlp
 import re
 import ssl
 import urllib3
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable
 import logging
+from .metadata_cache import MetadataCache, get_metadata_cache
 
 # Désactiver SSL globalement
 ssl._create_default_https_context = ssl._create_unverified_context
@@ -11,8 +12,16 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__)
 
+# Champs lus à l'import dans la bibliothèque: vues et likes n'y sont qu'un instantané,
+# leur TTL court ne doit pas forcer une nouvelle extraction à chaque scan
+LIBRARY_FIELDS = ('title', 'thumbnail_url', 'channel_name', 'channel_id', 'duration',
+                  'description', 'tags', 'upload_date', 'resolution')
+# Aperçu avant téléchargement: les compteurs affichés doivent être récents
+PREVIEW_FIELDS = ('title', 'duration', 'thumbnail_url', 'channel_name', 'view_count', 'formats')
+
 class MetadataExtractor:
-    def __init__(self):
+    def __init__(self, cache: Optional[MetadataCache] = None):
+        self.cache = cache or get_metadata_cache()
         self.ydl_opts = {
             'quiet': True,
             'no_warnings': True,
@@ -39,7 +48,19 @@ class MetadataExtractor:
                 return match.group(1)
         return None
     
-    def get_metadata(self, video_id: str) -> Optional[Dict]:
+    def get_metadata(self, video_id: str, fields: Optional[Iterable[str]] = None,
+                     refresh: bool = False) -> Optional[Dict]:
+        """Return cached metadata, fetching from YouTube when missing or stale"""
+        if not refresh:
+            found, metadata = self.cache.lookup(video_id, fields)
+            if found:
+                return metadata
+
+        metadata = self._fetch_metadata(video_id)
+        self.cache.store(video_id, metadata)
+        return metadata
+
+    def _fetch_metadata(self, video_id: str) -> Optional[Dict]:
         """Fetch metadata from YouTube with SSL disabled"""
         with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
             try:
@@ -48,19 +69,40 @@ class MetadataExtractor:
                     download=False
                 )
                 
-                return {
-                    'title': info.get('title'),
-                    'thumbnail_url': info.get('thumbnail'),
-                    'channel_name': info.get('uploader'),
-                    'channel_id': info.get('channel_id'),
-                    'duration': info.get('duration'),
-                    'upload_date': info.get('upload_date'),
-                    'description': info.get('description'),
-                    'view_count': info.get('view_count'),
-                    'like_count': info.get('like_count'),
-                    'tags': info.get('tags', []),
-                    'resolution': f"{info.get('width')}x{info.get('height')}" if info.get('width') else None
-                }
+                return self.summarize_info(info)
             except Exception as e:
                 logger.error(f"Error fetching metadata for {video_id}: {str(e)}")
-                return None
\ No newline at end of file
+                return None
+
+    @staticmethod
+    def summarize_info(info: Dict) -> Dict:
+        """Reduce a yt-dlp info dict to the fields stored in the library"""
+        formats = []
+        seen_resolutions = set()
+        for f in info.get('formats') or []:
+            if f.get('height') and f.get('vcodec') != 'none':
+                resolution = f"{f['height']}p"
+                if resolution not in seen_resolutions:
+                    seen_resolutions.add(resolution)
+                    formats.append({
+                        'format_id': f['format_id'],
+                        'resolution': resolution,
+                        'ext': f.get('ext', 'mp4'),
+                        'filesize': f.get('filesize', 0)
+                    })
+        formats.sort(key=lambda x: int(x['resolution'][:-1]), reverse=True)
+
+        return {
+            'title': info.get('title'),
+            'thumbnail_url': info.get('thumbnail'),
+            'channel_name': info.get('uploader'),
+            'channel_id': info.get('channel_id'),
+            'duration': info.get('duration'),
+            'upload_date': info.get('upload_date'),
+            'description': info.get('description'),
+            'view_count': info.get('view_count'),
+            'like_count': info.get('like_count'),
+            'tags': info.get('tags', []),
+            'resolution': f"{info.get('width')}x{info.get('height')}" if info.get('width') else None,
+            'formats': formats[:5]
+        }
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+METADATA_CACHE_PATH = os.getenv("METADATA_CACHE_PATH", "./metadata_cache.db")
+METADATA_CACHE_TTL = int(os.getenv("METADATA_CACHE_TTL", str(30 * 24 * 3600)))
+METADATA_CACHE_VOLATILE_TTL = int(os.getenv("METADATA_CACHE_VOLATILE_TTL", str(24 * 3600)))
+METADATA_CACHE_NEGATIVE_TTL = int(os.getenv("METADATA_CACHE_NEGATIVE_TTL", str(3600)))
+METADATA_CACHE_MEMORY_SIZE = int(os.getenv("METADATA_CACHE_MEMORY_SIZE", "2048"))
+
+# Les compteurs changent vite, le reste des métadonnées presque jamais
+VOLATILE_FIELDS = ('view_count', 'like_count')
+
+
+class MetadataCache:
+    """Two-tier (memory LRU + SQLite) cache for extracted video metadata"""
+
+    def __init__(self, path: Optional[str] = METADATA_CACHE_PATH,
+                 max_memory_entries: int = METADATA_CACHE_MEMORY_SIZE,
+                 default_ttl: int = METADATA_CACHE_TTL,
+                 field_ttls: Optional[Dict[str, int]] = None,
+                 negative_ttl: int = METADATA_CACHE_NEGATIVE_TTL):
+        self.max_memory_entries = max(0, max_memory_entries)
+        self.default_ttl = default_ttl
+        self.field_ttls = field_ttls if field_ttls is not None else {
+            field: METADATA_CACHE_VOLATILE_TTL for field in VOLATILE_FIELDS
+        }
+        self.negative_ttl = negative_ttl
+        self._memory: "OrderedDict[str, Tuple[float, Optional[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'stores': 0,
+        }
+
+        self._conn = None
+        if path:
+            try:
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS metadata_cache ("
+                    "video_id TEXT PRIMARY KEY, fetched_at REAL NOT NULL, data TEXT)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Metadata cache disabled on disk ({path}): {str(e)}")
+                self._conn = None
+
+    def _ttl(self, metadata: Optional[Dict], fields: Optional[Iterable[str]]) -> int:
+        if metadata is None:
+            return self.negative_ttl
+        if fields is None:
+            fields = metadata.keys()
+        return min([self.field_ttls.get(field, self.default_ttl) for field in fields] + [self.default_ttl])
+
+    def lookup(self, video_id: str, fields: Optional[Iterable[str]] = None) -> Tuple[bool, Optional[Dict]]:
+        """Return (found, metadata); found with metadata None is a cached failure"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(video_id)
+            source = 'memory_hits'
+            if entry is not None:
+                self._memory.move_to_end(video_id)
+            elif self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT fetched_at, data FROM metadata_cache WHERE video_id = ?", (video_id,)
+                ).fetchone()
+                if row:
+                    entry = (row[0], json.loads(row[1]) if row[1] is not None else None)
+                    source = 'disk_hits'
+                    self._remember(video_id, entry)
+
+            if entry is None:
+                self._counters['misses'] += 1
+                return False, None
+
+            fetched_at, metadata = entry
+            if now - fetched_at > self._ttl(metadata, fields):
+                self._counters['expired'] += 1
+                self._counters['misses'] += 1
+                return False, None
+
+            self._counters['negative_hits' if metadata is None else source] += 1
+            return True, metadata
+
+    def store(self, video_id: str, metadata: Optional[Dict]):
+        """Cache metadata for video_id; None records a failed extraction"""
+        entry = (time.time(), metadata)
+        with self._lock:
+            self._remember(video_id, entry)
+            self._counters['stores'] += 1
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO metadata_cache (video_id, fetched_at, data) VALUES (?, ?, ?)",
+                        (video_id, entry[0], json.dumps(metadata) if metadata is not None else None)
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not persist metadata for {video_id}: {str(e)}")
+
+    def invalidate(self, video_id: str):
+        with self._lock:
+            self._memory.pop(video_id, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM metadata_cache WHERE video_id = ?", (video_id,))
+                self._conn.commit()
+
+    def _remember(self, video_id: str, entry: Tuple[float, Optional[Dict]]):
+        if self.max_memory_entries == 0:
+            return
+        self._memory[video_id] = entry
+        self._memory.move_to_end(video_id)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_capacity'] = self.max_memory_entries
+            if self._conn is not None:
+                stats['disk_entries'] = self._conn.execute("SELECT COUNT(*) FROM metadata_cache").fetchone()[0]
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_ratio'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_shared_cache: Optional[MetadataCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_metadata_cache() -> MetadataCache:
+    """Return the process-wide metadata cache shared by the scanner and downloader"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = MetadataCache()
+        return _shared_cache
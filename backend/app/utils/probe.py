@@ -0,0 +1,332 @@
+import os
+import struct
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, BinaryIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Noms de codecs normalisés
+MP4_CODECS = {
+    'avc1': 'h264', 'avc3': 'h264',
+    'hev1': 'hevc', 'hvc1': 'hevc',
+    'vp08': 'vp8', 'vp09': 'vp9',
+    'av01': 'av1', 'mp4v': 'mpeg4',
+}
+MKV_CODECS = {
+    'V_MPEG4/ISO/AVC': 'h264',
+    'V_MPEGH/ISO/HEVC': 'hevc',
+    'V_VP8': 'vp8',
+    'V_VP9': 'vp9',
+    'V_AV1': 'av1',
+}
+
+# Conteneurs MP4 à parcourir pour atteindre tkhd/hdlr/stsd
+MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+EBML_HEADER = 0x1A45DFA3
+MKV_SEGMENT = 0x18538067
+MKV_SEEK_HEAD = 0x114D9B74
+MKV_SEEK = 0x4DBB
+MKV_SEEK_ID = 0x53AB
+MKV_SEEK_POSITION = 0x53AC
+MKV_INFO = 0x1549A966
+MKV_TIMESTAMP_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_TRACK_TYPE = 0x83
+MKV_CODEC_ID = 0x86
+MKV_VIDEO = 0xE0
+MKV_PIXEL_WIDTH = 0xB0
+MKV_PIXEL_HEIGHT = 0xBA
+MKV_CLUSTER = 0x1F43B675
+
+
+def probe_file(path: str) -> Optional[Dict]:
+    """Read duration, resolution and codec from the container headers of a file"""
+    try:
+        with open(path, 'rb') as f:
+            magic = f.read(12)
+            if magic[:4] == b'\x1a\x45\xdf\xa3':
+                info = _probe_matroska(f)
+            elif magic[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+                info = _probe_mp4(f, os.fstat(f.fileno()).st_size)
+            else:
+                return None
+    except (OSError, ValueError, struct.error) as e:
+        logger.debug(f"Could not probe {path}: {str(e)}")
+        return None
+
+    if not info:
+        return None
+    if info.get('width') and info.get('height'):
+        info['resolution'] = f"{info['width']}x{info['height']}"
+    return info
+
+
+def probe_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process pool for probe_files, safe to create from a multi-threaded server"""
+    # fork() copierait des verrous tenus par d'autres threads (logging, SQLite...)
+    # et pourrait bloquer les enfants: les processus partent d'un forkserver
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method))
+
+
+def probe_files(paths: List[str], executor: ProcessPoolExecutor,
+                max_workers: Optional[int] = None) -> Dict[str, Optional[Dict]]:
+    """Probe many files over a process pool created by probe_pool"""
+    if not paths:
+        return {}
+    chunksize = max(1, len(paths) // ((max_workers or os.cpu_count() or 1) * 4))
+    return dict(zip(paths, executor.map(probe_file, paths, chunksize=chunksize)))
+
+
+# --- MP4 / MOV ---
+
+def _read_box_header(f: BinaryIO, offset: int, end: int) -> Optional[Tuple[bytes, int, int]]:
+    """Return (type, size, header_length) of the box at offset"""
+    if offset + 8 > end:
+        return None
+    f.seek(offset)
+    header = f.read(16)
+    if len(header) < 8:
+        return None
+    size, box_type = struct.unpack('>I4s', header[:8])
+    header_length = 8
+    if size == 1:
+        if len(header) < 16:
+            return None
+        size = struct.unpack('>Q', header[8:16])[0]
+        header_length = 16
+    elif size == 0:
+        size = end - offset
+    if size < header_length:
+        return None
+    return box_type, size, header_length
+
+
+def _probe_mp4(f: BinaryIO, file_size: int) -> Optional[Dict]:
+    info: Dict = {}
+    tracks: List[Dict] = []
+    _walk_mp4(f, 0, file_size, info, tracks)
+
+    for track in tracks:
+        if track.get('handler') == b'vide':
+            info['width'] = track.get('width')
+            info['height'] = track.get('height')
+            codec = track.get('codec')
+            if codec:
+                info['codec'] = MP4_CODECS.get(codec, codec)
+            break
+    return info or None
+
+
+def _walk_mp4(f: BinaryIO, offset: int, end: int, info: Dict, tracks: List[Dict]):
+    while True:
+        header = _read_box_header(f, offset, end)
+        if header is None:
+            return
+        box_type, size, header_length = header
+        body = offset + header_length
+
+        if box_type in MP4_CONTAINERS:
+            if box_type == b'trak':
+                tracks.append({})
+            _walk_mp4(f, body, offset + size, info, tracks)
+            if box_type == b'moov':
+                # Tout est dans moov: inutile de parcourir les boîtes suivantes (mdat...)
+                return
+        elif box_type == b'mvhd':
+            f.seek(body)
+            data = f.read(32)
+            if len(data) < 20 or (data[0] == 1 and len(data) < 32):
+                return
+            if data[0] == 1:
+                timescale, duration = struct.unpack('>IQ', data[20:32])
+            else:
+                timescale, duration = struct.unpack('>II', data[12:20])
+            if timescale and duration:
+                info['duration'] = int(round(duration / timescale))
+        elif box_type == b'tkhd' and tracks:
+            f.seek(body)
+            # Version 1: dates et durée sur 64 bits, largeur/hauteur à 88 au lieu de 76
+            data = f.read(96)
+            position = 88 if data and data[0] == 1 else 76
+            if len(data) < position + 8:
+                return
+            width, height = struct.unpack('>II', data[position:position + 8])
+            tracks[-1]['width'] = width >> 16
+            tracks[-1]['height'] = height >> 16
+        elif box_type == b'hdlr' and tracks and 'handler' not in tracks[-1]:
+            # Le hdlr de minf (QuickTime) décrit la référence de données, pas le média
+            f.seek(body + 8)
+            tracks[-1]['handler'] = f.read(4)
+        elif box_type == b'stsd' and tracks:
+            f.seek(body + 12)
+            tracks[-1]['codec'] = f.read(4).decode('latin-1').strip()
+
+        offset += size
+
+
+# --- Matroska / WebM ---
+
+def _read_vint(f: BinaryIO, keep_marker: bool) -> Tuple[Optional[int], int]:
+    """Read an EBML variable-length integer; returns (value, length)"""
+    first = f.read(1)
+    if not first:
+        return None, 0
+    byte = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not byte & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("Invalid EBML variable-length integer")
+    value = byte if keep_marker else byte & (mask - 1)
+    unknown = (byte & (mask - 1)) == mask - 1
+    for b in f.read(length - 1):
+        value = (value << 8) | b
+        unknown = unknown and b == 0xFF
+    if unknown and not keep_marker:
+        return None, length
+    return value, length
+
+
+def _read_element_header(f: BinaryIO) -> Tuple[Optional[int], Optional[int], int]:
+    """Return (id, size, header_length); size is None when unknown"""
+    element_id, id_length = _read_vint(f, keep_marker=True)
+    if element_id is None:
+        return None, None, 0
+    size, size_length = _read_vint(f, keep_marker=False)
+    return element_id, size, id_length + size_length
+
+
+def _read_uint(data: bytes) -> int:
+    return int.from_bytes(data, 'big') if data else 0
+
+
+def _iter_children(f: BinaryIO, start: int, end: int):
+    """Yield (id, data_offset, size) for the children of a master element"""
+    offset = start
+    while offset < end:
+        f.seek(offset)
+        element_id, size, header_length = _read_element_header(f)
+        if element_id is None or size is None:
+            return
+        yield element_id, offset + header_length, size
+        offset += header_length + size
+
+
+def _probe_matroska(f: BinaryIO) -> Optional[Dict]:
+    f.seek(0)
+    element_id, size, header_length = _read_element_header(f)
+    if element_id != EBML_HEADER or size is None:
+        return None
+    offset = header_length + size
+
+    f.seek(offset)
+    element_id, segment_size, header_length = _read_element_header(f)
+    if element_id != MKV_SEGMENT:
+        return None
+    segment_start = offset + header_length
+    segment_end = segment_start + segment_size if segment_size is not None else os.fstat(f.fileno()).st_size
+
+    info: Dict = {}
+    found = set()
+    seek_positions: Dict[int, int] = {}
+    position = segment_start
+    while position < segment_end and not {MKV_INFO, MKV_TRACKS} <= found:
+        f.seek(position)
+        element_id, size, header_length = _read_element_header(f)
+        if element_id is None:
+            break
+        data_offset = position + header_length
+
+        if element_id == MKV_SEEK_HEAD and size is not None:
+            seek_positions.update(_parse_seek_head(f, data_offset, data_offset + size))
+        elif element_id == MKV_INFO and size is not None:
+            _parse_info(f, data_offset, data_offset + size, info)
+            found.add(MKV_INFO)
+        elif element_id == MKV_TRACKS and size is not None:
+            _parse_tracks(f, data_offset, data_offset + size, info)
+            found.add(MKV_TRACKS)
+        elif element_id == MKV_CLUSTER or size is None:
+            # Les clusters contiennent les données: sauter via le SeekHead
+            break
+        position = data_offset + size
+
+    for element_id in (MKV_INFO, MKV_TRACKS):
+        if element_id in found or element_id not in seek_positions:
+            continue
+        position = segment_start + seek_positions[element_id]
+        f.seek(position)
+        found_id, size, header_length = _read_element_header(f)
+        if found_id != element_id or size is None:
+            continue
+        data_offset = position + header_length
+        if element_id == MKV_INFO:
+            _parse_info(f, data_offset, data_offset + size, info)
+        else:
+            _parse_tracks(f, data_offset, data_offset + size, info)
+
+    return info or None
+
+
+def _parse_seek_head(f: BinaryIO, start: int, end: int) -> Dict[int, int]:
+    positions = {}
+    for element_id, offset, size in list(_iter_children(f, start, end)):
+        if element_id != MKV_SEEK:
+            continue
+        seek_id = seek_position = None
+        for child_id, child_offset, child_size in list(_iter_children(f, offset, offset + size)):
+            f.seek(child_offset)
+            data = f.read(child_size)
+            if child_id == MKV_SEEK_ID:
+                seek_id = _read_uint(data)
+            elif child_id == MKV_SEEK_POSITION:
+                seek_position = _read_uint(data)
+        if seek_id is not None and seek_position is not None:
+            positions[seek_id] = seek_position
+    return positions
+
+
+def _parse_info(f: BinaryIO, start: int, end: int, info: Dict):
+    timestamp_scale = 1000000
+    duration = None
+    for element_id, offset, size in list(_iter_children(f, start, end)):
+        f.seek(offset)
+        if element_id == MKV_TIMESTAMP_SCALE:
+            timestamp_scale = _read_uint(f.read(size)) or timestamp_scale
+        elif element_id == MKV_DURATION and size in (4, 8):
+            duration = struct.unpack('>f' if size == 4 else '>d', f.read(size))[0]
+    if duration is not None:
+        info['duration'] = int(round(duration * timestamp_scale / 1e9))
+
+
+def _parse_tracks(f: BinaryIO, start: int, end: int, info: Dict):
+    for element_id, offset, size in list(_iter_children(f, start, end)):
+        if element_id != MKV_TRACK_ENTRY:
+            continue
+        track: Dict = {}
+        for child_id, child_offset, child_size in list(_iter_children(f, offset, offset + size)):
+            f.seek(child_offset)
+            if child_id == MKV_TRACK_TYPE:
+                track['type'] = _read_uint(f.read(child_size))
+            elif child_id == MKV_CODEC_ID:
+                track['codec'] = f.read(child_size).rstrip(b'\x00').decode('ascii', 'replace')
+            elif child_id == MKV_VIDEO:
+                for video_id, video_offset, video_size in list(_iter_children(f, child_offset, child_offset + child_size)):
+                    f.seek(video_offset)
+                    if video_id == MKV_PIXEL_WIDTH:
+                        track['width'] = _read_uint(f.read(video_size))
+                    elif video_id == MKV_PIXEL_HEIGHT:
+                        track['height'] = _read_uint(f.read(video_size))
+        if track.get('type') == 1:
+            info['width'] = track.get('width')
+            info['height'] = track.get('height')
+            if track.get('codec'):
+                info['codec'] = MKV_CODECS.get(track['codec'], track['codec'].lower())
+            return
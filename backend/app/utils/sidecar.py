@@ -0,0 +1,58 @@
+import os
+import json
+import logging
+from urllib.parse import quote
+from pathlib import Path
+from typing import Optional, Dict, List, Union
+
+logger = logging.getLogger(__name__)
+
+MEDIA_PATH = os.getenv("MEDIA_PATH", "/opt/youtube-videos")
+THUMBNAIL_EXTENSIONS = ('.jpg', '.jpeg', '.webp', '.png')
+# Dossier de travail des téléchargements en cours sous MEDIA_PATH (fichiers .part
+# repris d'une tentative à l'autre), ignoré par le scanner et le watcher
+DOWNLOAD_WORK_DIR = '.partial'
+
+
+def info_json_path(video_path: Union[str, Path]) -> Path:
+    """Path of the yt-dlp .info.json sidecar for a video file"""
+    return Path(video_path).with_suffix('.info.json')
+
+
+def load_info_json(video_path: Union[str, Path]) -> Optional[Dict]:
+    """Read the .info.json sidecar next to a video file, if there is one"""
+    sidecar = info_json_path(video_path)
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Invalid sidecar {sidecar}: {str(e)}")
+        return None
+    return info if isinstance(info, dict) else None
+
+
+def find_thumbnail(video_path: Union[str, Path]) -> Optional[Path]:
+    """Find a thumbnail written next to a video file"""
+    for ext in THUMBNAIL_EXTENSIONS:
+        candidate = Path(video_path).with_suffix(ext)
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def sidecar_files(video_path: Union[str, Path]) -> List[Path]:
+    """Existing .info.json and thumbnail files belonging to a video file"""
+    candidates = [info_json_path(video_path)]
+    candidates += [Path(video_path).with_suffix(ext) for ext in THUMBNAIL_EXTENSIONS]
+    return [candidate for candidate in candidates if candidate.is_file()]
+
+
+def media_url(path: Union[str, Path]) -> Optional[str]:
+    """URL under /media for a file inside MEDIA_PATH"""
+    try:
+        relative = Path(os.path.abspath(path)).relative_to(os.path.abspath(MEDIA_PATH))
+    except ValueError:
+        return None
+    return f"/media/{quote(relative.as_posix())}"
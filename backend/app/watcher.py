@@ -0,0 +1,110 @@
+import os
+import re
+import time
+import logging
+import threading
+from typing import Dict, Optional, Set
+from .database import SessionLocal
+from .scanner import VideoScanner, VIDEO_EXTENSIONS
+from .utils.sidecar import DOWNLOAD_WORK_DIR
+
+logger = logging.getLogger(__name__)
+
+WATCH_MEDIA = os.getenv("WATCH_MEDIA", "false").lower() in ("1", "true", "yes")
+WATCH_DEBOUNCE_MS = int(os.getenv("WATCH_DEBOUNCE_MS", "2000"))
+# Délai sans écriture avant de considérer un fichier comme terminé
+WATCH_SETTLE_SECONDS = float(os.getenv("WATCH_SETTLE_SECONDS", "5"))
+
+# Fichiers temporaires de yt-dlp et des navigateurs: .part, .ytdl, .f137.mp4, .temp.mp4...
+PARTIAL_FILE_PATTERN = re.compile(r'(\.(part|ytdl|tmp|temp|crdownload)(-Frag\d+)?$)|(\.f\d+\.\w+$)|(\.temp\.\w+$)',
+                                  re.IGNORECASE)
+
+
+class LibraryWatcher:
+    """Watch a media directory and ingest created, moved and deleted files incrementally"""
+
+    def __init__(self, root: str, debounce_ms: int = WATCH_DEBOUNCE_MS,
+                 settle_seconds: float = WATCH_SETTLE_SECONDS):
+        self.root = os.path.abspath(root)
+        self.debounce_ms = debounce_ms
+        self.settle_seconds = settle_seconds
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        # Fichiers encore en cours d'écriture, revérifiés périodiquement
+        self.pending: Dict[str, float] = {}
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="library-watcher", daemon=True)
+        self.thread.start()
+        logger.info(f"Watching {self.root} for new videos")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    @staticmethod
+    def is_candidate(path: str) -> bool:
+        """True for finished video files, False for directories, sidecars and partial downloads"""
+        if PARTIAL_FILE_PATTERN.search(path) or f"{os.sep}{DOWNLOAD_WORK_DIR}{os.sep}" in path:
+            return False
+        return os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+
+    def _run(self):
+        try:
+            from watchfiles import watch, Change
+        except ImportError:
+            logger.error("watchfiles is not installed, watch mode disabled")
+            return
+
+        try:
+            for changes in watch(self.root, watch_filter=lambda change, path: self.is_candidate(path),
+                                 debounce=self.debounce_ms, stop_event=self.stop_event,
+                                 yield_on_timeout=True, rust_timeout=self.debounce_ms):
+                # Regrouper par chemin: seul le dernier événement compte
+                latest: Dict[str, Change] = {}
+                for change, path in changes:
+                    latest[path] = change
+
+                deleted = {path for path, change in latest.items() if change == Change.deleted}
+                for path in deleted:
+                    self.pending.pop(path, None)
+                for path in latest.keys() - deleted:
+                    self.pending[path] = time.time()
+
+                self._ingest(deleted, self._settled_paths())
+        except Exception as e:
+            logger.error(f"Library watcher stopped: {str(e)}")
+
+    def _settled_paths(self) -> Set[str]:
+        """Pending files not written to for settle_seconds"""
+        settled = set()
+        now = time.time()
+        for path in list(self.pending):
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                self.pending.pop(path, None)
+                continue
+            if now - mtime >= self.settle_seconds or now - self.pending[path] >= self.settle_seconds:
+                settled.add(path)
+                del self.pending[path]
+        return settled
+
+    def _ingest(self, deleted: Set[str], ready: Set[str]):
+        if not deleted and not ready:
+            return
+        db = SessionLocal()
+        try:
+            scanner = VideoScanner(db)
+            removed = scanner.forget_paths(sorted(deleted)) if deleted else 0
+            results = scanner.process_paths(sorted(ready)) if ready else VideoScanner.new_results()
+            logger.info(f"Watcher: {results['videos_added']} added, {removed} removed, "
+                        f"{len(results['errors'])} errors")
+        except Exception as e:
+            logger.error(f"Watcher ingestion failed: {str(e)}")
+        finally:
+            db.close()
@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+# Base SQLite jetable, à définir avant le premier import de app.database
+_db_dir = tempfile.mkdtemp(prefix="youtube-library-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("MEDIA_PATH", os.path.join(_db_dir, "media"))
+os.environ.setdefault("METADATA_CACHE_PATH", os.path.join(_db_dir, "metadata_cache.db"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app.database import Base, SessionLocal, engine
+from app.migrations import run_migrations
+from app import models  # noqa: F401
+
+Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
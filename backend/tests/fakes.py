@@ -0,0 +1,45 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from app.utils.metadata import MetadataExtractor
+from app.utils.metadata_cache import MetadataCache
+
+
+class FakeMetadataExtractor(MetadataExtractor):
+    """Stand-in for the YouTube extractor: fixed latency per fetch, no network
+
+    Counts fetches and the highest number of fetches in flight at once, so a
+    scan's concurrency and its network round trips can be measured.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_ids=()):
+        super().__init__(cache=MetadataCache(path=None))
+        self.latency = latency
+        self.fail_ids = set(fail_ids)
+        self.calls = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _fetch_metadata(self, video_id: str) -> Optional[Dict]:
+        with self._lock:
+            self.calls += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            time.sleep(self.latency)
+            if video_id in self.fail_ids:
+                return None
+            return {
+                'title': f"Video {video_id}",
+                'channel_name': "Fake Channel",
+                'channel_id': "UCfake",
+                'duration': 60,
+                'view_count': 1,
+                'like_count': 1,
+                'tags': [],
+            }
+        finally:
+            with self._lock:
+                self._in_flight -= 1
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.api.videos import router as videos_router
+from app.database import engine
+from app.models import Video
+
+CHANNELS = ("Bulk Channel A", "Bulk Channel B")
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(videos_router, prefix="/api")
+    return TestClient(app)
+
+
+@pytest.fixture
+def bulk_videos(db):
+    videos = [
+        Video(id=f"bulk{i:07d}", file_path=f"/media/bulk{i}.mp4", channel_name=CHANNELS[i % 2],
+              title=f"bulkzebra episode {i}", tags=json.dumps(["bulk-x"] + (["bulk-y"] if i % 3 == 0 else [])),
+              watched=(i % 4 == 0), duration=60 + i, file_size=1000 * i)
+        for i in range(12)
+    ]
+    db.add_all(videos)
+    db.commit()
+    yield [video.id for video in videos]
+    db.query(Video).filter(Video.id.like("bulk%")).delete(synchronize_session=False)
+    db.commit()
+
+
+def _listed_ids(client, params):
+    response = client.get("/api/videos", params={**params, "limit": 1000})
+    assert response.status_code == 200
+    return {video["id"] for video in response.json()}
+
+
+@pytest.mark.parametrize("selection", [{}, {"ids": []}, {"tag_mode": "any"}])
+def test_empty_selection_is_rejected(client, bulk_videos, selection):
+    response = client.post("/api/videos/bulk-update", json={"selection": selection, "watched": True})
+    assert response.status_code == 400
+    response = client.post("/api/videos/bulk-delete", json={"selection": selection})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("selection, params", [
+    ({"channel": CHANNELS[0], "watched": False}, {"channel": CHANNELS[0], "watched": False}),
+    ({"tags": ["bulk-x", "bulk-y"]}, {"tag": ["bulk-x", "bulk-y"]}),
+    ({"tags": ["bulk-y"], "channel": CHANNELS[1]}, {"tag": ["bulk-y"], "channel": CHANNELS[1]}),
+    ({"search": "bulkzebra", "watched": True}, {"search": "bulkzebra", "watched": True}),
+])
+def test_filter_selection_matches_listing(client, db, bulk_videos, selection, params):
+    expected = _listed_ids(client, params)
+    assert expected
+
+    response = client.post("/api/videos/bulk-update", json={"selection": selection, "reset_progress": True})
+    assert response.json() == {"updated": len(expected)}
+
+    response = client.post("/api/videos/bulk-delete", json={"selection": selection})
+    assert response.json()["deleted"] == len(expected)
+    remaining = {row.id for row in db.query(Video.id).filter(Video.id.in_(bulk_videos))}
+    assert remaining == set(bulk_videos) - expected
+
+
+def test_triggers_stay_consistent_after_bulk_delete(client, bulk_videos):
+    response = client.post("/api/videos/bulk-delete",
+                           json={"selection": {"channel": CHANNELS[0], "tags": ["bulk-y"], "tag_mode": "any"}})
+    assert response.json()["deleted"] > 0
+
+    with engine.connect() as conn:
+        library = conn.execute(text(
+            "SELECT video_count, watched_count, total_bytes, total_duration FROM library_stats")).one()
+        assert tuple(library) == tuple(conn.execute(text(
+            "SELECT count(*), coalesce(sum(watched), 0), coalesce(sum(file_size), 0), "
+            "coalesce(sum(duration), 0) FROM videos")).one())
+
+        for channel in CHANNELS:
+            stats = conn.execute(text(
+                "SELECT video_count, watched_count, total_bytes, total_duration FROM channel_stats "
+                "WHERE channel_name = :channel"), {"channel": channel}).one_or_none()
+            actual = conn.execute(text(
+                "SELECT count(*), coalesce(sum(watched), 0), coalesce(sum(file_size), 0), "
+                "coalesce(sum(duration), 0) FROM videos WHERE channel_name = :channel"),
+                {"channel": channel}).one()
+            assert (tuple(stats) if stats else (0, 0, 0, 0)) == tuple(actual)
+            count = conn.execute(text("SELECT video_count FROM channels WHERE name = :channel"),
+                                 {"channel": channel}).scalar()
+            assert (count or 0) == actual[0]
+
+        for tag in ("bulk-x", "bulk-y"):
+            count = conn.execute(text("SELECT video_count FROM tags WHERE name = :tag"), {"tag": tag}).scalar()
+            linked = conn.execute(text("SELECT count(*) FROM video_tags WHERE tag = :tag"), {"tag": tag}).scalar()
+            remaining = conn.execute(text(
+                "SELECT count(*) FROM videos, json_each(videos.tags) AS j WHERE j.value = :tag"),
+                {"tag": tag}).scalar()
+            assert (count or 0) == linked == remaining
+
+        indexed = {row[0] for row in conn.execute(text(
+            "SELECT rowid FROM videos_fts WHERE videos_fts MATCH 'bulkzebra'"))}
+        stored = {row[0] for row in conn.execute(text(
+            "SELECT rowid FROM videos WHERE title LIKE 'bulkzebra%'"))}
+        assert indexed == stored
+
+    # Recherche plein texte après suppression: uniquement les vidéos restantes
+    with engine.connect() as conn:
+        remaining = {row[0] for row in conn.execute(text("SELECT id FROM videos WHERE id LIKE 'bulk%'"))}
+    assert _listed_ids(client, {"search": "bulkzebra"}) == remaining
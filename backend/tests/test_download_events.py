@@ -0,0 +1,15 @@
+import asyncio
+
+from app.api.download import download_events_stream
+from app.download_events import download_events
+
+
+def test_unstarted_stream_leaves_no_subscriber():
+    async def open_and_drop():
+        response = await download_events_stream(request=None)
+        # Réponse jamais envoyée: le générateur n'est pas parcouru
+        await response.body_iterator.aclose()
+
+    asyncio.run(open_and_drop())
+
+    assert download_events.stats()['subscribers'] == 0
@@ -0,0 +1,56 @@
+import os
+import threading
+
+from app.download_queue import DownloadQueue, ACTIVE_STATUSES
+from app.downloader import VideoDownloader
+from app.models import DownloadTask
+
+
+def test_concurrent_enqueue_creates_a_single_task(tmp_path, db):
+    queue = DownloadQueue(VideoDownloader(str(tmp_path)), workers=1)
+    url = "https://www.youtube.com/watch?v=concurrent1"
+    barrier = threading.Barrier(8)
+    results = []
+
+    def enqueue():
+        barrier.wait()
+        results.append(queue.enqueue(url))
+
+    threads = [threading.Thread(target=enqueue) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(created for _, created in results) == 1
+    assert len({task.task_id for task, _ in results}) == 1
+    active = (db.query(DownloadTask)
+              .filter(DownloadTask.video_id == "concurrent1", DownloadTask.status.in_(ACTIVE_STATUSES))
+              .count())
+    assert active == 1
+
+
+def test_cancel_pending_task_removes_work_dir(tmp_path):
+    downloader = VideoDownloader(str(tmp_path))
+    queue = DownloadQueue(downloader, workers=1)
+    task, _ = queue.enqueue("https://www.youtube.com/watch?v=cancelPend1")
+    # Fichier partiel laissé par une tentative précédente, nouvelle tentative en attente
+    work_dir = downloader._work_dir(task.video_id)
+    os.makedirs(work_dir)
+    with open(os.path.join(work_dir, f"{task.video_id}.f18.mp4.part"), "wb") as f:
+        f.write(b"\0" * 1024)
+
+    assert queue.cancel(task.task_id)
+
+    assert queue.get(task.task_id)['status'] == 'cancelled'
+    assert not os.path.exists(work_dir)
+
+
+def test_cancel_finished_download_leaves_no_event(tmp_path):
+    downloader = VideoDownloader(str(tmp_path))
+    downloader.claim_download("task-done")
+    downloader.finish_download("task-done", 'completed')
+
+    downloader.cancel_download("task-done")
+
+    assert downloader.cancel_events == {}
@@ -0,0 +1,52 @@
+import time
+
+from app.download_registry import DownloadRegistry
+
+
+def test_sweep_drops_only_finished_records_past_ttl():
+    registry = DownloadRegistry(max_entries=10, ttl=60)
+    registry.create("running")
+    registry.create("recent")
+    registry.create("expired")
+    registry.finish("recent", "completed")
+    registry.finish("expired", "error")
+    registry.get("expired").finished_at = time.monotonic() - 61
+
+    assert registry.sweep() == 1
+    assert registry.get("expired") is None
+    assert registry.get("recent").status == "completed"
+    assert registry.get("running") is not None
+
+    # Une tâche en cours n'expire jamais, quel que soit son âge
+    assert registry.sweep(max_age=0) == 1
+    assert list(registry.records) == ["running"]
+    assert registry.evicted == 2
+
+
+def test_overflow_evicts_oldest_finished_and_never_running():
+    registry = DownloadRegistry(max_entries=3, ttl=3600)
+    registry.create("running-1")
+    registry.create("done-old")
+    registry.create("done-new")
+    registry.finish("done-old")
+    registry.finish("done-new")
+    registry.get("done-old").finished_at -= 10
+
+    registry.create("running-2")
+    assert set(registry.records) == {"running-1", "done-new", "running-2"}
+
+    registry.create("running-3")
+    registry.create("running-4")
+    # Plus rien de terminé à retirer: la limite est dépassée plutôt que de perdre une tâche en cours
+    assert set(registry.records) == {"running-1", "running-2", "running-3", "running-4"}
+    assert registry.stats()["running"] == 4
+    assert registry.evicted == 2
+
+
+def test_finish_keeps_terminal_status():
+    registry = DownloadRegistry()
+    registry.create("task")
+    registry.get("task").update(status="cancelled")
+    registry.finish("task")
+    assert registry.get("task").status == "cancelled"
+    registry.finish("missing")
@@ -0,0 +1,161 @@
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.downloader import VideoDownloader, is_permanent_error
+
+VIDEO_ID = "resumeTest1"
+VIDEO_SIZE = 2 * 1024 * 1024
+# Octets envoyés avant de couper la connexion quand le serveur est instable
+DROP_AFTER = 64 * 1024
+
+
+class FlakyVideoServer(ThreadingHTTPServer):
+    """Local stand-in for a video host that honours Range and can drop connections mid-body"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FlakyVideoHandler)
+        self.payload = bytes(i % 251 for i in range(VIDEO_SIZE))
+        self.drop = True
+        # Reprise refusée en 404, comme un fragment dont l'URL signée a expiré
+        self.missing_resumes = False
+        # Début de chaque requête Range du téléchargeur, et octets envoyés pour celles-ci
+        self.ranges = []
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/{VIDEO_ID}.mp4"
+
+
+class FlakyVideoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body: bool):
+        server = self.server
+        payload = server.payload
+        start = 0
+        match = re.match(r"bytes=(\d+)-", self.headers.get("Range") or "")
+        if match:
+            start = int(match.group(1))
+        if send_body and match:
+            with server.lock:
+                server.ranges.append(start)
+        if send_body and start > 0 and server.missing_resumes:
+            self.send_error(404)
+            return
+
+        self.send_response(206 if match else 200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(payload) - start))
+        if match:
+            self.send_header("Content-Range", f"bytes {start}-{len(payload) - 1}/{len(payload)}")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        if not send_body:
+            return
+
+        body = payload[start:start + DROP_AFTER] if server.drop else payload[start:]
+        self.close_connection = True
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Le client a refermé après les en-têtes (détection du type de contenu)
+            return
+        if match:
+            with server.lock:
+                server.bytes_sent += len(body)
+
+
+@pytest.fixture
+def video_server():
+    server = FlakyVideoServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _part_files(downloader: VideoDownloader):
+    work_dir = downloader._work_dir(VIDEO_ID)
+    return [os.path.join(work_dir, name) for name in os.listdir(work_dir) if name.endswith(".part")]
+
+
+def test_retry_resumes_from_partial_file(tmp_path, video_server):
+    pytest.importorskip("yt_dlp")
+    downloader = VideoDownloader(str(tmp_path))
+
+    # Première tentative: chaque connexion est coupée, les reprises internes ne suffisent pas
+    assert downloader._download_with_yt_dlp(video_server.url, VIDEO_ID, "task-1") is None
+    parts = _part_files(downloader)
+    assert len(parts) == 1
+    partial_size = os.path.getsize(parts[0])
+    assert 0 < partial_size < VIDEO_SIZE
+
+    # Nouvelle tentative sur un serveur stable: reprise à la fin du .part, pas depuis zéro
+    video_server.drop = False
+    resumed_from = len(video_server.ranges)
+    sent_before = video_server.bytes_sent
+    result = downloader._download_with_yt_dlp(video_server.url, VIDEO_ID, "task-2")
+
+    assert result is not None
+    filename, info = result
+    with open(filename, "rb") as f:
+        assert f.read() == video_server.payload
+    assert info["id"] == VIDEO_ID
+    assert video_server.ranges[resumed_from:] == [partial_size]
+    assert video_server.bytes_sent - sent_before == VIDEO_SIZE - partial_size
+
+
+def test_download_404_is_retried_with_partial_file_kept(tmp_path, video_server):
+    pytest.importorskip("yt_dlp")
+    downloader = VideoDownloader(str(tmp_path))
+    video_server.missing_resumes = True
+
+    # Le 404 vient de l'étape de téléchargement: échec temporaire, pas PermanentDownloadError
+    assert downloader._download_with_yt_dlp(video_server.url, VIDEO_ID, "task-404") is None
+    parts = _part_files(downloader)
+    assert len(parts) == 1
+    partial_size = os.path.getsize(parts[0])
+    assert partial_size > 0
+
+    video_server.drop = False
+    video_server.missing_resumes = False
+    resumed_from = len(video_server.ranges)
+    result = downloader._download_with_yt_dlp(video_server.url, VIDEO_ID, "task-404-retry")
+
+    assert result is not None
+    assert video_server.ranges[resumed_from:] == [partial_size]
+
+
+@pytest.mark.parametrize("message, permanent", [
+    ("ERROR: [youtube] dQw4w9WgXcQ: Video unavailable. This video has been removed by the uploader", True),
+    ("ERROR: [youtube] dQw4w9WgXcQ: Private video. Sign in if you've been granted access", True),
+    ("WARNING: [youtube] retrying\nERROR: [youtube] dQw4w9WgXcQ: Sign in to confirm your age", True),
+    ("ERROR: Unsupported URL: https://example.com/", True),
+    ("[download] Got error: HTTP Error 404: Not Found", False),
+    ("ERROR: unable to download video data: HTTP Error 404: Not Found", False),
+    ("ERROR: [download] Got error: HTTP Error 410: Gone", False),
+    ("ERROR: fragment 12 not found, unable to continue", False),
+])
+def test_only_extractor_errors_are_permanent(message, permanent):
+    assert is_permanent_error(message) is permanent
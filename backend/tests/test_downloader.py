@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from app.downloader import VideoDownloader
+from app.models import Video
+from tests.fakes import FakeMetadataExtractor
+
+yt_dlp = pytest.importorskip("yt_dlp")
+
+
+class StubYoutubeDL:
+    """Replaces yt_dlp.YoutubeDL: writes the file a real download would and returns its info dict"""
+
+    extractions = []
+
+    def __init__(self, params):
+        self.params = params
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=True):
+        StubYoutubeDL.extractions.append((url, download))
+        video_id = url.rsplit("=", 1)[-1]
+        filepath = self.params['outtmpl'] % {'format_id': '18', 'ext': 'mp4'}
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'wb') as f:
+            f.write(b'\0' * 4096)
+        return {
+            'id': video_id,
+            'title': "Stubbed title",
+            'uploader': "Stub Channel",
+            'channel_id': "UCstub",
+            'duration': 42,
+            'ext': 'mp4',
+            'requested_downloads': [{'filepath': filepath}],
+        }
+
+
+def test_download_extracts_once_and_reuses_info(tmp_path, db, monkeypatch):
+    monkeypatch.setattr(yt_dlp, 'YoutubeDL', StubYoutubeDL)
+    StubYoutubeDL.extractions = []
+    downloader = VideoDownloader(str(tmp_path))
+    downloader.metadata_extractor = FakeMetadataExtractor()
+
+    outcome = downloader.download("task-once", "https://www.youtube.com/watch?v=onceExtrac1")
+
+    assert StubYoutubeDL.extractions == [("https://www.youtube.com/watch?v=onceExtrac1", True)]
+    assert downloader.metadata_extractor.calls == 0
+    assert outcome['filename'] == os.path.join(str(tmp_path), "Stubbed title-onceExtrac1.mp4")
+    video = db.get(Video, "onceExtrac1")
+    assert (video.title, video.channel_name, video.duration) == ("Stubbed title", "Stub Channel", 42)
+    assert not os.path.exists(downloader._work_dir("onceExtrac1"))
@@ -0,0 +1,80 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.api.videos import router as videos_router
+from app.database import engine
+from app.generation import etag_matches, library_generation
+from app.models import Video
+
+
+def _client():
+    app = FastAPI()
+    app.include_router(videos_router, prefix="/api")
+    return TestClient(app)
+
+
+def test_matching_etag_returns_304_without_query(db):
+    db.add(Video(id="etag0000001", file_path="/media/etag0000001.mp4", title="etag"))
+    db.commit()
+    client = _client()
+    etag = client.get("/api/videos/etag0000001").headers["etag"]
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get("/api/videos/etag0000001", headers={"If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+    assert statements == []
+
+
+def test_commit_bumps_generation_and_rollback_does_not(db):
+    generation = library_generation.value
+    db.add(Video(id="etag0000002", file_path="/media/etag0000002.mp4", title="before"))
+    db.flush()
+    db.rollback()
+    assert library_generation.value == generation
+
+    db.add(Video(id="etag0000002", file_path="/media/etag0000002.mp4", title="before"))
+    db.commit()
+    assert library_generation.value > generation
+
+    generation = library_generation.value
+    db.get(Video, "etag0000002").title = "after"
+    db.rollback()
+    assert library_generation.value == generation
+
+    # Écriture en masse (query.update): détectée sans événements du mapper
+    db.query(Video).filter(Video.id == "etag0000002").update({Video.title: "bulk"})
+    db.commit()
+    assert library_generation.value > generation
+
+
+def test_stale_etag_after_write_gets_full_response(db):
+    db.add(Video(id="etag0000003", file_path="/media/etag0000003.mp4", title="v1"))
+    db.commit()
+    client = _client()
+    etag = client.get("/api/videos/etag0000003").headers["etag"]
+
+    db.get(Video, "etag0000003").title = "v2"
+    db.commit()
+    response = client.get("/api/videos/etag0000003", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["title"] == "v2"
+    assert response.headers["etag"] != etag
+
+
+def test_etag_matches_weak_comparison():
+    assert etag_matches('W/"lib-1"', 'W/"lib-1"')
+    assert etag_matches('"lib-1"', 'W/"lib-1"')
+    assert etag_matches('W/"lib-0", W/"lib-1"', 'W/"lib-1"')
+    assert etag_matches("*", 'W/"lib-1"')
+    assert not etag_matches('W/"lib-2"', 'W/"lib-1"')
+    assert not etag_matches(None, 'W/"lib-1"')
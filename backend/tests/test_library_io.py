@@ -0,0 +1,98 @@
+import gzip
+import zlib
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import library_io
+from app.api.library import router as library_router
+from app.library_io import StreamDecoder, export_stream, import_chunks, _loads
+from app.models import Video
+
+
+def _rows(data: bytes, ids):
+    lines = [_loads(line) for line in gzip.decompress(data).splitlines() if line]
+    return {row['id']: row for row in lines if row['id'] in ids}
+
+
+def _add_videos(db, ids):
+    db.add_all([
+        Video(id=video_id, file_path=f"/media/{video_id}.mp4", title=f"Title {video_id}",
+              channel_name="Round Trip", duration=60 + i, file_size=1000 * i,
+              tags='["a", "b"]', watched=bool(i % 2))
+        for i, video_id in enumerate(ids)
+    ])
+    db.commit()
+
+
+def test_export_import_round_trip(db):
+    ids = [f"roundtrip{i:02d}" for i in range(5)]
+    _add_videos(db, ids)
+    exported = b"".join(export_stream(compression='gzip'))
+    before = _rows(exported, ids)
+    assert set(before) == set(ids)
+
+    db.query(Video).filter(Video.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+    results = import_chunks([exported[i:i + 100] for i in range(0, len(exported), 100)], 'gzip')
+
+    assert results['invalid'] == 0
+    after = _rows(b"".join(export_stream(compression='gzip')), ids)
+    assert after == before
+
+
+def test_incremental_export_carries_deletions(db):
+    ids = [f"tombstone{i:02d}" for i in range(3)]
+    _add_videos(db, ids)
+    full = b"".join(export_stream(compression='gzip'))
+    since = datetime.utcnow() - timedelta(seconds=1)
+
+    db.query(Video).filter(Video.id == ids[0]).delete(synchronize_session=False)
+    db.commit()
+    incremental = b"".join(export_stream(since, compression='gzip'))
+    assert _rows(incremental, ids)[ids[0]]['deleted'] is True
+
+    # Une autre bibliothèque à jour de l'export complet rejoue l'incrémental
+    import_chunks([full], 'gzip')
+    assert db.get(Video, ids[0]) is not None
+    results = import_chunks([incremental], 'gzip')
+
+    db.expire_all()
+    assert results['deleted'] == 1
+    assert db.get(Video, ids[0]) is None
+    assert db.get(Video, ids[1]) is not None
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_stream_decoder_bounds_each_piece(compression):
+    payload = b'{"id": "x"}\n' * 500_000
+    if compression == "gzip":
+        compressed = zlib.compress(payload, 9)
+    else:
+        zstandard = pytest.importorskip("zstandard")
+        compressed = zstandard.ZstdCompressor().compress(payload)
+    pieces = []
+    decoder = StreamDecoder(compression, pieces.append, max_length=64 * 1024)
+
+    for i in range(0, len(compressed), 4096):
+        decoder.write(compressed[i:i + 4096])
+    decoder.close()
+
+    assert max(len(piece) for piece in pieces) <= 64 * 1024
+    assert b"".join(pieces) == payload
+
+
+def test_import_error_survives_failing_final_flush(monkeypatch):
+    app = FastAPI()
+    app.include_router(library_router, prefix="/api")
+
+    def failing_finish(self):
+        raise RuntimeError("constraint failed")
+
+    monkeypatch.setattr(library_io.LibraryImporter, "finish", failing_finish)
+    response = TestClient(app).post("/api/library/import?compression=gzip", content=b"not gzip data")
+
+    assert response.status_code == 400
+    assert response.json()['detail'].startswith("Import stopped at line 0")
@@ -0,0 +1,16 @@
+from app.utils import metadata_cache
+from app.utils.metadata import LIBRARY_FIELDS
+from app.utils.metadata_cache import MetadataCache
+
+
+def test_volatile_fields_expire_without_evicting_stable_ones(monkeypatch):
+    cache = MetadataCache(path=None, default_ttl=1000, field_ttls={'view_count': 10})
+    now = [1_000_000.0]
+    monkeypatch.setattr(metadata_cache.time, 'time', lambda: now[0])
+    cache.store('stableField', {'title': 'Title', 'view_count': 42})
+
+    now[0] += 60
+
+    assert cache.lookup('stableField') == (False, None)
+    assert cache.lookup('stableField', LIBRARY_FIELDS) == (True, {'title': 'Title', 'view_count': 42})
+    assert cache.lookup('stableField', ('title', 'view_count')) == (False, None)
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.videos import router as videos_router
+from app.models import Video
+from app.pagination import SORT_FIELDS
+
+CHANNEL = "Keyset Channel"
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.include_router(videos_router, prefix="/api")
+    return TestClient(app)
+
+
+@pytest.fixture(scope="module")
+def keyset_videos():
+    from app.database import SessionLocal
+
+    day = datetime(2026, 1, 1)
+    later = datetime(2026, 2, 1)
+    # Valeurs en double et NULL pour chaque clé de tri
+    specs = [
+        ("keyset00001", "B", 30, day, day, day),
+        ("keyset00002", "B", 30, day, day, day),
+        ("keyset00003", None, None, later, None, None),
+        ("keyset00004", "A", 10, day, later, None),
+        ("keyset00005", None, None, later, None, later),
+        ("keyset00006", "C", 30, day, day, later),
+        ("keyset00007", "A", None, later, later, day),
+    ]
+    db = SessionLocal()
+    try:
+        db.add_all([
+            Video(id=video_id, file_path=f"/media/{video_id}.mp4", channel_name=CHANNEL, title=title,
+                  duration=duration, added_date=added, upload_date=uploaded, last_watched=watched_at)
+            for video_id, title, duration, added, uploaded, watched_at in specs
+        ])
+        db.commit()
+        return {video.id: video for video in db.query(Video).filter(Video.channel_name == CHANNEL)}
+    finally:
+        db.close()
+
+
+def _expected(videos, sort, descending):
+    def key(video):
+        value = getattr(video, sort)
+        # NULL remplacé par la sentinelle de l'index: avant toute autre valeur
+        return ((0, 0) if value is None else (1, value), video.id)
+    return [video.id for video in sorted(videos.values(), key=key, reverse=descending)]
+
+
+@pytest.mark.parametrize("sort", SORT_FIELDS)
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_keyset_pages_cover_every_row_once(client, keyset_videos, sort, order):
+    seen = []
+    cursor = None
+    for _ in range(10):
+        params = {"channel": CHANNEL, "sort": sort, "order": order, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/videos", params=params)
+        assert response.status_code == 200
+        seen += [video["id"] for video in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert seen == _expected(keyset_videos, sort, order == "desc")
+
+
+def test_cors_exposes_pagination_headers():
+    from app.main import app
+
+    response = TestClient(app).get("/api/videos", params={"limit": 1},
+                                   headers={"Origin": "https://library.example"})
+    exposed = {header.strip().lower() for header in
+               response.headers["access-control-expose-headers"].split(",")}
+    assert {"x-next-cursor", "x-total-count", "etag"} <= exposed
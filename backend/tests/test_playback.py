@@ -0,0 +1,42 @@
+from app.generation import library_generation
+from app.models import Video
+from app.playback import PlaybackTracker
+from app.query_cache import query_cache, video_tag, LIST_TAG
+
+
+def _cache_list_page():
+    query_cache.set(("list-page",), b"[]", {LIST_TAG}, query_cache.version)
+
+
+def test_position_only_flush_keeps_list_cache_and_etag(db):
+    db.add(Video(id="playback001", file_path="/media/playback001.mp4", title="t", duration=600))
+    db.commit()
+    tracker = PlaybackTracker(session_gap=3600)
+
+    # Début de session: last_watched et local_views changent
+    tracker.record("playback001", 10, 600)
+    generation = library_generation.value
+    tracker.flush()
+    assert library_generation.value > generation
+
+    # Même session, position seule
+    _cache_list_page()
+    query_cache.set(("detail", "playback001"), b"{}", {video_tag("playback001")}, query_cache.version)
+    generation = library_generation.value
+    tracker.record("playback001", 120, 600)
+    tracker.flush()
+
+    assert library_generation.value == generation
+    assert query_cache.get(("list-page",)) is not None
+    assert query_cache.get(("detail", "playback001")) is None
+    db.expire_all()
+    assert db.get(Video, "playback001").playback_position == 120
+
+    # Seuil atteint: la vidéo passe à vue, listes et ETags sont invalidés
+    tracker.record("playback001", 590)
+    tracker.flush()
+
+    assert library_generation.value > generation
+    assert query_cache.get(("list-page",)) is None
+    db.expire_all()
+    assert db.get(Video, "playback001").watched is True
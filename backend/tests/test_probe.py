@@ -0,0 +1,88 @@
+import struct
+
+import pytest
+
+from app.utils import probe
+from app.utils.probe import probe_file
+
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def _mvhd(version: int) -> bytes:
+    if version == 1:
+        # version/flags, création, modification (64 bits), timescale, durée (64 bits)
+        payload = struct.pack('>I', 1 << 24) + struct.pack('>QQIQ', 0, 0, 1000, 95000)
+    else:
+        payload = struct.pack('>I', 0) + struct.pack('>IIII', 0, 0, 1000, 95000)
+    return _box(b'mvhd', payload + b'\x00' * 80)
+
+
+def _tkhd(version: int, width: int, height: int) -> bytes:
+    header = struct.pack('>I', version << 24)
+    if version == 1:
+        # création, modification, track_id, réservé, durée sur 64 bits
+        fields = struct.pack('>QQIIQ', 0, 0, 1, 0, 95000)
+    else:
+        fields = struct.pack('>IIIII', 0, 0, 1, 0, 95000)
+    # réservé, layer, alternate_group, volume, réservé, matrice
+    rest = b'\x00' * 8 + b'\x00' * 8 + b'\x00' * 36
+    return _box(b'tkhd', header + fields + rest + struct.pack('>II', width << 16, height << 16))
+
+
+def _mp4(version: int) -> bytes:
+    hdlr = _box(b'hdlr', struct.pack('>II', 0, 0) + b'vide' + b'\x00' * 12)
+    stsd = _box(b'stsd', struct.pack('>II', 0, 1) + struct.pack('>I', 0) + b'avc1' + b'\x00' * 16)
+    stbl = _box(b'stbl', stsd)
+    minf = _box(b'minf', stbl)
+    mdia = _box(b'mdia', hdlr + minf)
+    trak = _box(b'trak', _tkhd(version, 1920, 1080) + mdia)
+    moov = _box(b'moov', _mvhd(version) + trak)
+    ftyp = _box(b'ftyp', b'isom' + b'\x00' * 4)
+    return ftyp + moov + _box(b'mdat', b'\x00' * 64)
+
+
+@pytest.mark.parametrize("version", [0, 1])
+def test_probe_mp4_box_versions(tmp_path, version):
+    path = tmp_path / f"v{version}.mp4"
+    path.write_bytes(_mp4(version))
+
+    info = probe_file(str(path))
+
+    assert info == {'duration': 95, 'width': 1920, 'height': 1080,
+                    'codec': 'h264', 'resolution': '1920x1080'}
+
+
+def test_probe_mp4_stops_after_moov(tmp_path, monkeypatch):
+    path = tmp_path / "moov_first.mp4"
+    path.write_bytes(_mp4(0))
+    seen = []
+    read_box_header = probe._read_box_header
+
+    def spy(f, offset, end):
+        header = read_box_header(f, offset, end)
+        if header:
+            seen.append(header[0])
+        return header
+
+    monkeypatch.setattr(probe, '_read_box_header', spy)
+    assert probe_file(str(path))
+    assert b'mdat' not in seen
+
+
+def test_probe_pool_uses_a_fork_safe_start_method(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"pool{i}.mp4"
+        path.write_bytes(_mp4(i % 2))
+        paths.append(str(path))
+
+    executor = probe.probe_pool(2)
+    try:
+        assert executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+        results = probe.probe_files(paths, executor, 2)
+    finally:
+        executor.shutdown()
+
+    assert [results[path]['resolution'] for path in paths] == ['1920x1080'] * 3
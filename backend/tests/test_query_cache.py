@@ -0,0 +1,70 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.videos import router as videos_router
+from app.models import Video
+from app.query_cache import QueryCache, query_cache, video_tag, ALL_TAGS, FACETS_TAG, LIST_TAG
+
+
+def test_invalidate_removes_only_tagged_entries():
+    cache = QueryCache(max_entries=10)
+    cache.set("list", b"[]", {LIST_TAG, video_tag("a")}, cache.version)
+    cache.set("detail-a", b"{}", {video_tag("a")}, cache.version)
+    cache.set("detail-b", b"{}", {video_tag("b")}, cache.version)
+    cache.set("facets", b"{}", {FACETS_TAG}, cache.version)
+
+    cache.invalidate({video_tag("a")})
+    assert cache.get("list") is None
+    assert cache.get("detail-a") is None
+    assert cache.get("detail-b") is not None
+    assert cache.get("facets") is not None
+
+    cache.invalidate({ALL_TAGS})
+    assert cache.stats()['entries'] == 0
+
+
+def test_result_computed_before_invalidation_is_not_stored():
+    cache = QueryCache(max_entries=10)
+    version = cache.version
+    # Une écriture est validée pendant que la requête s'exécutait
+    cache.invalidate({LIST_TAG})
+    cache.set("list", b"[]", {LIST_TAG}, version)
+
+    assert cache.get("list") is None
+    assert cache.stats()['stale_writes'] == 1
+    cache.set("list", b"[]", {LIST_TAG}, cache.version)
+    assert cache.get("list") is not None
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = QueryCache(max_entries=2)
+    cache.set("a", b"a", set(), cache.version)
+    cache.set("b", b"b", set(), cache.version)
+    cache.get("a")
+    cache.set("c", b"c", set(), cache.version)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_commit_invalidates_cached_detail_and_rollback_does_not(db):
+    db.add(Video(id="qcache00001", file_path="/media/qcache00001.mp4", title="v1"))
+    db.commit()
+    app = FastAPI()
+    app.include_router(videos_router, prefix="/api")
+    client = TestClient(app)
+    key = ('video', "qcache00001")
+
+    client.get("/api/videos/qcache00001")
+    assert query_cache.get(key) is not None
+
+    db.get(Video, "qcache00001").title = "discarded"
+    db.flush()
+    db.rollback()
+    assert query_cache.get(key) is not None
+
+    db.get(Video, "qcache00001").title = "v2"
+    db.commit()
+    assert query_cache.get(key) is None
+    assert client.get("/api/videos/qcache00001").json()["title"] == "v2"
@@ -0,0 +1,96 @@
+import json
+import time
+
+from app.models import Video
+from app.scanner import VideoScanner
+from tests.fakes import FakeMetadataExtractor
+
+
+def _write_videos(directory, prefix: str, count: int, sidecars: bool = False):
+    ids = []
+    for i in range(count):
+        video_id = f"{prefix}{i:03d}".ljust(11, "x")[:11]
+        path = directory / f"Video {i}-{video_id}.mp4"
+        path.write_bytes(video_id.encode() * 200)
+        if sidecars:
+            info = {'id': video_id, 'title': f"Sidecar {i}", 'uploader': "Local", 'duration': 30}
+            path.with_suffix('.info.json').write_text(json.dumps(info), encoding='utf-8')
+        ids.append(video_id)
+    return ids
+
+
+def test_scan_with_sidecars_makes_no_network_calls(tmp_path, db):
+    ids = _write_videos(tmp_path, "sidecar", 5, sidecars=True)
+    extractor = FakeMetadataExtractor()
+
+    results = VideoScanner(db, metadata_extractor=extractor).scan_directory(str(tmp_path))
+
+    assert extractor.calls == 0
+    assert results['videos_added'] == 5
+    assert results['errors'] == []
+    titles = {video.id: video.title for video in db.query(Video).filter(Video.id.in_(ids))}
+    assert titles == {video_id: f"Sidecar {i}" for i, video_id in enumerate(ids)}
+
+
+def test_scan_fetches_metadata_concurrently(tmp_path, db):
+    count, latency = 16, 0.05
+    ids = _write_videos(tmp_path, "fetchpar", count)
+    extractor = FakeMetadataExtractor(latency=latency, fail_ids={ids[0]})
+
+    started = time.monotonic()
+    results = VideoScanner(db, metadata_extractor=extractor, max_workers=8).scan_directory(str(tmp_path))
+    elapsed = time.monotonic() - started
+
+    assert extractor.calls == count
+    assert extractor.max_in_flight > 1
+    assert elapsed < count * latency
+    assert results['videos_added'] == count
+    # Échec d'extraction: la vidéo est ajoutée avec le nom du fichier comme titre
+    assert db.get(Video, ids[0]).title == f"Video 0-{ids[0]}"
+
+
+def test_scan_probes_over_one_pool_and_closes_it(tmp_path, db, monkeypatch):
+    from app import scanner as scanner_module
+
+    monkeypatch.setattr(scanner_module, "SCAN_PROBE_POOL_MIN_FILES", 2)
+    created = []
+    real_pool = scanner_module.probe_pool
+
+    def tracking_pool(max_workers):
+        created.append(real_pool(max_workers))
+        return created[-1]
+
+    monkeypatch.setattr(scanner_module, "probe_pool", tracking_pool)
+    _write_videos(tmp_path, "poolscan", 4, sidecars=True)
+    scanner = VideoScanner(db, metadata_extractor=FakeMetadataExtractor(), probe_workers=2)
+
+    results = scanner.scan_directory(str(tmp_path))
+
+    assert results['videos_added'] == 4
+    assert len(created) == 1
+    assert scanner._probe_pool is None
+
+
+def test_rescan_refreshes_a_modified_file(tmp_path, db):
+    import os
+    from sqlalchemy import func
+    from app.models import LibraryStats
+    from tests.test_probe import _mp4
+
+    [video_id] = _write_videos(tmp_path, "modified", 1, sidecars=True)
+    path = next(tmp_path.glob("*.mp4"))
+    VideoScanner(db, metadata_extractor=FakeMetadataExtractor()).scan_directory(str(tmp_path))
+    assert db.get(Video, video_id).file_size == 2200
+
+    # Fichier remplacé sur place par une version réencodée
+    path.write_bytes(_mp4(0) + b"\0" * 5000)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    results = VideoScanner(db, metadata_extractor=FakeMetadataExtractor()).scan_directory(str(tmp_path))
+
+    db.expire_all()
+    video = db.get(Video, video_id)
+    assert results['videos_added'] == 0
+    assert video.file_size == path.stat().st_size
+    assert (video.duration, video.resolution, video.video_codec) == (95, '1920x1080', 'h264')
+    assert db.get(LibraryStats, 1).total_bytes == db.query(func.sum(Video.file_size)).scalar()
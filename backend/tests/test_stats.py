@@ -0,0 +1,88 @@
+from datetime import date, datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import generation
+from app.api.stats import router as stats_router
+from app.database import engine
+from app.models import LibraryStats, Video, WatchActivity
+from app.stats import backfill_stats
+
+
+def _completed(db, day: str) -> int:
+    db.expire_all()
+    activity = db.get(WatchActivity, day)
+    return activity.completed if activity else 0
+
+
+def test_only_playback_completions_count_as_activity(db):
+    played_at = datetime(2026, 3, 1, 20, 0)
+    db.add_all([
+        Video(id=f"activity{i:03d}", file_path=f"/tmp/activity{i}.mp4", title="t",
+              last_watched=played_at, watched=False)
+        for i in range(3)
+    ])
+    db.commit()
+    before = _completed(db, "2026-03-01")
+
+    # Marquage groupé: pas de lecture, pas d'activité
+    (db.query(Video).filter(Video.id.in_(["activity000", "activity001"]))
+     .update({Video.watched: True}, synchronize_session=False))
+    db.commit()
+    assert _completed(db, "2026-03-01") == before
+
+    # Fin de lecture: position et watched écrits ensemble, comme le flush du suivi de lecture
+    (db.query(Video).filter(Video.id == "activity002")
+     .update({Video.watched: True, Video.playback_position: 590}, synchronize_session=False))
+    db.commit()
+    assert _completed(db, "2026-03-01") == before + 1
+
+
+def test_stats_etag_changes_with_the_day(monkeypatch):
+    app = FastAPI()
+    app.include_router(stats_router, prefix="/api")
+    client = TestClient(app)
+
+    class Today(date):
+        current = date(2026, 3, 1)
+
+        @classmethod
+        def today(cls):
+            return cls.current
+
+    monkeypatch.setattr(generation, "date", Today)
+    etag = client.get("/api/stats").headers["etag"]
+    assert client.get("/api/stats", headers={"If-None-Match": etag}).status_code == 304
+
+    Today.current = date(2026, 3, 2)
+    response = client.get("/api/stats", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_backfill_then_triggers_count_completions_consistently(db):
+    played_at = datetime(2026, 4, 2, 21, 0)
+    db.add_all([
+        Video(id="backfill001", file_path="/tmp/backfill001.mp4", title="t", file_size=100,
+              last_watched=played_at, watched=True),
+        Video(id="backfill002", file_path="/tmp/backfill002.mp4", title="t", file_size=200,
+              last_watched=played_at, watched=False),
+    ])
+    db.commit()
+
+    with engine.begin() as conn:
+        backfill_stats(conn)
+    # Marqué vu avant les triggers: une vue, pas une fin de lecture
+    assert _completed(db, "2026-04-02") == 0
+    assert db.get(WatchActivity, "2026-04-02").views == 2
+    totals = db.get(LibraryStats, 1)
+    assert totals.watched_count == db.query(Video).filter(Video.watched.is_(True)).count()
+
+    (db.query(Video).filter(Video.id == "backfill002")
+     .update({Video.watched: True, Video.playback_position: 500}, synchronize_session=False))
+    db.commit()
+
+    assert _completed(db, "2026-04-02") == 1
+    db.expire_all()
+    assert db.get(LibraryStats, 1).watched_count == db.query(Video).filter(Video.watched.is_(True)).count()
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from app.utils.sidecar import DOWNLOAD_WORK_DIR
+from app.watcher import PARTIAL_FILE_PATTERN, LibraryWatcher
+
+
+@pytest.mark.parametrize("name", [
+    "video.mp4.part", "video.mp4.PART", "video.mp4.part-Frag12", "video.mp4.ytdl",
+    "video.f137.mp4", "video.f251.webm", "video.temp.mp4", "video.mkv.crdownload", "video.tmp",
+])
+def test_partial_file_pattern_matches_temporary_files(name):
+    assert PARTIAL_FILE_PATTERN.search(name)
+
+
+@pytest.mark.parametrize("name", [
+    "video.mp4", "party.mkv", "f137.mp4", "video-f137.mp4", "temperature.webm", "my.partner.mov",
+])
+def test_partial_file_pattern_keeps_finished_videos(name):
+    assert not PARTIAL_FILE_PATTERN.search(name)
+
+
+def test_is_candidate(tmp_path):
+    root = str(tmp_path)
+    assert LibraryWatcher.is_candidate(os.path.join(root, "channel", "video.mp4"))
+    assert LibraryWatcher.is_candidate(os.path.join(root, "video.MKV"))
+    assert not LibraryWatcher.is_candidate(os.path.join(root, "video.info.json"))
+    assert not LibraryWatcher.is_candidate(os.path.join(root, "video.mp4.part"))
+    assert not LibraryWatcher.is_candidate(os.path.join(root, "video.f137.mp4"))
+    # Répertoire de travail des téléchargements: ignoré même pour un fichier fusionné
+    assert not LibraryWatcher.is_candidate(os.path.join(root, DOWNLOAD_WORK_DIR, "abc123", "video.mp4"))
+    assert LibraryWatcher.is_candidate(os.path.join(root, f"{DOWNLOAD_WORK_DIR}-archive", "video.mp4"))
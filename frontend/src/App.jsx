@@ -39,8 +39,13 @@ function App() {
   const handleScan = async () => {
     try {
       setIsScanning(true);
-      const response = await videoService.scanVideos({ recursive: true });
-      console.log('Scan results:', response.data);
+      let { data: job } = await videoService.scanVideos({ recursive: true });
+      // Le scan tourne en arrière-plan: suivre sa progression
+      while (job.status === 'pending' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        ({ data: job } = await videoService.getScanStatus(job.job_id));
+      }
+      console.log('Scan results:', job);
       await loadVideos(); // Reload videos after scan
     } catch (error) {
       console.error('Error scanning videos:', error);
@@ -58,17 +63,6 @@ function App() {
     loadVideos(); // Reload to update watched status
   };
 
-  const handleVideoWatched = async (videoId) => {
-    try {
-      await videoService.updateVideo(videoId, {
-        watched: true,
-        last_watched: new Date().toISOString()
-      });
-    } catch (error) {
-      console.error('Error updating video:', error);
-    }
-  };
-
   const handleDownload = () => {
     setShowDownloadModal(true);
   };
@@ -100,7 +94,6 @@ function App() {
         <VideoPlayer
           video={selectedVideo}
           onClose={handleClosePlayer}
-          onWatched={handleVideoWatched}
         />
       )}
       
@@ -25,31 +25,49 @@ const DownloadModal = ({ isOpen, onClose, onDownloadComplete }) => {
   }, [isOpen]);
 
   useEffect(() => {
-    let interval;
-    if (downloadProgress?.task_id && downloading) {
-      interval = setInterval(async () => {
-        try {
-          const response = await videoService.getDownloadStatus(downloadProgress.task_id);
-          setDownloadProgress(response.data);
-          
-          if (response.data.status === 'completed') {
-            setDownloading(false);
-            clearInterval(interval);
-            setTimeout(() => {
-              onDownloadComplete();
-              onClose();
-            }, 2000);
-          } else if (response.data.status === 'error') {
-            setDownloading(false);
-            setError(response.data.error || 'Download failed');
-            clearInterval(interval);
-          }
-        } catch (err) {
-          console.error('Error checking download status:', err);
-        }
-      }, 1000);
-    }
-    return () => clearInterval(interval);
+    if (!downloadProgress?.task_id || !downloading) return undefined;
+    const taskId = downloadProgress.task_id;
+    // Progression poussée par le serveur (SSE) plutôt qu'interrogée chaque seconde
+    const source = new EventSource(videoService.downloadEventsUrl());
+    let finished = false;
+
+    const handleState = (state) => {
+      if (finished || state.task_id !== taskId) return;
+      setDownloadProgress((previous) => ({ ...previous, ...state }));
+
+      if (state.status === 'completed') {
+        finished = true;
+        setDownloading(false);
+        source.close();
+        setTimeout(() => {
+          onDownloadComplete();
+          onClose();
+        }, 2000);
+      } else if (state.status === 'error' || state.status === 'cancelled') {
+        finished = true;
+        setDownloading(false);
+        setError(state.error || 'Download failed');
+        source.close();
+      }
+    };
+
+    source.addEventListener('snapshot', (event) => {
+      JSON.parse(event.data).forEach(handleState);
+    });
+    source.addEventListener('progress', (event) => {
+      handleState(JSON.parse(event.data));
+    });
+    // Une tâche terminée avant la connexion n'est plus dans l'instantané
+    source.onopen = () => {
+      videoService.getDownloadStatus(taskId)
+        .then((response) => handleState(response.data))
+        .catch((err) => console.error('Error checking download status:', err));
+    };
+    source.onerror = (err) => {
+      console.error('Download progress stream error:', err);
+    };
+
+    return () => source.close();
   }, [downloadProgress?.task_id, downloading, onClose, onDownloadComplete]);
 
   const handleUrlChange = async (e) => {
@@ -1,15 +1,38 @@
-import React, { useEffect } from 'react';
+import React, { useRef } from 'react';
 import ReactPlayer from 'react-player/file';
 import { FaTimes } from 'react-icons/fa';
 import { formatDate, formatViews } from '../utils/formatters';
+import { videoService } from '../services/api';
 
-const VideoPlayer = ({ video, onClose, onWatched }) => {
-  useEffect(() => {
-    // Mark as watched when video opens
-    if (video && !video.watched) {
-      onWatched(video.id);
-    }
-  }, [video, onWatched]);
+// Intervalle de report de la position de lecture (ms)
+const PROGRESS_INTERVAL = 5000;
+
+const VideoPlayer = ({ video, onClose }) => {
+  const durationRef = useRef(null);
+
+  // Le serveur regroupe les positions et marque la vidéo vue passé un seuil
+  const handleProgress = ({ playedSeconds }) => {
+    if (!video || playedSeconds <= 0) return;
+    videoService.reportProgress(video.id, { position: playedSeconds, duration: durationRef.current })
+      .catch((error) => console.error('Error reporting progress:', error));
+  };
+
+  const handleReady = (player) => {
+    // Reprendre là où la lecture s'était arrêtée: la position des listes mises en cache
+    // peut être en retard, /progress donne la dernière (y compris non encore écrite)
+    videoService.getProgress(video.id)
+      .then(({ data }) => {
+        const watched = data.watched ?? video.watched;
+        if (data.position && !watched) {
+          player.seekTo(data.position, 'seconds');
+        }
+      })
+      .catch(() => {
+        if (video.playback_position && !video.watched) {
+          player.seekTo(video.playback_position, 'seconds');
+        }
+      });
+  };
 
   if (!video) return null;
 
@@ -46,6 +69,10 @@ const VideoPlayer = ({ video, onClose, onWatched }) => {
                 width="100%"
                 height="100%"
                 playing
+                progressInterval={PROGRESS_INTERVAL}
+                onReady={handleReady}
+                onDuration={(duration) => { durationRef.current = duration; }}
+                onProgress={handleProgress}
                 config={{
                   file: {
                     attributes: {
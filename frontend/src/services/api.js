@@ -51,13 +51,22 @@ export const videoService = {
   getVideo: (id) => api.get(`/videos/${id}`),
   updateVideo: (id, data) => api.patch(`/videos/${id}`, data),
   deleteVideo: (id) => api.delete(`/videos/${id}`),
+  getProgress: (id) => api.get(`/videos/${id}/progress`),
+  reportProgress: (id, data) => api.post(`/videos/${id}/progress`, data),
+  bulkUpdateVideos: (data) => api.post('/videos/bulk-update', data),
+  bulkDeleteVideos: (data) => api.post('/videos/bulk-delete', data),
   getChannels: () => api.get('/channels'),
   scanVideos: (data) => api.post('/scan', data),
+  getScanStatus: (jobId) => api.get(`/scan/${jobId}`),
+  cancelScan: (jobId) => api.delete(`/scan/${jobId}`),
   
   // Download endpoints
   downloadVideo: (data) => api.post('/download', data),
+  downloadVideos: (data) => api.post('/download/batch', data),
   getDownloadStatus: (taskId) => api.get(`/download/${taskId}`),
   getAllDownloads: () => api.get('/downloads'),
+  // Flux SSE de progression (EventSource ne passe pas par axios)
+  downloadEventsUrl: () => `${API_BASE_URL}/downloads/events`,
   cancelDownload: (taskId) => api.delete(`/download/${taskId}`),
   getVideoMetadata: (data) => api.post('/download/metadata', data),
   